@@ -0,0 +1,22 @@
+# ----------------------------------------------------------------------------#
+# Access to operator endpoints.
+#
+# /_metrics (instrumentation.py) and the venue delete, restore and purge
+# endpoints of the JSON API (api.py) are not for site visitors. Each has a
+# token and an allow-list of peer addresses in config.py; a request must
+# carry "Authorization: Bearer <token>" or come from a listed address.
+# With neither configured, an endpoint answers no one.
+# ----------------------------------------------------------------------------#
+
+import hmac
+
+from flask import request
+
+
+def allowed(token, ips):
+    # is the current request allowed by `token` or by the addresses `ips`
+    if token:
+        given = request.headers.get('Authorization', '')
+        if hmac.compare_digest(given.encode(), ('Bearer ' + token).encode()):
+            return True
+    return request.remote_addr in (ips or ())
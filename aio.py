@@ -0,0 +1,287 @@
+# ----------------------------------------------------------------------------#
+# Async read path.
+#
+# With ASYNC_READS = True the read-only views -- /venues, /artists, /shows,
+# the two search pages and the venue and artist pages -- are replaced by
+# coroutine versions that run on an SQLAlchemy AsyncEngine (asyncpg for
+# Postgres, aiosqlite for SQLite). Queries that do not depend on each other
+# run concurrently: a venue page fetches the venue with its counts and its
+# past and upcoming show lists at the same time, on three connections.
+# They build the same statements as the sync views (queries.py) and render
+# the same templates; everything else, including the write routes, stays on
+# the sync Flask-SQLAlchemy session. With ASYNC_READS off (the default)
+# nothing here is imported beyond this module and the app is unchanged.
+#
+# Needs `pip install 'flask[async]' 'sqlalchemy[asyncio]' asyncpg` (or
+# aiosqlite). Serve it from an ASGI server through asgi.py:
+#
+#   ASYNC_READS=1 uvicorn asgi:app --workers 4
+#
+# Flask runs every async view in its own event loop, and asyncpg
+# connections cannot move between loops, so the async engine does not pool:
+# each query opens its own connection. Put PgBouncer in front
+# (DB_PGBOUNCER=1) to keep that cheap.
+# ----------------------------------------------------------------------------#
+
+import asyncio
+from importlib.util import find_spec
+
+from flask import abort, current_app, g, render_template, request
+from sqlalchemy.engine import make_url
+
+import facets
+import search as search_backends
+from app import detail_cache_ttl, search_data
+from artists import artist_data, artists_data
+from cache import get_cache, venue_key, artist_key
+from conditional import conditional
+from models import Venue, Artist
+from queries import artists_statement, decode_cursor, group_venue_areas, venue_areas_statement
+from queries import shows_page_statement, shows_page_result
+from queries import detail_entity_statement, detail_shows_statement, detail_shows_result
+from queries import venues_version_statement, artists_version_statement
+from queries import shows_version_statement, detail_version_statement
+from shows import SHOWS_PAGE_COLUMNS, shows_data
+from venues import venue_data
+
+
+def async_database_uri(config):
+    if config.get('ASYNC_DATABASE_URI'):
+        return config['ASYNC_DATABASE_URI']
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend == 'postgresql':
+        url = url.set(drivername='postgresql+asyncpg')
+        if config.get('DB_PGBOUNCER'):
+            url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+        return url
+    if backend == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            # the async engine would open a second, empty database
+            raise RuntimeError('ASYNC_READS needs a file-based SQLite database')
+        return url.set(drivername='sqlite+aiosqlite')
+    raise RuntimeError('ASYNC_READS does not support {} databases'.format(backend))
+
+
+async def fetch(statement):
+    # all rows of `statement`, on a connection of its own
+    async with current_app.extensions['aio']() as session:
+        return (await session.execute(statement)).all()
+
+
+async def fetch_first(statement):
+    rows = await fetch(statement)
+    return rows[0] if rows else None
+
+
+async def detail_with_shows(model, entity_id, other):
+    # async counterpart of queries.detail_with_shows: same result, three
+    # concurrent statements
+    past_before = decode_cursor(request.args.get('past_before'), size=2)
+    upcoming_after = decode_cursor(request.args.get('upcoming_after'), size=2)
+
+    row, past, upcoming = await asyncio.gather(
+        fetch_first(detail_entity_statement(model, entity_id)),
+        fetch(detail_shows_statement(model, entity_id, other, False, past_before)),
+        fetch(detail_shows_statement(model, entity_id, other, True, upcoming_after)),
+    )
+    if row is None:
+        abort(404)
+
+    past, upcoming, cursors = detail_shows_result(past, upcoming)
+    return row, past, upcoming, cursors
+
+
+async def facet_links(model, filters):
+    # facets.facet_counts, reading through the async session on a miss
+    key = facets.facets_key(model, filters)
+    counts = get_cache().get(key)
+    if counts is None:
+        counts = facets.group_facets(
+            await fetch(facets.facet_statement(model, filters))
+        )
+        facets.store(key, counts)
+    return facets.facet_links(counts, filters)
+
+
+async def search_response(model, search_term, page):
+    backend = search_backends.get_backend()
+    per_page = current_app.config['SEARCH_RESULTS_PER_PAGE']
+    page = max(page, 1)
+    async with current_app.extensions['aio']() as session:
+        rows = (await session.execute(
+            backend.statement(model, search_term, page, per_page)
+        )).all()
+    return search_data(backend.results(rows), page, per_page)
+
+
+#  Validators
+#  ----------------------------------------------------------------
+
+async def venues_version():
+    return await fetch_first(venues_version_statement())
+
+
+async def artists_version():
+    return await fetch_first(artists_version_statement())
+
+
+async def shows_version():
+    return await fetch_first(shows_version_statement())
+
+
+async def venue_version(venue_id):
+    return await fetch_first(detail_version_statement(Venue, venue_id, Artist))
+
+
+async def artist_version(artist_id):
+    return await fetch_first(detail_version_statement(Artist, artist_id, Venue))
+
+
+#  Views
+#  ----------------------------------------------------------------
+
+@conditional(venues_version)
+async def venues():
+    filters = facets.parse_filters(request.args)
+    rows, links = await asyncio.gather(
+        fetch(venue_areas_statement(
+            request.args.get('sort'), facets.conditions(Venue, filters)
+        )),
+        facet_links(Venue, filters),
+    )
+    return render_template(
+        'pages/venues.html',
+        areas=group_venue_areas(rows),
+        facets=links,
+        clear_url=facets.clear_url() if any(filters.values()) else None
+    )
+
+
+async def search_venues():
+    search_term = request.values.get('search_term', '').strip()
+    page = request.values.get('page', 1, type=int)
+    response = await search_response(Venue, search_term, page)
+    return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+
+@conditional(venue_version)
+async def show_venue(venue_id):
+    key = None
+    first_page = not request.args.get('past_before') and not request.args.get('upcoming_after')
+    if first_page and 'etag' in g:
+        key = venue_key(venue_id, g.etag)
+    if key:
+        data = get_cache().get(key)
+        if data is not None:
+            return render_template('pages/show_venue.html', venue=data)
+
+    row, past, upcoming, cursors = await detail_with_shows(Venue, venue_id, Artist)
+    data = venue_data(row, past, upcoming, cursors)
+
+    if key:
+        get_cache().set(
+            key, data,
+            ttl=detail_cache_ttl([sh.dateshow for sh in upcoming[:1]])
+        )
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@conditional(artists_version)
+async def artists():
+    filters = facets.parse_filters(request.args)
+    rows, links = await asyncio.gather(
+        fetch(artists_statement(
+            request.args.get('sort'), facets.conditions(Artist, filters)
+        )),
+        facet_links(Artist, filters),
+    )
+    return render_template(
+        'pages/artists.html',
+        artists=artists_data(rows),
+        facets=links,
+        clear_url=facets.clear_url() if any(filters.values()) else None
+    )
+
+
+async def search_artists():
+    search_term = request.values.get('search_term', '').strip()
+    page = request.values.get('page', 1, type=int)
+    response = await search_response(Artist, search_term, page)
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+
+@conditional(artist_version)
+async def show_artist(artist_id):
+    key = None
+    first_page = not request.args.get('past_before') and not request.args.get('upcoming_after')
+    if first_page and 'etag' in g:
+        key = artist_key(artist_id, g.etag)
+    if key:
+        data = get_cache().get(key)
+        if data is not None:
+            return render_template('pages/show_artist.html', artist=data)
+
+    row, past, upcoming, cursors = await detail_with_shows(Artist, artist_id, Venue)
+    data = artist_data(row, past, upcoming, cursors)
+
+    if key:
+        get_cache().set(
+            key, data,
+            ttl=detail_cache_ttl([sh.dateshow for sh in upcoming[:1]])
+        )
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@conditional(shows_version)
+async def shows():
+    after = decode_cursor(request.args.get('after'))
+    before = decode_cursor(request.args.get('before'))
+
+    statement, per_page = shows_page_statement(SHOWS_PAGE_COLUMNS, after, before)
+    allData, prev_cursor, next_cursor = shows_page_result(
+        await fetch(statement), after, before, per_page
+    )
+    return render_template(
+        'pages/shows.html',
+        shows=shows_data(allData),
+        prev_cursor=prev_cursor,
+        next_cursor=next_cursor
+    )
+
+
+VIEWS = {
+    'venues.venues': venues,
+    'venues.search_venues': search_venues,
+    'venues.show_venue': show_venue,
+    'artists.artists': artists,
+    'artists.search_artists': search_artists,
+    'artists.show_artist': show_artist,
+    'shows.shows': shows,
+}
+
+
+def init_app(app):
+    # call after the blueprints are registered: replaces their read views
+    if not app.config.get('ASYNC_READS'):
+        return
+
+    # asgiref runs async views in Flask, greenlet runs SQLAlchemy's asyncio
+    # extension
+    missing = [name for name in ('asgiref', 'greenlet') if find_spec(name) is None]
+    if missing:
+        raise RuntimeError(
+            "ASYNC_READS needs `pip install 'flask[async]' 'sqlalchemy[asyncio]'` "
+            "(missing: {})".format(', '.join(missing))
+        )
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    options = {'poolclass': NullPool}
+    if app.config.get('DB_PGBOUNCER'):
+        options['connect_args'] = {'statement_cache_size': 0}
+    engine = create_async_engine(async_database_uri(app.config), **options)
+    app.extensions['aio'] = async_sessionmaker(engine)
+
+    for endpoint, view in VIEWS.items():
+        app.view_functions[endpoint] = view
@@ -0,0 +1,372 @@
+# ----------------------------------------------------------------------------#
+# JSON API (v1).
+#
+#   GET  /api/v1/venues            ?fields=id,name,city  &after=<id>  &limit=50
+#   GET  /api/v1/venues/<id>       ?fields=name,upcoming_shows
+#   DELETE /api/v1/venues/<id>,  POST /api/v1/venues/<id>/restore | purge   (admin)
+#   GET  /api/v1/artists, /api/v1/artists/<id>
+#   GET  /api/v1/shows             ?fields=...  &after=<cursor> | &before=<cursor>
+#   POST /api/v1/shows/check       {"bookings": [{"venue_id": 1, "artist_id": 2,
+#                                    "start_time": "2026-11-01T20:00", "duration": 90}]}
+#   GET  /api/v1/batch?venues=1,2&artists=3&shows=7
+#   POST /api/v1/batch  {"venues": [1, 2], "fields": {"venues": ["id", "name"]}}
+#
+# `fields` is a sparse projection: only the listed columns are selected from
+# the database. Lists are keyset paginated (by id for venues and artists, by
+# the same cursor as /shows for shows). The batch endpoint resolves each
+# entity type with a single IN query. Responses are encoded with orjson
+# when it is installed, falling back to the standard json module.
+#
+# shows/check validates proposed bookings without creating them (see
+# scheduling.py): one result per booking, in order, with its errors and the
+# existing shows it conflicts with.
+#
+# Deleted venues, and their shows, are left out of every response. A deleted
+# venue can be restored, or purged for good in the background (see
+# deletion.py). The three admin endpoints answer only the clients allowed
+# by API_ADMIN_TOKEN or API_ADMIN_ALLOWED_IPS (config.py, access.py);
+# others get a 403.
+# ----------------------------------------------------------------------------#
+
+import json
+from datetime import date
+from functools import wraps
+
+from flask import Blueprint, Response, abort, current_app, request
+from werkzeug.exceptions import HTTPException
+
+import access
+import deletion
+import scheduling
+from models import db, Venue, Artist, Show, live
+from queries import decode_cursor, detail_with_shows, shows_page
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+MAX_LIMIT = 500
+MAX_BATCH_IDS = 500
+
+SHOW_FIELDS = {
+    # name: (column, needs Artist join); Venue is always joined, shows of
+    # deleted venues are left out
+    'id': (Show.id, False),
+    'venue_id': (Show.venue_id, False),
+    'venue_name': (Venue.name.label('venue_name'), False),
+    'artist_id': (Show.artist_id, False),
+    'artist_name': (Artist.name.label('artist_name'), True),
+    'artist_image_link': (Artist.image_link.label('artist_image_link'), True),
+    'start_time': (Show.dateshow.label('start_time'), False),
+    'duration': (Show.duration_minutes.label('duration'), False),
+    'updated_at': (Show.updated_at, False),
+}
+DEFAULT_SHOW_FIELDS = (
+    'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time'
+)
+# detail-only fields; the show lists come from queries.detail_with_shows,
+# upcoming_shows_count is a column (counters.py)
+DETAIL_SHOW_FIELDS = ('past_shows', 'upcoming_shows', 'past_shows_count')
+SHOW_LIST_FIELDS = ('past_shows', 'upcoming_shows')
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def json_response(data, status=200):
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, default=_json_default, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+
+@api_v1.errorhandler(HTTPException)
+def api_error(error):
+    return json_response({'error': error.description}, error.code)
+
+
+# code-specific handlers take precedence over the class handler above, so
+# the app's HTML 404/500 pages have to be overridden one by one
+for code in (404, 500):
+    api_v1.register_error_handler(code, api_error)
+
+
+def parse_fields(raw, allowed, default):
+    if not raw:
+        return list(default)
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    fields = [f.strip() for f in raw if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        abort(400, 'Unknown fields: ' + ', '.join(unknown))
+    return fields
+
+
+def parse_limit(default=50):
+    # ?limit=, clamped to 1..MAX_LIMIT; `default` when absent
+    limit = request.args.get('limit', type=int)
+    if limit is None:
+        return default
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def admin_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        config = current_app.config
+        if not access.allowed(config.get('API_ADMIN_TOKEN'), config.get('API_ADMIN_ALLOWED_IPS')):
+            abort(403, 'Not allowed.')
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def entity_columns(model, fields):
+    # id is always selected: it is the pagination key
+    names = ['id'] + [f for f in fields if f != 'id']
+    return [model.__table__.c[name] for name in names]
+
+
+def show_select(fields):
+    columns = [SHOW_FIELDS[f][0] for f in fields]
+    join_artist = any(SHOW_FIELDS[f][1] for f in fields)
+    return columns, join_artist
+
+
+def project(rows, fields):
+    return [{f: getattr(row, f) for f in fields} for row in rows]
+
+
+#  Venues and artists
+#  ----------------------------------------------------------------
+
+def entity_list(model):
+    table = model.__table__
+    fields = parse_fields(request.args.get('fields'), table.c.keys(), ('id', 'name'))
+    limit = parse_limit()
+    after = request.args.get('after', type=int)
+
+    query = db.select(*entity_columns(model, fields)).where(*live(model)).order_by(
+        table.c.id
+    ).limit(limit + 1)
+    if after is not None:
+        query = query.where(table.c.id > after)
+    rows = db.session.execute(query).all()
+
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    return json_response({
+        'data': project(rows[:limit], fields),
+        'next_cursor': next_cursor
+    })
+
+
+def entity_detail(model, entity_id, other, other_kind):
+    table = model.__table__
+    columns = table.c.keys()
+    fields = parse_fields(
+        request.args.get('fields'),
+        list(columns) + list(DETAIL_SHOW_FIELDS),
+        list(columns) + list(DETAIL_SHOW_FIELDS)
+    )
+
+    if not any(f in SHOW_LIST_FIELDS for f in fields):
+        query = db.select(*entity_columns(model, [f for f in fields if f in columns]))
+        if 'past_shows_count' in fields:
+            query = query.add_columns(
+                (model.shows_count - model.upcoming_shows_count).label('past_shows_count')
+            )
+        row = db.session.execute(query.where(table.c.id == entity_id, *live(model))).first()
+        if row is None:
+            abort(404, 'Not found.')
+        return json_response(project([row], fields)[0])
+
+    row, past, upcoming, cursors = detail_with_shows(
+        model, entity_id, other,
+        decode_cursor(request.args.get('past_before'), size=2),
+        decode_cursor(request.args.get('upcoming_after'), size=2)
+    )
+    entity = row[0]
+
+    def show_data(sh):
+        return {
+            other_kind + '_id': sh.other_id,
+            other_kind + '_name': sh.other_name,
+            other_kind + '_image_link': sh.other_image_link,
+            'start_time': sh.dateshow
+        }
+
+    computed = {
+        'past_shows': [show_data(sh) for sh in past],
+        'upcoming_shows': [show_data(sh) for sh in upcoming],
+        'past_shows_count': row.past_count,
+    }
+    data = {
+        f: computed[f] if f in computed else getattr(entity, f) for f in fields
+    }
+    if 'past_shows' in fields:
+        data['past_shows_more'] = cursors['past_more']
+    if 'upcoming_shows' in fields:
+        data['upcoming_shows_more'] = cursors['upcoming_more']
+    return json_response(data)
+
+
+@api_v1.route('/venues')
+def venues():
+    return entity_list(Venue)
+
+
+@api_v1.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return entity_detail(Venue, venue_id, Artist, 'artist')
+
+
+@api_v1.route('/venues/<int:venue_id>', methods=['DELETE'])
+@admin_only
+def delete_venue(venue_id):
+    area = deletion.delete(venue_id)
+    if area is None:
+        abort(404, 'Not found.')
+    db.session.commit()
+    deletion.invalidate(venue_id, area)
+    return json_response({'id': venue_id, 'deleted': True})
+
+
+@api_v1.route('/venues/<int:venue_id>/restore', methods=['POST'])
+@admin_only
+def restore_venue(venue_id):
+    area = deletion.restore(venue_id)
+    if area is None:
+        abort(404, 'No deleted venue with this id.')
+    db.session.commit()
+    deletion.invalidate(venue_id, area)
+    return json_response({'id': venue_id, 'restored': True})
+
+
+@api_v1.route('/venues/<int:venue_id>/purge', methods=['POST'])
+@admin_only
+def purge_venue(venue_id):
+    # 202: the venue and its shows are deleted by a background job
+    if not deletion.purge(venue_id):
+        if db.session.get(Venue, venue_id) is not None:
+            abort(409, 'Only a deleted venue can be purged.')
+        abort(404, 'Not found.')
+    db.session.commit()
+    return json_response({'id': venue_id, 'purge': 'queued'}, 202)
+
+
+@api_v1.route('/artists')
+def artists():
+    return entity_list(Artist)
+
+
+@api_v1.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return entity_detail(Artist, artist_id, Venue, 'venue')
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api_v1.route('/shows')
+def shows():
+    fields = parse_fields(request.args.get('fields'), SHOW_FIELDS, DEFAULT_SHOW_FIELDS)
+    columns, join_artist = show_select(fields)
+
+    rows, prev_cursor, next_cursor = shows_page(
+        columns,
+        after=decode_cursor(request.args.get('after')),
+        before=decode_cursor(request.args.get('before')),
+        # SHOWS_PER_PAGE when absent
+        per_page=parse_limit(default=None),
+        join_artist=join_artist
+    )
+    return json_response({
+        'data': project(rows, fields),
+        'prev_cursor': prev_cursor,
+        'next_cursor': next_cursor
+    })
+
+
+@api_v1.route('/shows/check', methods=['POST'])
+def check_shows():
+    body = request.get_json(silent=True) or {}
+    bookings = body.get('bookings')
+    if not isinstance(bookings, list) or not all(isinstance(b, dict) for b in bookings):
+        abort(400, 'Expected {"bookings": [{...}, ...]}.')
+    if len(bookings) > MAX_BATCH_IDS:
+        abort(400, 'At most {} bookings per request.'.format(MAX_BATCH_IDS))
+
+    results = []
+    for check in scheduling.check_bookings(bookings):
+        results.append({
+            'ok': not check.errors,
+            'errors': check.errors,
+            'conflicts': [{
+                'id': row.id,
+                'venue_id': row.venue_id,
+                'artist_id': row.artist_id,
+                'start_time': row.dateshow,
+                'end_time': scheduling.end_of(row.dateshow, row.duration_minutes),
+            } for row in check.conflicts]
+        })
+    return json_response({'results': results})
+
+
+#  Batch
+#  ----------------------------------------------------------------
+
+@api_v1.route('/batch', methods=['GET', 'POST'])
+def batch():
+    body = request.get_json(silent=True) or {}
+    requested_fields = body.get('fields', {})
+    result = {}
+
+    for kind, model in (('venues', Venue), ('artists', Artist), ('shows', Show)):
+        if kind in body:
+            raw_ids = body[kind]
+        elif request.args.get(kind):
+            raw_ids = request.args[kind].split(',')
+        else:
+            continue
+        try:
+            ids = sorted(set(int(i) for i in raw_ids))
+        except (TypeError, ValueError):
+            abort(400, 'Ids for {} must be integers.'.format(kind))
+        if len(ids) > MAX_BATCH_IDS:
+            abort(400, 'At most {} ids per type.'.format(MAX_BATCH_IDS))
+        raw_fields = requested_fields.get(kind) or request.args.get(kind + '_fields')
+
+        if model is Show:
+            fields = parse_fields(raw_fields, SHOW_FIELDS, ('id',) + DEFAULT_SHOW_FIELDS)
+            if 'id' not in fields:
+                fields.insert(0, 'id')
+            columns, join_artist = show_select(fields)
+            query = db.select(*columns).select_from(Show).join(
+                Venue, db.and_(Venue.id == Show.venue_id, *live(Venue))
+            )
+            if join_artist:
+                query = query.join(Artist, Artist.id == Show.artist_id)
+        else:
+            table = model.__table__
+            fields = parse_fields(raw_fields, table.c.keys(), table.c.keys())
+            if 'id' not in fields:
+                fields.insert(0, 'id')
+            query = db.select(*entity_columns(model, fields)).where(*live(model))
+
+        rows = db.session.execute(
+            query.where(model.id.in_(ids)).order_by(model.id)
+        ).all() if ids else []
+        result[kind] = project(rows, fields)
+
+    return json_response(result)
+
+
+def init_app(app):
+    app.register_blueprint(api_v1)
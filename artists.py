@@ -0,0 +1,271 @@
+# ----------------------------------------------------------------------------#
+# Artists.
+# ----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, g, render_template, request
+from flask import flash, redirect, url_for
+
+import facets
+import fragments
+import jobs
+from app import search_response, detail_cache_ttl
+from cache import get_cache, artist_key
+from conditional import conditional
+from models import db, Venue, Artist
+from queries import decode_cursor, detail_with_shows
+from queries import artists_statement, artists_version, artist_version
+
+artists_bp = Blueprint('artists', __name__)
+
+
+def artist_data(row, past, upcoming, cursors):
+    # template data for a artist page; rows as returned by
+    # queries.detail_with_shows
+    allData = row.Artist
+
+    def show_data(sh):
+        return {
+            'venue_id': sh.other_id,
+            'venue_name': sh.other_name,
+            'venue_image_link': sh.other_image_link,
+            'start_time': sh.dateshow
+        }
+
+    data = {
+      'id': allData.id,
+      'name': allData.name,
+      'genres': allData.genres,
+      'city': allData.city,
+      'state': allData.state,
+      'phone': allData.phone,
+      'website': allData.website,
+      'facebook_link': allData.facebook_link,
+      'seeking_talent': allData.seeking_talent,
+      'seeking_description': allData.seeking_description,
+      'image_link': allData.image_link,
+      'past_shows': [show_data(sh) for sh in past],
+      'upcoming_shows': [show_data(sh) for sh in upcoming],
+      'past_shows_count': row.past_count,
+      'upcoming_shows_count': row.upcoming_count,
+      'past_shows_more': cursors['past_more'],
+      'upcoming_shows_more': cursors['upcoming_more']
+    }
+
+    return data
+
+
+def artists_data(allData):
+    data = []
+
+    for a in allData:
+
+        data.append({
+            'id': a.id,
+            'name': a.name,
+            # fragment cache version (fragments.py)
+            'version': a.updated_at
+        })
+
+    return data
+
+
+#  Artists
+#  ----------------------------------------------------------------
+@artists_bp.route('/artists')
+@conditional(artists_version)
+def artists():
+
+    filters = facets.parse_filters(request.args)
+    allData = db.session.execute(
+        artists_statement(request.args.get('sort'), facets.conditions(Artist, filters))
+    ).all()
+
+    return render_template(
+        'pages/artists.html',
+        artists=artists_data(allData),
+        facets=facets.facet_links(facets.facet_counts(Artist, filters), filters),
+        clear_url=facets.clear_url() if any(filters.values()) else None
+    )
+
+
+@artists_bp.route('/artists/search', methods=['GET', 'POST'])
+def search_artists():
+    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    search_term = request.values.get('search_term', '').strip()
+    page = request.values.get('page', 1, type=int)
+    response = search_response(Artist, search_term, page)
+
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+
+@artists_bp.route('/artists/<int:artist_id>')
+@conditional(artist_version)
+def show_artist(artist_id):
+    # shows the venue page with the given venue_id
+    # TODO: replace with real venue data from the venues table, using venue_id
+
+    past_before = decode_cursor(request.args.get('past_before'), size=2)
+    upcoming_after = decode_cursor(request.args.get('upcoming_after'), size=2)
+    # only the first page of each show list is cached, under the page's
+    # ETag (conditional.py)
+    key = None
+    if past_before is None and upcoming_after is None and 'etag' in g:
+        key = artist_key(artist_id, g.etag)
+
+    if key:
+        data = get_cache().get(key)
+        if data is not None:
+            return render_template('pages/show_artist.html', artist=data)
+
+    row, past, upcoming, cursors = detail_with_shows(
+        Artist, artist_id, Venue, past_before, upcoming_after
+    )
+    data = artist_data(row, past, upcoming, cursors)
+
+    # data = list(filter(lambda d: d['id'] == artist_id, [data1, data2, data3]))[0]
+    if key:
+        get_cache().set(
+            key, data,
+            ttl=detail_cache_ttl([sh.dateshow for sh in upcoming[:1]])
+        )
+
+    return render_template('pages/show_artist.html', artist=data)
+
+#  Update
+#  ----------------------------------------------------------------
+@artists_bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    from forms import ArtistForm
+    form = ArtistForm()
+    
+    artistdetails = Artist.query.get(artist_id)
+    form.name.data = artistdetails.name
+    form.city.data = artistdetails.city
+    form.state.data = artistdetails.state
+    form.phone.data = artistdetails.phone
+    form.genres.data = artistdetails.genres
+    form.image_link.data = artistdetails.image_link
+    form.facebook_link.data = artistdetails.facebook_link
+    form.website.data = artistdetails.website
+    if artistdetails.seeking_talent:
+        form.seeking_talent.data = "Yes"
+    else:
+        form.seeking_talent.data = "No"
+    form.seeking_description.data = artistdetails.seeking_description
+
+    
+    # TODO: populate form with fields from artist with ID <artist_id>
+    return render_template('forms/edit_artist.html', form=form, artist=artistdetails)
+
+
+@artists_bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    # TODO: take values from the form submitted, and update existing
+    # artist record with ID <artist_id> using the new attributes
+
+    error = False
+    try:
+        artist = Artist.query.get(artist_id)
+        artist.name = request.form['name']
+        artist.city = request.form['city']
+        artist.state = request.form['state']
+        artist.phone = request.form['phone']
+        artist.image_link = request.form['image_link']
+        artist.genres = request.form.getlist('genres')
+        artist.facebook_link = request.form['facebook_link']
+        artist.website = request.form['website']
+        if request.form['seeking_talent'] == 'No':
+            artist.seeking_talent = False
+        else:
+            artist.seeking_talent = True
+        artist.seeking_description = request.form['seeking_description']
+
+        jobs.enqueue_indexing('artist_saved', {'artist_id': artist_id})
+        db.session.commit()
+        facets.invalidate(Artist)
+        fragments.invalidate(('artist', artist_id))
+    except Exception:
+        error = True
+        db.session.rollback()
+        current_app.logger.exception('Artist %s could not be updated.', artist_id)
+    finally:
+        db.session.close()
+
+    if error:
+        flash('An error occurred. Artist ' + request.form['name'] + ' could not be updated.')
+    else:
+        # on successful db insert, flash success
+        flash('Artist ' + request.form['name'] + ' was successfully updated!')
+
+
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@artists_bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@artists_bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+    error = False
+    try:
+        name = request.form['name']
+        city = request.form['city']
+        state = request.form['state']
+        phone = request.form['phone']
+        image_link = request.form['image_link']
+        genres = request.form.getlist('genres')
+        facebook_link = request.form['facebook_link']
+        website = request.form['website']
+        if request.form['seeking_talent'] == 'No':
+            seeking_talent = False
+        else:
+            seeking_talent = True
+        seeking_description = request.form['seeking_description']
+
+        artist = Artist(
+            name=name,
+            city=city,
+            state=state,
+            phone=phone,
+            image_link=image_link,
+            genres=genres,
+            facebook_link=facebook_link,
+            website=website,
+            seeking_talent=seeking_talent,
+            seeking_description=seeking_description
+        )
+
+        db.session.add(artist)
+        db.session.flush()
+        jobs.enqueue_indexing('artist_saved', {'artist_id': artist.id})
+        db.session.commit()
+        facets.invalidate(Artist)
+    except Exception:
+        error = True
+        db.session.rollback()
+        current_app.logger.exception('Artist could not be listed.')
+    finally:
+        db.session.close()
+
+    if error:
+        flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
+    else:
+        # on successful db insert, flash success
+        flash('Venue ' + request.form['name'] + ' was successfully listed!')
+
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+    return render_template('pages/home.html')
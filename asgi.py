@@ -0,0 +1,14 @@
+# ----------------------------------------------------------------------------#
+# ASGI entry point, for the async read path (ASYNC_READS, see aio.py).
+#
+#   ASYNC_READS=1 FYYUR_CONFIG=production uvicorn asgi:app --workers 4
+#
+# The Flask app itself stays WSGI; asgiref's adapter runs it in a thread
+# pool and Flask runs the async views, so the sync routes work unchanged.
+# ----------------------------------------------------------------------------#
+
+from asgiref.wsgi import WsgiToAsgi
+
+from wsgi import create_app
+
+app = WsgiToAsgi(create_app())
@@ -0,0 +1,268 @@
+# ----------------------------------------------------------------------------#
+# Static assets.
+#
+#   flask --app wsgi assets build [--clean]
+#
+# The build copies every file under static/ to static/dist/ with a content
+# hash in its name (css/main.css -> dist/css/main.3f9a0c1b2d4e.css),
+# rewriting url(...) references in stylesheets to the hashed names. It
+# concatenates and minifies the BUNDLES, and writes .gz (and, with the
+# brotli package installed, .br) variants of the text files next to them.
+# dist/manifest.json maps each original path to its hashed one. Old builds
+# are kept so that cached pages still find their assets; --clean removes
+# files the new manifest does not list.
+#
+# With a manifest, url_for('static', filename='css/main.css') returns the
+# hashed URL. Hashed files are served with a year-long immutable
+# Cache-Control, precompressed when Accept-Encoding allows. bundle_urls()
+# in templates returns the URL of a bundle, or the URLs of its sources when
+# no build has run (development).
+#
+# Minification uses rcssmin / rjsmin when installed; without them CSS gets
+# a whitespace and comment pass and JavaScript is only concatenated (the
+# bundled libraries ship minified).
+# ----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+from mimetypes import guess_type
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# bundle -> sources, in order; paths relative to static/
+BUNDLES = {
+    'css/site.css': (
+        'css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+        'css/main.responsive.css', 'css/main.quickfix.css',
+    ),
+    # loaded in <head>, before the page renders
+    'js/head.js': ('js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'),
+    # deferred; bootstrap needs jQuery, which stays on its CDN
+    'js/site.js': ('js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js', 'js/script.js'),
+}
+
+OUTPUT = 'dist'
+MANIFEST = OUTPUT + '/manifest.json'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.json')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+URL_PATTERN = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def fingerprinted(path, content):
+    root, ext = posixpath.splitext(path)
+    return '{}/{}.{}{}'.format(OUTPUT, root, hashlib.sha256(content).hexdigest()[:12], ext)
+
+
+def rewrite_urls(css, source, target, manifest):
+    # url(...) in `source` (moved to `target`) pointing at hashed files
+    def replace(match):
+        quote, url = match.groups()
+        path, sep, suffix = re.match(r'([^?#]*)([?#]?)(.*)', url).groups()
+        if re.match(r'^([a-z]+:|/)', path):
+            return match.group(0)
+        hashed = manifest.get(posixpath.normpath(posixpath.join(posixpath.dirname(source), path)))
+        if hashed is None:
+            return match.group(0)
+        relative = posixpath.relpath(hashed, posixpath.dirname(target))
+        return 'url({0}{1}{2}{3}{0})'.format(quote, relative, sep, suffix)
+    return URL_PATTERN.sub(replace, css)
+
+
+def minify_css(css):
+    if rcssmin is not None:
+        return rcssmin.cssmin(css)
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};,>])\s*', r'\1', css).replace(';}', '}').strip()
+
+
+def minify_js(js):
+    return rjsmin.jsmin(js) if rjsmin is not None else js
+
+
+def sources(static_folder):
+    # static files to fingerprint, stylesheets last so that their url()s
+    # can point at the hashed fonts and images
+    paths = []
+    for root, dirs, files in os.walk(static_folder):
+        relative = os.path.relpath(root, static_folder).replace(os.sep, '/')
+        if relative == OUTPUT or relative.startswith(OUTPUT + '/'):
+            dirs[:] = []
+            continue
+        for name in files:
+            if name.startswith('.'):
+                continue
+            paths.append(posixpath.normpath(posixpath.join(relative, name)))
+    return sorted(paths, key=lambda path: (path.endswith('.css'), path))
+
+
+def write(static_folder, path, content):
+    target = os.path.join(static_folder, path)
+    if os.path.exists(target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(content)
+    if not path.endswith(COMPRESSIBLE):
+        return
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(content):
+            with open(target + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+def build(static_folder):
+    # returns the manifest
+    manifest = {}
+
+    def read(path):
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            return f.read()
+
+    def add(path, content):
+        hashed = fingerprinted(path, content)
+        write(static_folder, hashed, content)
+        manifest[path] = hashed
+
+    for path in sources(static_folder):
+        content = read(path)
+        if path.endswith('.css'):
+            # the rewritten urls are relative; the hashed file sits at the
+            # same depth under dist/, so only the file names change
+            target = OUTPUT + '/' + path
+            content = rewrite_urls(content.decode('utf-8'), path, target, manifest).encode('utf-8')
+        add(path, content)
+
+    for bundle, parts in sorted(BUNDLES.items()):
+        if bundle.endswith('.css'):
+            css = '\n'.join(
+                rewrite_urls(read(part).decode('utf-8'), part, OUTPUT + '/' + bundle, manifest)
+                for part in parts
+            )
+            add(bundle, minify_css(css).encode('utf-8'))
+        else:
+            js = ';\n'.join(minify_js(read(part).decode('utf-8')) for part in parts)
+            add(bundle, js.encode('utf-8'))
+
+    target = os.path.join(static_folder, MANIFEST)
+    with open(target, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def clean(static_folder, manifest):
+    # removes built files the manifest does not list; returns their number
+    keep = set(manifest.values()) | {MANIFEST}
+    removed = 0
+    for root, _, files in os.walk(os.path.join(static_folder, OUTPUT)):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+            for _, suffix in ENCODINGS:
+                if path.endswith(suffix):
+                    path = path[:-len(suffix)]
+            if path not in keep:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, MANIFEST)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def bundle_urls(name):
+    if name in current_app.extensions['assets']:
+        return [url_for('static', filename=name)]
+    return [url_for('static', filename=part) for part in BUNDLES[name]]
+
+
+def static_file(filename):
+    # the app's static view: hashed files are immutable and sent
+    # precompressed when the client accepts it
+    if not filename.startswith(OUTPUT + '/'):
+        return current_app.send_static_file(filename)
+
+    static_folder = current_app.static_folder
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(
+            os.path.join(static_folder, filename + suffix)
+        ):
+            break
+    else:
+        encoding, suffix = None, ''
+
+    mimetype = None
+    if encoding:
+        mimetype = guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(
+        static_folder, filename + suffix, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    manifest = load_manifest(app.static_folder)
+    app.extensions['assets'] = manifest
+    if manifest:
+        # pages embed the hashed URLs: a new build must change their ETags
+        digest = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode('utf-8'))
+        app.config['HTTP_CACHE_VERSION'] = '{}-{}'.format(
+            app.config.get('HTTP_CACHE_VERSION'), digest.hexdigest()[:12]
+        )
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    app.view_functions['static'] = static_file
+    app.jinja_env.globals['bundle_urls'] = bundle_urls
+
+    assets_cli = AppGroup('assets', help='Build the static assets.')
+
+    @assets_cli.command('build', help='Fingerprint, bundle and precompress static/.')
+    @click.option('--clean', 'remove', is_flag=True, help='Remove files of older builds.')
+    def build_command(remove):
+        built = build(app.static_folder)
+        click.echo('{} files in {}.'.format(len(built), MANIFEST))
+        if remove:
+            click.echo('{} old files removed.'.format(clean(app.static_folder, built)))
+        if brotli is None:
+            click.echo('brotli is not installed: no .br files.')
+
+    app.cli.add_command(assets_cli)
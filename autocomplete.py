@@ -0,0 +1,79 @@
+# ----------------------------------------------------------------------------#
+# Autocomplete.
+#
+#   GET /autocomplete/artists?q=gun   -> [{"id": 12, "name": "Guns N Petals",
+#   GET /autocomplete/venues?q=the          "city": "San Francisco", "state": "CA"}]
+#
+# The first AUTOCOMPLETE_LIMIT venues (or artists) whose name starts with q,
+# case-insensitively, in name order. The prefix becomes a range on
+# lower(name) -- [q, q with its last character incremented) -- which on
+# Postgres is read from the ix_*_name_prefix indexes (models.py): one index
+# descent and k rows, however large the table. Used by the new show form
+# (static/js/script.js), whose submission also looks up names typed
+# without picking a suggestion with resolve().
+# ----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, request
+
+from api import json_response
+from conditional import cache_control_for
+from models import db, Venue, Artist, live
+
+autocomplete_bp = Blueprint('autocomplete', __name__, url_prefix='/autocomplete')
+
+
+def name_key(model):
+    # must match the ix_*_name_prefix index expression
+    key = db.func.lower(model.name)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        key = key.collate('C')
+    return key
+
+
+def prefix_range(q):
+    # [low, high) holding every string that starts with q
+    return q, q[:-1] + chr(min(ord(q[-1]) + 1, 0x10ffff))
+
+
+def matches(model, q):
+    q = q.strip().lower()[:100]
+    if not q:
+        return []
+    low, high = prefix_range(q)
+    key = name_key(model)
+    rows = db.session.execute(
+        db.select(model.id, model.name, model.city, model.state).where(
+            key >= low, key < high, *live(model)
+        ).order_by(key, model.id).limit(current_app.config['AUTOCOMPLETE_LIMIT'])
+    ).all()
+    return [
+        {'id': r.id, 'name': r.name, 'city': r.city, 'state': r.state} for r in rows
+    ]
+
+
+def resolve(model, name):
+    # id of the live venue (or artist) named `name`, case-insensitively,
+    # the oldest one if several are; None when there is none
+    name = name.strip().lower()
+    if not name:
+        return None
+    return db.session.scalar(
+        db.select(model.id).where(name_key(model) == name, *live(model))
+        .order_by(model.id).limit(1)
+    )
+
+
+def autocomplete_response(model):
+    response = json_response(matches(model, request.args.get('q', '')))
+    response.headers['Cache-Control'] = cache_control_for(request.endpoint)
+    return response
+
+
+@autocomplete_bp.route('/artists')
+def artists():
+    return autocomplete_response(Artist)
+
+
+@autocomplete_bp.route('/venues')
+def venues():
+    return autocomplete_response(Venue)
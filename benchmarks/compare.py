@@ -0,0 +1,78 @@
+# ----------------------------------------------------------------------------#
+# Compares two benchmarks.endpoints result files.
+#
+#   python -m benchmarks.compare baseline.json bench.json
+#   python -m benchmarks.compare baseline.json bench.json --max-slowdown 0.25
+#
+# Exits non-zero when, for any request of the baseline,
+#
+#   - it is missing from the new results or answers another status,
+#   - it runs more SQL statements, or
+#   - its median latency grew by more than --max-slowdown (a fraction) and
+#     by more than --min-delta-ms, which keeps sub-millisecond noise out.
+#
+# Compare results from the same machine and data set (see the meta block).
+# ----------------------------------------------------------------------------#
+
+import argparse
+import json
+import sys
+
+META_KEYS = ('database', 'venues', 'artists', 'shows')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(baseline, current, max_slowdown, min_delta_ms):
+    # (request, message) for every regression, and the table rows
+    failures = []
+    rows = []
+    for key, old in sorted(baseline['results'].items()):
+        new = current['results'].get(key)
+        if new is None:
+            failures.append((key, 'missing from the new results'))
+            continue
+        change = (new['p50_ms'] - old['p50_ms']) / old['p50_ms'] if old['p50_ms'] else 0.0
+        rows.append((key, old, new, change))
+        if new['status'] != old['status']:
+            failures.append((key, 'status {} -> {}'.format(old['status'], new['status'])))
+        if new['queries'] > old['queries']:
+            failures.append((key, '{} -> {} queries'.format(old['queries'], new['queries'])))
+        if change > max_slowdown and new['p50_ms'] - old['p50_ms'] > min_delta_ms:
+            failures.append((key, 'median {:.2f} -> {:.2f} ms ({:+.0%})'.format(
+                old['p50_ms'], new['p50_ms'], change
+            )))
+    return failures, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail on benchmark regressions.')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--max-slowdown', type=float, default=0.2)
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    for key in META_KEYS:
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print('warning: {} differs ({} vs {})'.format(
+                key, baseline['meta'].get(key), current['meta'].get(key)
+            ))
+
+    failures, rows = regressions(baseline, current, args.max_slowdown, args.min_delta_ms)
+    print('{:>9} {:>9} {:>7} {:>9}  {}'.format('base ms', 'new ms', 'change', 'queries', 'request'))
+    for key, old, new, change in rows:
+        print('{:9.2f} {:9.2f} {:+7.0%} {:>4}->{:<4}  {}'.format(
+            old['p50_ms'], new['p50_ms'], change, old['queries'], new['queries'], key
+        ))
+    for key, message in failures:
+        print('FAIL: {}: {}'.format(key, message))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# ----------------------------------------------------------------------------#
+# Synthetic data for the benchmarks.
+#
+# Fills a database with venues, artists and shows at a given scale, the same
+# rows for the same --seed and --anchor (the day the shows are spread
+# around: half of them past, half upcoming). Venues and artists default to
+# one per 50 and 25 shows. Shows are laid out in SLOT-long time slots that
+# use each venue and artist at most once, so the data satisfies the
+# scheduling constraints (scheduling.py) at any scale.
+#
+#   python -m benchmarks.data --shows 1000 --database-url sqlite:////tmp/fyyur-bench.db --create
+#   python -m benchmarks.data --shows 1000000 --database-url postgresql:///fyyur_bench --reset
+#
+# Postgres databases must be migrated first (`flask db upgrade`); --create
+# builds the tables with db.create_all(), which is enough for SQLite.
+# ----------------------------------------------------------------------------#
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import config as settings
+import wsgi
+from models import db, Venue, Artist, Show, Job, GENRES
+
+SLOT = timedelta(hours=6)
+BATCH_SIZE = 10000
+
+PLACES = (
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('Oakland', 'CA'),
+    ('New York', 'NY'), ('Brooklyn', 'NY'), ('Chicago', 'IL'),
+    ('Austin', 'TX'), ('Houston', 'TX'), ('Seattle', 'WA'),
+    ('Portland', 'OR'), ('Nashville', 'TN'), ('New Orleans', 'LA'),
+)
+ADJECTIVES = (
+    'Blue', 'Velvet', 'Golden', 'Electric', 'Midnight', 'Silver', 'Wild',
+    'Crimson', 'Lucky', 'Hollow', 'Neon', 'Quiet', 'Rusty', 'Sunny',
+)
+VENUE_NOUNS = ('Room', 'Hall', 'Lounge', 'Garage', 'Club', 'Theatre', 'Cellar', 'Loft')
+ARTIST_NOUNS = ('Petals', 'Band', 'Quartet', 'Collective', 'Sax', 'Echoes', 'Riders', 'Kings')
+
+
+def create_app(database_url, **overrides):
+    # the testing profile (no cache, no CSRF) on the given database
+    testing = settings.PROFILES['testing']
+    config = {name: getattr(testing, name) for name in dir(testing) if name.isupper()}
+    config['SQLALCHEMY_DATABASE_URI'] = database_url
+    if not database_url.startswith('sqlite'):
+        config['SEARCH_BACKEND'] = 'postgres'
+    config.update(overrides)
+    return wsgi.create_app(config)
+
+
+def default_anchor():
+    return datetime.combine(datetime.now().date(), datetime.min.time())
+
+
+def scale(shows, venues=None, artists=None):
+    return venues or max(10, shows // 50), artists or max(20, shows // 25)
+
+
+def _name(rng, nouns, number):
+    return '{} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(nouns), number)
+
+
+def _entity(rng, nouns, number, anchor):
+    city, state = rng.choice(PLACES)
+    return {
+        'id': number,
+        'name': _name(rng, nouns, number),
+        'city': city,
+        'state': state,
+        'phone': '555-{:03d}-{:04d}'.format(rng.randrange(1000), number % 10000),
+        'genres': sorted(rng.sample(GENRES, rng.randint(1, 3))),
+        'seeking_talent': rng.random() < 0.3,
+        'updated_at': anchor,
+    }
+
+
+def venue_rows(rng, count, anchor):
+    for number in range(1, count + 1):
+        row = _entity(rng, VENUE_NOUNS, number, anchor)
+        row['address'] = '{} Main St'.format(number)
+        yield row
+
+
+def artist_rows(rng, count, anchor):
+    for number in range(1, count + 1):
+        yield _entity(rng, ARTIST_NOUNS, number, anchor)
+
+
+def show_rows(rng, count, venues, artists, anchor):
+    per_slot = max(1, min(venues, artists) // 4)
+    slots = -(-count // per_slot)
+    first = anchor - SLOT * (slots // 2)
+    for slot in range(slots):
+        start = first + SLOT * slot
+        size = min(per_slot, count - slot * per_slot)
+        for venue_id, artist_id in zip(
+            rng.sample(range(1, venues + 1), size), rng.sample(range(1, artists + 1), size)
+        ):
+            yield {
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'dateshow': start + timedelta(minutes=rng.randrange(0, 120, 15)),
+                'duration_minutes': rng.choice((60, 90, 120)),
+            }
+
+
+def insert(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(db.insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+
+
+def reset():
+    for model in (Job, Show, Artist, Venue):
+        db.session.execute(db.delete(model))
+    db.session.commit()
+
+
+def generate(shows, seed=0, anchor=None, venues=None, artists=None):
+    # inserts the data set into empty tables, then fills the show counters
+    # and the search index; returns (venues, artists, shows)
+    import counters
+    import search
+
+    anchor = anchor or default_anchor()
+    venues, artists = scale(shows, venues, artists)
+    rng = random.Random(seed)
+
+    insert(Venue, venue_rows(rng, venues, anchor))
+    insert(Artist, artist_rows(rng, artists, anchor))
+    db.session.commit()
+    insert(Show, show_rows(rng, shows, venues, artists, anchor))
+    db.session.commit()
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # ids were given explicitly; move the sequences past them
+        for model in (Venue, Artist):
+            db.session.execute(db.text(
+                "SELECT setval(pg_get_serial_sequence('\"{0}\"', 'id'), "
+                "(SELECT max(id) FROM \"{0}\"))".format(model.__tablename__)
+            ))
+    counters.refresh(Venue, range(1, venues + 1))
+    counters.refresh(Artist, range(1, artists + 1))
+    for model in (Venue, Artist):
+        # the counter updates bumped it
+        db.session.execute(db.update(model).values(updated_at=anchor))
+    search.get_backend().reindex([Venue, Artist])
+    db.session.commit()
+    return venues, artists, shows
+
+
+def sample():
+    # ids and terms the endpoint benchmarks and the Locust profile ask for:
+    # the busiest venue and artist, and the city and genres of that venue
+    venue = db.session.execute(
+        db.select(Venue).order_by(Venue.shows_count.desc(), Venue.id).limit(1)
+    ).scalar_one()
+    artist_id = db.session.scalar(
+        db.select(Artist.id).order_by(Artist.shows_count.desc(), Artist.id).limit(1)
+    )
+    return {
+        'venue_id': venue.id,
+        'artist_id': artist_id,
+        'city': venue.city,
+        'state': venue.state,
+        'genre': venue.genres[0],
+        'prefix': venue.name[:3].lower(),
+        'term': venue.name.split()[1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a database with synthetic Fyyur data.')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--shows', type=int, default=1000)
+    parser.add_argument('--venues', type=int, help='default: shows / 50')
+    parser.add_argument('--artists', type=int, help='default: shows / 25')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--anchor', type=datetime.fromisoformat,
+                        help='ISO date the shows are centred on (default: today)')
+    parser.add_argument('--create', action='store_true', help='create the tables first')
+    parser.add_argument('--reset', action='store_true', help='delete existing rows first')
+    args = parser.parse_args()
+
+    with create_app(args.database_url).app_context():
+        if args.create:
+            db.create_all()
+        if args.reset:
+            reset()
+        if db.session.scalar(db.select(db.func.count()).select_from(Venue)):
+            print('{} already has venues; use --reset'.format(args.database_url))
+            return 1
+        started = time.perf_counter()
+        counts = generate(args.shows, args.seed, args.anchor, args.venues, args.artists)
+        print('{} venues, {} artists, {} shows in {:.1f} s'.format(
+            *counts, time.perf_counter() - started
+        ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
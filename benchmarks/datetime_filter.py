@@ -0,0 +1,61 @@
+# ----------------------------------------------------------------------------#
+# Micro-benchmark for the `datetime` Jinja filter.
+#
+# Compares the previous implementation (strftime in the view, then
+# dateutil.parser.parse + babel.dates.format_datetime in the filter) with
+# app.format_datetime on datetime objects and on ISO strings, for one
+# 500-show page worth of tiles.
+#
+#   python -m benchmarks.datetime_filter
+# ----------------------------------------------------------------------------#
+
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import format_datetime
+
+TILES = 500
+REPEAT = 20
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def main():
+    start = datetime(2026, 1, 1, 20, 0)
+    dates = [start + timedelta(hours=7 * i) for i in range(TILES)]
+    iso_strings = [d.isoformat() for d in dates]
+
+    cases = [
+        ('legacy (strftime + dateutil + babel)', lambda: [
+            legacy_format_datetime(d.strftime("%Y-%m-%d %H:%M:%S"), 'full') for d in dates
+        ]),
+        ('format_datetime(datetime)', lambda: [
+            format_datetime(d, 'full') for d in dates
+        ]),
+        ('format_datetime(ISO string)', lambda: [
+            format_datetime(s, 'full') for s in iso_strings
+        ]),
+    ]
+
+    assert cases[0][1]() == cases[1][1]() == cases[2][1]()
+
+    baseline = None
+    for name, case in cases:
+        best = min(timeit.repeat(case, number=1, repeat=REPEAT))
+        baseline = baseline or best
+        print('{:<40} {:8.2f} ms / {} tiles  ({:.1f}x)'.format(
+            name, best * 1000, TILES, baseline / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# ----------------------------------------------------------------------------#
+# Per-endpoint benchmark.
+#
+# Requests every page and API endpoint through the Flask test client
+# against a database filled by benchmarks.data, and records per endpoint
+# the latency (median, p95, min over --iterations after --warmup requests)
+# and the number of SQL statements of one request. The testing profile is
+# used, so no cache answers in place of the database. Results are written
+# as JSON for benchmarks.compare.
+#
+#   python -m benchmarks.endpoints --database-url sqlite:////tmp/fyyur-bench.db \
+#       --output bench.json
+#   python -m benchmarks.endpoints ... --only venues. --writes
+#
+# Write endpoints only run with --writes, as they change the data set;
+# deleting, restoring and purging venues never do. Every other GET or POST
+# route of the app must have a case below, otherwise the run fails.
+# ----------------------------------------------------------------------------#
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta
+from time import perf_counter
+from urllib.parse import urlencode
+
+from sqlalchemy import event
+
+from benchmarks.data import create_app, sample
+from models import db, Venue, Artist, Show
+
+Case = namedtuple('Case', ['endpoint', 'method', 'url', 'data', 'write'])
+
+SKIPPED = (
+    'static', 'venues.delete_venue',
+    'api_v1.delete_venue', 'api_v1.restore_venue', 'api_v1.purge_venue',
+)
+
+
+def cases(s):
+    # (endpoint, method, url, form or JSON data, write) for the sample `s`
+    # of benchmarks.data.sample
+    def get(endpoint, url, **args):
+        if args:
+            url += '?' + urlencode(args, safe=',')
+        return Case(endpoint, 'GET', url, None, False)
+
+    def post(endpoint, url, data, write=False):
+        return Case(endpoint, 'POST', url, data, write)
+
+    venue, artist = s['venue_id'], s['artist_id']
+    form = {
+        'city': s['city'], 'state': s['state'], 'address': '1 Bench St',
+        'phone': '555-000-0000', 'image_link': '', 'genres': [s['genre']],
+        'facebook_link': '', 'website': '', 'seeking_talent': 'No',
+        'seeking_description': '',
+    }
+    start = (datetime.now() + timedelta(days=3650)).strftime('%Y-%m-%d %H:%M:%S')
+    return [
+        get('main.index', '/'),
+        get('venues.venues', '/venues'),
+        get('venues.venues', '/venues', genre=s['genre'], state=s['state']),
+        get('venues.show_venue', '/venues/{}'.format(venue)),
+        get('venues.search_venues', '/venues/search', search_term=s['term']),
+        post('venues.search_venues', '/venues/search', {'search_term': s['term']}),
+        get('venues.create_venue_form', '/venues/create'),
+        get('venues.edit_venue', '/venues/{}/edit'.format(venue)),
+        get('artists.artists', '/artists'),
+        get('artists.artists', '/artists', sort='upcoming', city=s['city']),
+        get('artists.show_artist', '/artists/{}'.format(artist)),
+        get('artists.search_artists', '/artists/search', search_term=s['term']),
+        get('artists.create_artist_form', '/artists/create'),
+        get('artists.edit_artist', '/artists/{}/edit'.format(artist)),
+        get('shows.shows', '/shows'),
+        get('shows.create_shows', '/shows/create'),
+        get('autocomplete.venues', '/autocomplete/venues', q=s['prefix']),
+        get('autocomplete.artists', '/autocomplete/artists', q=s['prefix']),
+        get('api_v1.venues', '/api/v1/venues', fields='id,name,city'),
+        get('api_v1.venue', '/api/v1/venues/{}'.format(venue)),
+        get('api_v1.artists', '/api/v1/artists'),
+        get('api_v1.artist', '/api/v1/artists/{}'.format(artist), fields='name,upcoming_shows'),
+        get('api_v1.shows', '/api/v1/shows', limit=50),
+        get('api_v1.batch', '/api/v1/batch', venues=venue, artists=artist),
+        post('api_v1.check_shows', '/api/v1/shows/check', {'bookings': [
+            {'venue_id': venue, 'artist_id': artist, 'start_time': start}
+        ]}),
+        get('export', '/export/venues.jsonl'),
+        get('export', '/export/shows.csv'),
+        post('venues.create_venue_submission', '/venues/create',
+             dict(form, name='Bench Venue'), write=True),
+        post('venues.edit_venue_submission', '/venues/{}/edit'.format(venue),
+             dict(form, name='Bench Venue'), write=True),
+        post('artists.create_artist_submission', '/artists/create',
+             dict(form, name='Bench Artist'), write=True),
+        post('artists.edit_artist_submission', '/artists/{}/edit'.format(artist),
+             dict(form, name='Bench Artist'), write=True),
+        post('shows.create_show_submission', '/shows/create', {
+            'venue_id': venue, 'artist_id': artist, 'start_time': start,
+        }, write=True),
+    ]
+
+
+def uncovered(app, all_cases):
+    # endpoints of the app without a case
+    covered = set(case.endpoint for case in all_cases)
+    return sorted(
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if rule.endpoint not in covered and rule.endpoint not in SKIPPED
+    )
+
+
+class QueryCounter(object):
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, *args):
+        self.count += 1
+
+
+def request(client, case):
+    if case.method == 'GET':
+        return client.get(case.url)
+    if case.endpoint.startswith('api_v1.'):
+        return client.post(case.url, json=case.data)
+    return client.post(case.url, data=case.data)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def measure(client, counter, case, iterations, warmup):
+    for _ in range(warmup):
+        request(client, case)
+    timings = []
+    for _ in range(iterations):
+        counter.count = 0
+        started = perf_counter()
+        response = request(client, case)
+        response.get_data()
+        timings.append((perf_counter() - started) * 1000)
+        queries = counter.count
+        status = response.status_code
+    return {
+        'endpoint': case.endpoint,
+        'method': case.method,
+        'status': status,
+        'queries': queries,
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'min_ms': round(min(timings), 3),
+    }
+
+
+def run(database_url, iterations=20, warmup=3, only=None, writes=False):
+    app = create_app(database_url)
+    results = {}
+    with app.app_context():
+        all_cases = cases(sample())
+        missing = uncovered(app, all_cases)
+        if missing:
+            raise SystemExit('no benchmark case for: ' + ', '.join(missing))
+        meta = {
+            'database': db.engine.dialect.name,
+            'venues': db.session.scalar(db.select(db.func.count()).select_from(Venue)),
+            'artists': db.session.scalar(db.select(db.func.count()).select_from(Artist)),
+            'shows': db.session.scalar(db.select(db.func.count()).select_from(Show)),
+            'iterations': iterations,
+            'python': platform.python_version(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+        }
+        counter = QueryCounter(db.engine)
+
+    client = app.test_client()
+    for case in all_cases:
+        if case.write and not writes:
+            continue
+        if only and not case.endpoint.startswith(only):
+            continue
+        key = '{} {}'.format(case.method, case.url)
+        results[key] = measure(client, counter, case, iterations, warmup)
+    return {'meta': meta, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and query count per endpoint.')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', help='endpoint prefix, e.g. venues. or api_v1.')
+    parser.add_argument('--writes', action='store_true', help='include write endpoints')
+    parser.add_argument('--output', help='JSON results file (default: stdout only)')
+    args = parser.parse_args()
+
+    report = run(args.database_url, args.iterations, args.warmup, args.only, args.writes)
+
+    print('{:>9} {:>9} {:>7} {:>6}  {}'.format('p50 ms', 'p95 ms', 'queries', 'status', 'request'))
+    for key, result in report['results'].items():
+        print('{p50_ms:9.2f} {p95_ms:9.2f} {queries:7d} {status:6d}  '.format(**result) + key)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    failed = [key for key, result in report['results'].items() if result['status'] >= 500]
+    for key in failed:
+        print('FAIL: {} answered {}'.format(key, report['results'][key]['status']))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# ----------------------------------------------------------------------------#
+# Cold-start benchmark: the imports done by `wsgi.create_app()`.
+#
+# Boots the app in a fresh interpreter under `python -X importtime` and
+# reports the total import time (median of --runs) and the slowest modules.
+# Exits non-zero when
+#
+#   - one of LAZY_MODULES was imported while booting (it must only be
+#     imported on first use), or
+#   - the median total exceeds --budget-ms.
+#
+#   python -m benchmarks.importtime
+#   python -m benchmarks.importtime --runs 9 --budget-ms 800
+#
+# tests/test_importtime.py runs the first check on every test run.
+# ----------------------------------------------------------------------------#
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = "import wsgi; wsgi.create_app('testing')"
+
+# heavy dependencies that must stay out of worker boot
+LAZY_MODULES = (
+    'alembic', 'flask_migrate', 'babel', 'dateutil', 'wtforms', 'flask_wtf', 'forms'
+)
+
+
+def boot_imports():
+    # {module: (self us, cumulative us)} for one cold boot
+    env = dict(os.environ, FYYUR_CONFIG='testing')
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        cwd=ROOT, env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+        universal_newlines=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def eager_imports(modules):
+    # the LAZY_MODULES among `modules`, as top-level package names
+    return sorted(set(
+        name.split('.')[0] for name in modules
+        if name.split('.')[0] in LAZY_MODULES
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time benchmark for app boot.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1000.0)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [boot_imports() for _ in range(args.runs)]
+    totals = [sum(s for s, _ in modules.values()) / 1000.0 for modules in runs]
+    total = statistics.median(totals)
+
+    last = runs[-1]
+    print('{:>10}  {}'.format('self ms', 'module'))
+    slowest = sorted(last.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, _) in slowest[:args.top]:
+        print('{:10.1f}  {}'.format(self_us / 1000.0, name))
+    print('\n{} modules, {:.0f} ms total (median of {} runs, min {:.0f} ms)'.format(
+        len(last), total, args.runs, min(totals)
+    ))
+
+    failures = []
+    eager = eager_imports(last)
+    if eager:
+        failures.append('imported at boot: ' + ', '.join(eager))
+    if total > args.budget_ms:
+        failures.append('{:.0f} ms is over the {:.0f} ms budget'.format(total, args.budget_ms))
+
+    for failure in failures:
+        print('FAIL: ' + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
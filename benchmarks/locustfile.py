@@ -0,0 +1,73 @@
+# ----------------------------------------------------------------------------#
+# Load profile for Locust (pip install locust), against a running app
+# serving a database filled by benchmarks.data.
+#
+#   locust -f benchmarks/locustfile.py --host http://localhost:8000 \
+#       --headless --users 50 --spawn-rate 10 --run-time 2m --csv bench
+#
+# Visitors mostly browse: the list pages, venue and artist pages, searches
+# and facets; a few use the API and the autocomplete of the new show form.
+# Each user picks its ids from the first page of the API lists.
+# ----------------------------------------------------------------------------#
+
+import random
+
+from locust import HttpUser, between, task
+
+# a few of the values benchmarks.data draws from
+GENRES = ('Blues', 'Jazz', 'Folk', 'Rock n Roll', 'Soul')
+STATES = ('CA', 'NY', 'TX')
+TERMS = ('Room', 'Hall', 'Velvet', 'Blue', 'Club')
+
+
+class Visitor(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        self.venue_ids = self.ids('/api/v1/venues?fields=id&limit=100')
+        self.artist_ids = self.ids('/api/v1/artists?fields=id&limit=100')
+
+    def ids(self, url):
+        response = self.client.get(url, name=url.split('?')[0])
+        return [item['id'] for item in response.json()['data']] or [1]
+
+    @task(10)
+    def venue_page(self):
+        self.client.get('/venues/{}'.format(random.choice(self.venue_ids)), name='/venues/[id]')
+
+    @task(10)
+    def artist_page(self):
+        self.client.get('/artists/{}'.format(random.choice(self.artist_ids)), name='/artists/[id]')
+
+    @task(5)
+    def shows(self):
+        self.client.get('/shows')
+
+    @task(5)
+    def venues(self):
+        self.client.get('/venues')
+
+    @task(5)
+    def artists(self):
+        self.client.get('/artists')
+
+    @task(4)
+    def facets(self):
+        self.client.get('/venues', name='/venues?genre&state', params={
+            'genre': random.choice(GENRES), 'state': random.choice(STATES)
+        })
+
+    @task(3)
+    def search(self):
+        self.client.post('/venues/search', data={'search_term': random.choice(TERMS)},
+                         name='/venues/search')
+
+    @task(2)
+    def autocomplete(self):
+        self.client.get('/autocomplete/artists', params={'q': random.choice('abcdefghilmnrsw')},
+                        name='/autocomplete/artists')
+
+    @task(2)
+    def api_venue(self):
+        self.client.get('/api/v1/venues/{}'.format(random.choice(self.venue_ids)),
+                        name='/api/v1/venues/[id]')
@@ -0,0 +1,129 @@
+# ----------------------------------------------------------------------------#
+# Cache.
+#
+# Read-through cache for assembled view data (venue and artist detail
+# pages, facet counts). CACHE_BACKEND in config.py selects the store:
+#
+#   'lru'   -- in-process LRU with per-entry TTL (default)
+#   'redis' -- any Redis-compatible server at CACHE_REDIS_URL; needs the
+#              `redis` package
+#   'null'  -- caching disabled
+#
+# Detail page entries are keyed on the page's ETag (conditional.py), built
+# from the database: once a write changes the page, every process computes
+# a new key and misses, whatever the backend, and the old entries expire.
+# Nothing needs to delete them. Facet counts (facets.py) are invalidated by
+# the write routes of venues.py and artists.py instead; with 'lru' that only
+# reaches the process that handled the write, and the other processes keep
+# their counts for up to FACETS_CACHE_TTL.
+# ----------------------------------------------------------------------------#
+
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from time import monotonic
+
+from flask import current_app
+
+
+def _json_default(value):
+    # datetimes come back as ISO strings, which the `datetime` filter accepts
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+class NullCache(object):
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+class LRUCache(object):
+
+    def __init__(self, maxsize=1024, default_ttl=300):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self.lock:
+            self.entries[key] = (value, monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+
+class RedisCache(object):
+
+    def __init__(self, url, default_ttl=300, prefix='fyyur:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(
+            self.prefix + key, json.dumps(value, default=_json_default), ex=max(int(ttl), 1)
+        )
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+
+def venue_key(venue_id, etag):
+    return 'venue:{}:{}'.format(venue_id, etag)
+
+
+def artist_key(artist_id, etag):
+    return 'artist:{}:{}'.format(artist_id, etag)
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+def init_app(app):
+    backend = app.config.get('CACHE_BACKEND', 'lru')
+    default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+
+    if backend == 'redis':
+        cache = RedisCache(app.config['CACHE_REDIS_URL'], default_ttl)
+    elif backend == 'lru':
+        cache = LRUCache(app.config.get('CACHE_MAXSIZE', 1024), default_ttl)
+    else:
+        cache = NullCache()
+
+    app.extensions['cache'] = cache
@@ -0,0 +1,127 @@
+# ----------------------------------------------------------------------------#
+# HTTP conditional requests.
+#
+#   @app.route('/venues')
+#   @conditional(venues_version)
+#   def venues(): ...
+#
+# Before the view runs, the validator (a function of the view arguments,
+# see the *_version queries in queries.py) returns a few cheap aggregates --
+# latest updated_at values and row counts. They are hashed into an ETag,
+# together with the endpoint, the query string and HTTP_CACHE_VERSION; the
+# latest timestamp becomes Last-Modified. A matching If-None-Match (or,
+# without one, If-Modified-Since) gets a 304 and the view never runs.
+#
+# Counts are part of the ETag because deletes do not move any timestamp;
+# Last-Modified alone cannot see them, so clients that only send
+# If-Modified-Since may keep a deleted row until max-age runs out.
+#
+# The view runs with the ETag in g.etag. A view that caches what it renders
+# keys the cache on it (see cache.py), so the body it answers with is always
+# the one the ETag stands for, whichever process cached it.
+#
+# Cache-Control comes from HTTP_CACHE_CONTROL (per endpoint) or
+# HTTP_CACHE_CONTROL_DEFAULT. Responses carrying flashed messages are
+# rendered normally and marked no-store.
+# ----------------------------------------------------------------------------#
+
+import hashlib
+import inspect
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def cache_control_for(endpoint):
+    config = current_app.config
+    return config.get('HTTP_CACHE_CONTROL', {}).get(
+        endpoint, config.get('HTTP_CACHE_CONTROL_DEFAULT', 'no-cache')
+    )
+
+
+def validators(version):
+    # (etag, last_modified) for the aggregates returned by a validator
+    timestamps = [v for v in version if isinstance(v, datetime)]
+    last_modified = max(timestamps) if timestamps else None
+    etag = make_etag(
+        current_app.config.get('HTTP_CACHE_VERSION'),
+        request.endpoint, request.query_string.decode(), *version
+    )
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def finish(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control_for(request.endpoint)
+    return response
+
+
+def no_store(response):
+    # a one-off message: neither a 304 nor a shared copy will do
+    response = make_response(response)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def conditional(validator):
+    # validator and view are either both plain functions or both coroutine
+    # functions (aio.py)
+
+    def decorator(view):
+
+        @wraps(view)
+        def wrapper(**kwargs):
+            if '_flashes' in session:
+                return no_store(view(**kwargs))
+
+            version = validator(**kwargs)
+            if version is None:
+                # e.g. unknown id: let the view answer (404)
+                return view(**kwargs)
+
+            etag, last_modified = validators(version)
+            g.etag = etag
+            if not_modified(etag, last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            return finish(response, etag, last_modified)
+
+        @wraps(view)
+        async def async_wrapper(**kwargs):
+            if '_flashes' in session:
+                return no_store(await view(**kwargs))
+
+            version = await validator(**kwargs)
+            if version is None:
+                return await view(**kwargs)
+
+            etag, last_modified = validators(version)
+            g.etag = etag
+            if not_modified(etag, last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(await view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            return finish(response, etag, last_modified)
+
+        if inspect.iscoroutinefunction(view):
+            return async_wrapper
+        return wrapper
+
+    return decorator
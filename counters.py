@@ -0,0 +1,152 @@
+# ----------------------------------------------------------------------------#
+# Show counters.
+#
+# Venue and Artist carry denormalized show counters, so that list and
+# detail pages never count rows in "Show":
+#
+#   shows_count            all shows
+#   upcoming_shows_count   shows starting at or after the last roll
+#   next_show_at           the first of those upcoming shows
+#   last_show_at           the latest show before it
+#
+# Upcoming is told from past by the database's clock, as in the show lists
+# (queries.py), so a page's counts and lists split shows at the same time.
+# refresh() recomputes them from "Show" for the given rows: background jobs
+# (jobs.py, deletion.py) call it after a show is booked or a venue deleted
+# or restored, and bulk imports after each batch. Time alone moves a show
+# from upcoming to past, so
+#
+#   flask counters roll          (every minute, e.g. from cron)
+#
+# recomputes the venues and artists whose next_show_at has passed -- an
+# index range scan -- and until it runs, upcoming counts may include shows
+# that started since the last roll.
+#
+#   flask counters check [--fix]
+#
+# rolls, then compares every counter with a fresh count and exits non-zero
+# when one is off (--fix recomputes those instead). Counter updates bump
+# updated_at, so the ETags of the pages showing them change too.
+#
+# Shows of soft-deleted venues are not counted for their artists, and the
+# counters of deleted venues are left as they were.
+# ----------------------------------------------------------------------------#
+
+import sys
+
+import click
+from flask.cli import AppGroup
+
+from models import db, Venue, Artist, Show, live
+
+BATCH_SIZE = 500
+
+
+def _owner_fk(model):
+    return Show.venue_id if model is Venue else Show.artist_id
+
+
+def computed(model, now):
+    # {column: correlated subquery} recomputing each counter from "Show"
+    owned = [_owner_fk(model) == model.id]
+    if model is Artist:
+        owned.append(
+            db.select(Venue.id).where(Venue.id == Show.venue_id, *live(Venue)).exists()
+        )
+
+    def scalar(aggregate, *conditions):
+        return db.select(aggregate).where(*owned, *conditions).scalar_subquery()
+
+    return {
+        'shows_count': scalar(db.func.count(Show.id)),
+        'upcoming_shows_count': scalar(db.func.count(Show.id), Show.dateshow >= now),
+        'next_show_at': scalar(db.func.min(Show.dateshow), Show.dateshow >= now),
+        'last_show_at': scalar(db.func.max(Show.dateshow), Show.dateshow < now),
+    }
+
+
+def database_now():
+    # the database's clock, which the show lists split past from upcoming
+    # shows with (queries.py); the counters use it too, so that a list and
+    # its count agree
+    return db.session.scalar(db.select(db.func.now()))
+
+
+def _update(model, *conditions):
+    return db.update(model).where(*conditions).execution_options(
+        synchronize_session=False
+    )
+
+
+def refresh(model, ids, now=None):
+    # recomputes the counters of the given venues (or artists); the caller
+    # commits
+    ids = sorted(set(ids))
+    now = database_now() if now is None else now
+    for start in range(0, len(ids), BATCH_SIZE):
+        db.session.execute(
+            _update(model, model.id.in_(ids[start:start + BATCH_SIZE])).values(
+                **computed(model, now)
+            )
+        )
+
+
+def roll(now=None):
+    # moves started shows from upcoming to past; returns the number of
+    # venues and artists updated
+    now = database_now() if now is None else now
+    rolled = 0
+    for model in (Venue, Artist):
+        while True:
+            ids = db.session.scalars(
+                db.select(model.id).where(model.next_show_at < now, *live(model))
+                .limit(BATCH_SIZE)
+            ).all()
+            if not ids:
+                break
+            refresh(model, ids, now)
+            db.session.commit()
+            rolled += len(ids)
+    return rolled
+
+
+def mismatches(model, now):
+    # ids whose stored counters differ from a fresh count
+    return db.session.scalars(
+        db.select(model.id).where(*live(model)).where(db.or_(*[
+            getattr(model, name).is_distinct_from(value)
+            for name, value in computed(model, now).items()
+        ])).order_by(model.id)
+    ).all()
+
+
+def init_app(app):
+    counters_cli = AppGroup('counters', help='Maintain the show counters of venues and artists.')
+
+    @counters_cli.command('roll', help='Move shows that have started from upcoming to past.')
+    def roll_command():
+        click.echo('{} counters rolled.'.format(roll()))
+
+    @counters_cli.command('check', help='Compare the counters with a fresh count.')
+    @click.option('--fix', is_flag=True, help='Recompute the counters that are off.')
+    def check_command(fix):
+        now = database_now()
+        roll(now)
+        off = False
+        for model in (Venue, Artist):
+            ids = mismatches(model, now)
+            if not ids:
+                continue
+            off = True
+            click.echo('{}: {} off (ids {}{})'.format(
+                model.__tablename__, len(ids),
+                ', '.join(map(str, ids[:20])), ', ...' if len(ids) > 20 else ''
+            ))
+            if fix:
+                refresh(model, ids, now)
+                db.session.commit()
+        if off and not fix:
+            sys.exit(1)
+        click.echo('Counters fixed.' if off else 'Counters are consistent.')
+
+    app.cli.add_command(counters_cli)
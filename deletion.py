@@ -0,0 +1,196 @@
+# ----------------------------------------------------------------------------#
+# Venue deletion.
+#
+#   DELETE /venues/<id>, DELETE /api/v1/venues/<id>
+#   POST   /api/v1/venues/<id>/restore | /api/v1/venues/<id>/purge
+#   flask --app wsgi venues deleted | restore ID | purge [ID...] [--expired]
+#
+# Deleting a venue sets its deleted_at and nothing else: a single-row
+# UPDATE, which takes no lock on "Show" and does not wait for the venue's
+# shows to go. From then on the venue is left out of every list, page,
+# search, autocomplete, facet and API response (models.live(), matched by
+# the partial indexes on "Venue"), its shows with it. The venue_deleted
+# job recomputes its artists' show counters without them (venue_restored,
+# with them), and the callers drop the cached facets and fragments involved once they commit
+# (invalidate()). Cached detail pages need nothing: their keys hold the
+# page's ETag (cache.py), which the delete changes.
+#
+# Until it is purged the venue can be restored as it was, shows included.
+# Purging queues a venue_purge job, which deletes the venue's shows
+# VENUE_PURGE_BATCH_SIZE at a time, one short transaction per batch,
+# queueing itself again until none is left, and then the venue row.
+# `purge --expired`, e.g. daily from cron, purges the venues deleted more
+# than VENUE_PURGE_AFTER_DAYS ago. A venue restored while its purge runs
+# comes back without the shows purged so far.
+#
+# Shows of a deleted venue still hold their artists' time (the exclusion
+# constraints on "Show", scheduling.py) until they are purged.
+# ----------------------------------------------------------------------------#
+
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+import counters
+import facets
+import fragments
+import jobs
+import search
+from models import db, Venue, Artist, Show, live, utcnow
+
+
+def _update(*conditions):
+    return db.update(Venue).where(*conditions).execution_options(
+        synchronize_session=False
+    )
+
+
+def _artist_ids(venue_id):
+    return [
+        a for a, in db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    ]
+
+
+def delete(venue_id):
+    # soft deletes a venue in the current transaction; the caller commits,
+    # then calls invalidate(). Returns the venue's (state, city), or None
+    # when there is no such venue or it is deleted already.
+    area = db.session.execute(
+        _update(Venue.id == venue_id, *live(Venue)).values(deleted_at=utcnow())
+        .returning(Venue.state, Venue.city)
+    ).first()
+    if area is None:
+        return None
+    jobs.enqueue('venue_deleted', {'venue_id': venue_id})
+    return tuple(area)
+
+
+def restore(venue_id):
+    # undoes delete(); the caller commits, then calls invalidate(). Returns
+    # the venue's (state, city), or None when there is no such deleted
+    # venue.
+    area = db.session.execute(
+        _update(Venue.id == venue_id, Venue.deleted_at.isnot(None)).values(deleted_at=None)
+        .returning(Venue.state, Venue.city)
+    ).first()
+    if area is None:
+        return None
+    jobs.enqueue('venue_restored', {'venue_id': venue_id})
+    return tuple(area)
+
+
+@jobs.task('venue_restored')
+@jobs.task('venue_deleted')
+def venue_changed(venue_id):
+    # after a delete or restore: recomputes the counters of the venue's
+    # artists, which leave out deleted venues, and updates the search index.
+    # Works from the venue's current state, so the jobs of a delete and a
+    # quick restore may run in any order.
+    venue = db.session.get(Venue, venue_id)
+    if venue is None or venue.deleted_at is not None:
+        search.get_backend().remove(Venue(id=venue_id))
+    else:
+        # not rolled while deleted
+        counters.refresh(Venue, [venue_id])
+        search.get_backend().index(venue)
+    counters.refresh(Artist, _artist_ids(venue_id))
+
+
+def invalidate(venue_id, area):
+    # drops the cached facets and fragments a delete or restore changed;
+    # detail pages are keyed on their ETag (cache.py)
+    facets.invalidate(Venue)
+    fragments.invalidate(('venue', venue_id), ('venue-area', area))
+
+
+def purge(venue_id):
+    # queues the purge of a deleted venue; the caller commits. Returns
+    # False when there is no such deleted venue. Asking again while the
+    # purge is queued does nothing.
+    deleted_at = db.session.scalar(
+        db.select(Venue.deleted_at).where(Venue.id == venue_id, Venue.deleted_at.isnot(None))
+    )
+    if deleted_at is None:
+        return False
+    jobs.enqueue('venue_purge', {'venue_id': venue_id}, key='venue_purge:{}:{}'.format(
+        venue_id, deleted_at.isoformat()
+    ))
+    return True
+
+
+def expired(before):
+    # ids of the venues deleted before `before`
+    return db.session.scalars(
+        db.select(Venue.id).where(Venue.deleted_at < before).order_by(Venue.deleted_at)
+    ).all()
+
+
+@jobs.task('venue_purge')
+def purge_batch(venue_id):
+    # deletes a batch of a deleted venue's shows, or the venue once it has
+    # none left; does nothing to a venue restored in the meantime
+    venue = db.session.get(Venue, venue_id, with_for_update=True)
+    if venue is None or venue.deleted_at is None:
+        return
+    ids = db.session.scalars(
+        db.select(Show.id).where(Show.venue_id == venue_id)
+        .limit(current_app.config['VENUE_PURGE_BATCH_SIZE'])
+    ).all()
+    if ids:
+        db.session.execute(db.delete(Show).where(Show.id.in_(ids)))
+        jobs.enqueue('venue_purge', {'venue_id': venue_id})
+    else:
+        db.session.delete(venue)
+
+
+def init_app(app):
+    venues_cli = AppGroup('venues', help='Restore and purge deleted venues.')
+
+    @venues_cli.command('deleted', help='List the deleted venues.')
+    def deleted_command():
+        rows = db.session.execute(
+            db.select(
+                Venue.id, Venue.name, Venue.deleted_at,
+                db.select(db.func.count(Show.id)).where(Show.venue_id == Venue.id)
+                .scalar_subquery()
+            ).where(Venue.deleted_at.isnot(None)).order_by(Venue.deleted_at)
+        ).all()
+        for venue_id, name, deleted_at, shows in rows:
+            click.echo('{:>8}  {:%Y-%m-%d %H:%M:%S} UTC  {:>6} shows  {}'.format(
+                venue_id, deleted_at, shows, name
+            ))
+        if not rows:
+            click.echo('No deleted venues.')
+
+    @venues_cli.command('restore', help='Restore a deleted venue.')
+    @click.argument('venue_id', type=int)
+    def restore_command(venue_id):
+        area = restore(venue_id)
+        if area is None:
+            raise click.ClickException('No deleted venue {}.'.format(venue_id))
+        db.session.commit()
+        invalidate(venue_id, area)
+        click.echo('Venue {} restored.'.format(venue_id))
+
+    @venues_cli.command('purge', help='Queue the purge of deleted venues.')
+    @click.argument('ids', nargs=-1, type=int)
+    @click.option('--expired', 'purge_expired', is_flag=True,
+                  help='Purge the venues deleted more than VENUE_PURGE_AFTER_DAYS ago.')
+    def purge_command(ids, purge_expired):
+        ids = set(ids)
+        if purge_expired:
+            ids.update(expired(utcnow() - timedelta(days=app.config['VENUE_PURGE_AFTER_DAYS'])))
+        if not ids:
+            click.echo('No venues to purge.')
+            return
+        missing = [venue_id for venue_id in sorted(ids) if not purge(venue_id)]
+        db.session.commit()
+        click.echo('{} venues queued for purging.'.format(len(ids) - len(missing)))
+        if missing:
+            raise click.ClickException('No deleted venue {}.'.format(
+                ', '.join(map(str, missing))
+            ))
+
+    app.cli.add_command(venues_cli)
@@ -0,0 +1,131 @@
+# ----------------------------------------------------------------------------#
+# Catalogue export.
+#
+#   GET /export/venues.jsonl
+#   GET /export/artists.csv?updated_since=2026-10-01T00:00:00
+#   GET /export/shows.jsonl
+#
+# Rows are streamed from a server-side cursor (yield_per) straight into the
+# response, so memory use does not depend on the table size. Responses
+# carry an ETag and Last-Modified derived from the table's latest
+# updated_at and row count; a matching If-None-Match / If-Modified-Since
+# gets a 304 before any row is read. `updated_since` (ISO 8601, UTC)
+# limits the export to rows changed after that time.
+#
+# Soft-deleted venues and their shows are left out, like everywhere else
+# (models.live()); an `updated_since` export does not list them either, so
+# incremental consumers learn of deletions from a full export.
+# ----------------------------------------------------------------------------#
+
+import csv
+import hashlib
+import io
+import json
+from datetime import date, datetime
+
+from flask import Response, abort, request, stream_with_context
+from werkzeug.http import is_resource_modified
+
+from models import live
+
+CHUNK_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        # same convention as `flask import`
+        return ';'.join(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def jsonl_lines(columns, rows):
+    names = [c.name for c in columns]
+    for chunk in rows.partitions():
+        yield ''.join(
+            json.dumps(dict(zip(names, row)), default=_json_default) + '\n'
+            for row in chunk
+        )
+
+
+def csv_lines(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([c.name for c in columns])
+    for chunk in rows.partitions():
+        for row in chunk:
+            writer.writerow([_csv_value(v) for v in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+FORMATS = {
+    'jsonl': (jsonl_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
+
+
+def init_app(app, db, models):
+    # models: {'venues': Venue, 'artists': Artist, 'shows': Show}
+
+    @app.route('/export/<any(venues, artists, shows):entity>.<any(jsonl, csv):fmt>')
+    def export(entity, fmt):
+        model = models[entity]
+        table = model.__table__
+        columns = list(table.columns)
+
+        conditions = list(live(model))
+        if entity == 'shows':
+            venue = models['venues']
+            conditions.append(
+                db.select(venue.id).where(venue.id == table.c.venue_id, *live(venue)).exists()
+            )
+        updated_since = request.args.get('updated_since')
+        if updated_since:
+            try:
+                conditions.append(table.c.updated_at > datetime.fromisoformat(updated_since))
+            except ValueError:
+                abort(400)
+
+        last_modified, count = db.session.execute(
+            db.select(db.func.max(table.c.updated_at), db.func.count()).select_from(table).where(*conditions)
+        ).one()
+        etag = hashlib.sha1('{}|{}|{}|{}'.format(
+            entity, updated_since, last_modified, count
+        ).encode()).hexdigest()
+
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = Response(status=304)
+        else:
+            lines, mimetype = FORMATS[fmt]
+
+            def generate():
+                rows = db.session.execute(
+                    db.select(*columns).where(*conditions).order_by(table.c.id)
+                    .execution_options(yield_per=CHUNK_SIZE)
+                )
+                try:
+                    for text in lines(columns, rows):
+                        yield text
+                finally:
+                    rows.close()
+                    db.session.close()
+
+            response = Response(stream_with_context(generate()), mimetype=mimetype)
+            response.headers['Content-Disposition'] = (
+                'attachment; filename={}.{}'.format(entity, fmt)
+            )
+
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        return response
@@ -1,13 +1,24 @@
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
+# benchmark data set, and the results later runs must not regress from
+# (written by the first run; see benchmarks/compare.py)
+BENCH_DATABASE_URL = 'sqlite:////tmp/fyyur-bench.db'
+BENCH_BASELINE = 'benchmarks/baseline.json'
+
 # prepare for deployment
 
 
 def test():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m pytest -q"
+            " && python -m benchmarks.data --shows 10000 --database-url {0} --create --reset"
+            " && python -m benchmarks.endpoints --database-url {0} --output bench.json"
+            " && (test -e {1} || cp bench.json {1})"
+            " && python -m benchmarks.compare {1} bench.json".format(
+                BENCH_DATABASE_URL, BENCH_BASELINE
+            ), capture=True
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
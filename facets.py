@@ -0,0 +1,174 @@
+# ----------------------------------------------------------------------------#
+# Facets.
+#
+#   /venues?genre=Jazz&city=San Francisco
+#   /artists?genre=Jazz&genre=Blues&state=CA
+#
+# Genre, city and state filters for the venue and artist lists, with a
+# count per value of each facet. Genres come from the controlled
+# vocabulary in models.GENRES; repeated genre= parameters must all match.
+# On Postgres the genre filter is an array containment (genres @> ...)
+# answered by the GIN indexes on the genres columns, and city and state
+# have btree indexes, so combined filters are a bitmap AND of index scans.
+#
+# The counts of all three facets come from one grouped statement over the
+# filtered rows, and are cached for FACETS_CACHE_TTL seconds. Cache keys
+# carry a generation that invalidate() drops on every venue or artist
+# write, which retires every cached filter combination at once.
+# ----------------------------------------------------------------------------#
+
+import json
+import uuid
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy.dialects import postgresql
+
+from cache import get_cache
+from models import db, GENRES, live
+
+FACETS = (
+    ('genre', 'Genres'),
+    ('state', 'States'),
+    ('city', 'Cities'),
+)
+
+# generations outlive the entries they key
+GENERATION_TTL = 24 * 3600
+
+
+def parse_filters(args):
+    genres = sorted(set(args.getlist('genre')))
+    if any(genre not in GENRES for genre in genres):
+        abort(400)
+    return {
+        'genre': genres,
+        'city': args.get('city') or None,
+        'state': args.get('state') or None,
+    }
+
+
+def _postgres():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def _genre_values(model):
+    # model.genres as a table of `value`s (JSON on SQLite)
+    if _postgres():
+        return db.func.unnest(model.genres).table_valued('value').render_derived()
+    return db.func.json_each(model.genres).table_valued('value')
+
+
+def has_genres(model, genres):
+    if _postgres():
+        return model.genres.op('@>')(
+            db.cast(postgresql.array(genres), postgresql.ARRAY(db.String))
+        )
+    conditions = []
+    for genre in genres:
+        values = _genre_values(model)
+        conditions.append(db.select(values.c.value).where(values.c.value == genre).exists())
+    return db.and_(*conditions)
+
+
+def conditions(model, filters):
+    # WHERE clauses for the filters, for queries.venue_areas_statement and
+    # queries.artists_statement
+    where = []
+    if filters['genre']:
+        where.append(has_genres(model, filters['genre']))
+    if filters['city']:
+        where.append(model.city == filters['city'])
+    if filters['state']:
+        where.append(model.state == filters['state'])
+    return where
+
+
+def facet_statement(model, filters):
+    # (facet, value, count) for every facet value of the filtered rows
+    where = list(live(model)) + conditions(model, filters)
+    genres = _genre_values(model)
+    values = db.union_all(
+        db.select(
+            db.literal('genre').label('facet'), genres.c.value.label('value')
+        ).select_from(model).join(genres, db.true()).where(*where),
+        db.select(db.literal('city'), model.city).where(*where),
+        db.select(db.literal('state'), model.state).where(*where),
+    ).subquery()
+    return db.select(
+        values.c.facet, values.c.value, db.func.count().label('count')
+    ).where(
+        values.c.value.isnot(None)
+    ).group_by(values.c.facet, values.c.value)
+
+
+def group_facets(rows):
+    # {facet: [[value, count], ...]}, most frequent first
+    facets = {name: [] for name, _ in FACETS}
+    for facet, value, count in rows:
+        facets[facet].append([value, count])
+    for values in facets.values():
+        values.sort(key=lambda item: (-item[1], item[0]))
+    return facets
+
+
+def _generation_key(model):
+    return 'facets:{}:generation'.format(model.__tablename__)
+
+
+def facets_key(model, filters):
+    cache = get_cache()
+    generation = cache.get(_generation_key(model))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.set(_generation_key(model), generation, ttl=GENERATION_TTL)
+    return 'facets:{}:{}:{}'.format(
+        model.__tablename__, generation, json.dumps(filters, sort_keys=True)
+    )
+
+
+def store(key, facets):
+    get_cache().set(key, facets, ttl=current_app.config['FACETS_CACHE_TTL'])
+
+
+def facet_counts(model, filters):
+    key = facets_key(model, filters)
+    facets = get_cache().get(key)
+    if facets is None:
+        facets = group_facets(db.session.execute(facet_statement(model, filters)).all())
+        store(key, facets)
+    return facets
+
+
+def invalidate(model):
+    get_cache().delete(_generation_key(model))
+
+
+def facet_links(facets, filters):
+    # template data: each facet with its values, counts and the URL that
+    # toggles the value, keeping the other filters and the sort order
+    def url(**changes):
+        params = {'sort': request.args.get('sort') or None}
+        params.update(filters)
+        params.update(changes)
+        return url_for(request.endpoint, **params)
+
+    links = []
+    for name, title in FACETS:
+        values = []
+        for value, count in facets[name]:
+            if name == 'genre':
+                active = value in filters['genre']
+                toggled = sorted(set(filters['genre']) ^ {value})
+            else:
+                active = filters[name] == value
+                toggled = None if active else value
+            values.append({
+                'value': value, 'count': count, 'active': active,
+                'url': url(**{name: toggled})
+            })
+        links.append({'name': name, 'title': title, 'values': values})
+    return links
+
+
+def clear_url():
+    return url_for(request.endpoint, sort=request.args.get('sort') or None)
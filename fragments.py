@@ -0,0 +1,105 @@
+# ----------------------------------------------------------------------------#
+# Fragment cache.
+#
+#   {% cache 'venue', venue.id, venue.version %} ...tile... {% endcache %}
+#
+# Caches the rendered HTML of a template block in the app cache (cache.py)
+# under the fragment name and key, together with the version it was
+# rendered for. A lookup whose version differs is a miss: the block is
+# rendered again and replaces the entry. List pages use it per tile (keyed
+# by entity id, versioned by updated_at) and per venue area (versioned by a
+# digest of its tiles), so a page where one venue changed re-renders that
+# tile and its area block and stitches in every other tile from the cache.
+#
+# The write routes delete the entries of what they change. Hits and misses
+# per fragment name are counted and, with INSTRUMENTATION on, exported at
+# /_metrics as fyyur_fragment_cache_{hits,misses}_total.
+# ----------------------------------------------------------------------------#
+
+import hashlib
+import threading
+from collections import Counter
+
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import get_cache
+
+
+class FragmentStats(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def record(self, name, hit):
+        with self.lock:
+            (self.hits if hit else self.misses)[name] += 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for result, counts in (('hits', self.hits), ('misses', self.misses)):
+                metric = 'fyyur_fragment_cache_{}_total'.format(result)
+                lines.append('# HELP {} Fragment cache {} per fragment.'.format(metric, result))
+                lines.append('# TYPE {} counter'.format(metric))
+                for name in sorted(counts):
+                    lines.append('{}{{fragment="{}"}} {}'.format(metric, name, counts[name]))
+        return '\n'.join(lines) + '\n'
+
+
+def fragment_key(name, key):
+    if isinstance(key, (list, tuple)):
+        key = ':'.join(map(str, key))
+    return 'fragment:{}:{}'.format(name, key)
+
+
+def digest(versions):
+    # version of a block made of other fragments
+    return hashlib.sha1(repr(list(versions)).encode('utf-8')).hexdigest()
+
+
+def render(name, key, version, caller):
+    cache = get_cache()
+    cache_key = fragment_key(name, key)
+    version = str(version)
+    entry = cache.get(cache_key)
+    hit = entry is not None and entry[0] == version
+    current_app.extensions['fragments'].record(name, hit)
+    if hit:
+        return Markup(entry[1])
+    html = caller()
+    cache.set(cache_key, [version, str(html)], ttl=current_app.config['FRAGMENT_CACHE_TTL'])
+    return html
+
+
+def invalidate(*fragments):
+    # fragments as (name, key) pairs
+    get_cache().delete(*[fragment_key(name, key) for name, key in fragments])
+
+
+class FragmentCacheExtension(Extension):
+    # {% cache name, key, version %} ... {% endcache %}
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        for _ in range(2):
+            parser.stream.expect('comma')
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', args), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, name, key, version, caller):
+        return render(name, key, version, caller)
+
+
+def init_app(app):
+    app.extensions['fragments'] = FragmentStats()
+    app.jinja_env.add_extension(FragmentCacheExtension)
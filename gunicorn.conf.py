@@ -0,0 +1,43 @@
+# ----------------------------------------------------------------------------#
+# gunicorn settings for production.
+#
+#   FYYUR_CONFIG=production SECRET_KEY=... DATABASE_URL=... \
+#       gunicorn -c gunicorn.conf.py 'wsgi:create_app()'
+#
+# gthread workers: each worker process runs THREADS request threads, so
+# one process holds up to THREADS database connections at once. Keep
+# DB_POOL_SIZE >= GUNICORN_THREADS (config.py); the database then sees at
+# most WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections,
+# which must fit under max_connections -- or put PgBouncer in front and
+# set DB_PGBOUNCER=1.
+#
+# Every setting can be overridden from the environment.
+# ----------------------------------------------------------------------------#
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:' + os.environ.get('PORT', '8000'))
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# requests blocked longer than this are killed and the worker restarted
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# recycle workers now and then to bound slow leaks; the jitter keeps them
+# from restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+# The app is built in each worker after the fork, so no database connection
+# is ever shared between processes. Boot cost stays small because forms
+# and templates load on first use.
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
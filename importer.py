@@ -0,0 +1,277 @@
+# ----------------------------------------------------------------------------#
+# Bulk import.
+#
+#   flask import venues venues.csv
+#   flask import artists artists.jsonl --batch-size 5000
+#   flask import shows shows.csv --rejects shows.rejects.jsonl
+#
+# Files are streamed (CSV with a header row, or JSON Lines) and every row is
+# validated with the same form used by the matching create route. Valid
+# rows are inserted with one executemany per batch and committed per batch,
+# so memory stays bounded by --batch-size whatever the file size. Invalid
+# rows, and lines of a JSON Lines file that do not parse, are written to a
+# reject file (JSON Lines, one object per row with its line number and the
+# errors).
+#
+# Shows may reference their venue and artist by id (venue_id, artist_id)
+# or by exact name (venue_name, artist_name); both are resolved against
+# maps of the live (not deleted) venues and artists, loaded once at the
+# start of the import. After each batch the show counters of the venues
+# and artists it touched are recomputed (counters.py).
+# Shows overlapping an existing one are rejected by the database's exclusion
+# constraints (Postgres, see scheduling.py), like any other integrity error.
+#
+# With SEARCH_BACKEND = 'sqlite', run `flask search-reindex` afterwards.
+# The forms are imported on first use, not when the app boots.
+# ----------------------------------------------------------------------------#
+
+import csv
+import json
+import os
+from time import perf_counter
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+
+import counters
+from models import live
+
+VENUE_FIELDS = (
+    'name', 'city', 'state', 'address', 'phone', 'image_link',
+    'facebook_link', 'website', 'seeking_talent', 'seeking_description'
+)
+ARTIST_FIELDS = (
+    'name', 'city', 'state', 'phone', 'image_link',
+    'facebook_link', 'website', 'seeking_talent', 'seeking_description'
+)
+
+
+def parse_line(line):
+    # returns (row, errors) for a line of JSON Lines; a malformed line is
+    # kept as text so it can be written to the reject file
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return line.rstrip('\r\n'), {'json': [str(e)]}
+    if not isinstance(row, dict):
+        return row, {'json': ['Expected an object.']}
+    return row, {}
+
+
+def read_rows(path):
+    # yields (line number, row, errors) without loading the file; errors
+    # are those found before validation (malformed JSON)
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl') or path.endswith('.ndjson'):
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield (number,) + parse_line(line)
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # genres may be given as "Jazz;Swing" in CSV files
+                if row.get('genres'):
+                    row['genres'] = [g.strip() for g in row['genres'].split(';')]
+                yield reader.line_num, row, {}
+
+
+def form_data(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if isinstance(value, list):
+            for item in value:
+                data.add(key, item)
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+def validate(form_class, row):
+    form = form_class(formdata=form_data(row), meta={'csrf': False})
+    if form.validate():
+        return form, None
+    return form, form.errors
+
+
+def entity_values(form, fields):
+    values = {name: form[name].data for name in fields}
+    values['seeking_talent'] = values['seeking_talent'] == 'Yes'
+    values['genres'] = form.genres.data
+    return values
+
+
+class Importer(object):
+
+    def __init__(self, db, model, batch_size, rejects_path):
+        self.db = db
+        self.model = model
+        self.batch_size = batch_size
+        self.rejects_path = rejects_path
+        self.rejects = None
+        self.inserted = 0
+        self.rejected = 0
+
+    def convert(self, row):
+        # returns (values, errors)
+        raise NotImplementedError
+
+    def reject(self, number, row, errors):
+        if self.rejects is None:
+            self.rejects = open(self.rejects_path, 'w', encoding='utf-8')
+        self.rejects.write(json.dumps({'line': number, 'row': row, 'errors': errors}) + '\n')
+        self.rejected += 1
+
+    def flush(self, batch):
+        # batch holds (line number, row, values)
+        if not batch:
+            return
+        session = self.db.session
+        try:
+            session.execute(self.db.insert(self.model), [values for _, _, values in batch])
+            session.commit()
+            self.inserted += len(batch)
+        except IntegrityError:
+            # e.g. a duplicate show: retry row by row so only the offending
+            # rows are rejected
+            session.rollback()
+            for number, row, values in batch:
+                try:
+                    with session.begin_nested():
+                        session.execute(self.db.insert(self.model), [values])
+                    self.inserted += 1
+                except IntegrityError as e:
+                    self.reject(number, row, {'database': [str(e.orig).strip()]})
+            session.commit()
+        del batch[:]
+
+    def run(self, path):
+        start = perf_counter()
+        batch = []
+        try:
+            for number, row, errors in read_rows(path):
+                if not errors:
+                    values, errors = self.convert(row)
+                if errors:
+                    self.reject(number, row, errors)
+                    continue
+                batch.append((number, row, values))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+            self.flush(batch)
+        finally:
+            if self.rejects is not None:
+                self.rejects.close()
+            self.db.session.close()
+
+        elapsed = perf_counter() - start
+        click.echo('{} rows imported, {} rejected in {:.1f}s ({:.0f} rows/s)'.format(
+            self.inserted, self.rejected, elapsed,
+            (self.inserted + self.rejected) / elapsed if elapsed else 0
+        ))
+        if self.rejected:
+            click.echo('Rejected rows written to {}'.format(self.rejects_path))
+
+
+class VenueImporter(Importer):
+
+    def convert(self, row):
+        from forms import VenueForm
+        form, errors = validate(VenueForm, row)
+        if errors:
+            return None, errors
+        return entity_values(form, VENUE_FIELDS), None
+
+
+class ArtistImporter(Importer):
+
+    def convert(self, row):
+        from forms import ArtistForm
+        form, errors = validate(ArtistForm, row)
+        if errors:
+            return None, errors
+        return entity_values(form, ARTIST_FIELDS), None
+
+
+class ShowImporter(Importer):
+
+    def __init__(self, db, model, batch_size, rejects_path, venue_model, artist_model):
+        super(ShowImporter, self).__init__(db, model, batch_size, rejects_path)
+        self.venue_model = venue_model
+        self.artist_model = artist_model
+        # id -> id and name -> id maps for the references; small next to the
+        # number of shows and loaded once
+        self.venues = self.load_references(venue_model)
+        self.artists = self.load_references(artist_model)
+
+    def flush(self, batch):
+        venue_ids = set(values['venue_id'] for _, _, values in batch)
+        artist_ids = set(values['artist_id'] for _, _, values in batch)
+        super(ShowImporter, self).flush(batch)
+        if venue_ids:
+            counters.refresh(self.venue_model, venue_ids)
+            counters.refresh(self.artist_model, artist_ids)
+            self.db.session.commit()
+
+    def load_references(self, model):
+        ids, names = set(), {}
+        query = self.db.session.query(model.id, model.name).filter(*live(model))
+        for entity_id, name in query.yield_per(10000):
+            ids.add(entity_id)
+            names.setdefault(name, entity_id)
+        return ids, names
+
+    def resolve(self, references, row, kind):
+        ids, names = references
+        if row.get(kind + '_id') not in (None, ''):
+            try:
+                entity_id = int(row[kind + '_id'])
+            except ValueError:
+                return None
+            return entity_id if entity_id in ids else None
+        return names.get(row.get(kind + '_name'))
+
+    def convert(self, row):
+        from forms import ShowForm
+        form, errors = validate(ShowForm, row)
+        errors = dict(errors or {})
+        if not row.get('start_time'):
+            # otherwise the form would fall back to its default of today
+            errors['start_time'] = ['This field is required.']
+        venue_id = self.resolve(self.venues, row, 'venue')
+        artist_id = self.resolve(self.artists, row, 'artist')
+        if venue_id is None:
+            errors['venue_id'] = ['Unknown venue.']
+        if artist_id is None:
+            errors['artist_id'] = ['Unknown artist.']
+        if errors:
+            return None, errors
+        return {
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'dateshow': form.start_time.data,
+            'duration_minutes': form.duration.data or current_app.config['SHOW_DEFAULT_DURATION']
+        }, None
+
+
+def init_app(app, db, venue_model, artist_model, show_model):
+    import_cli = AppGroup('import', help='Bulk import venues, artists and shows.')
+
+    def command(name, build):
+        @import_cli.command(name, help='Import {} from a CSV or JSONL file.'.format(name))
+        @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+        @click.option('--batch-size', default=1000, show_default=True)
+        @click.option('--rejects', 'rejects_path', default=None,
+                      help='Reject file, defaults to PATH.rejects.jsonl')
+        def run(path, batch_size, rejects_path):
+            rejects_path = rejects_path or os.path.splitext(path)[0] + '.rejects.jsonl'
+            build(batch_size, rejects_path).run(path)
+
+    command('venues', lambda size, rejects: VenueImporter(db, venue_model, size, rejects))
+    command('artists', lambda size, rejects: ArtistImporter(db, artist_model, size, rejects))
+    command('shows', lambda size, rejects: ShowImporter(
+        db, show_model, size, rejects, venue_model, artist_model))
+
+    app.cli.add_command(import_cli)
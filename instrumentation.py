@@ -0,0 +1,211 @@
+# ----------------------------------------------------------------------------#
+# Request instrumentation.
+#
+# Opt-in (INSTRUMENTATION = True in config.py). Records, per request, the
+# number of SQL statements, time spent in the database, time spent rendering
+# templates and total wall time. The numbers are sent back as a
+# Server-Timing header, written as one JSON log line and folded into
+# per-endpoint rolling histograms served at /_metrics in Prometheus text
+# format, to the scrapers allowed by METRICS_TOKEN or METRICS_ALLOWED_IPS
+# (access.py); everyone else gets a 404.
+# ----------------------------------------------------------------------------#
+
+import json
+import logging
+import threading
+from collections import defaultdict, deque
+from time import perf_counter
+
+from flask import Response, abort, g, has_request_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import access
+
+logger = logging.getLogger('fyyur.requests')
+
+# Histogram buckets (upper bounds), seconds for timings and statements for
+# query counts.
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class JsonFormatter(logging.Formatter):
+    # one JSON object per line; extra fields passed as `metrics` are merged in
+
+    def format(self, record):
+        line = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        line.update(getattr(record, 'metrics', {}))
+        if record.exc_info:
+            line['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(line)
+
+
+class RollingHistogram(object):
+    # histogram over the last `window` observations of one endpoint
+
+    def __init__(self, buckets, window):
+        self.buckets = buckets
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value):
+        self.samples.append(value)
+
+    def snapshot(self):
+        samples = list(self.samples)
+        counts = [sum(1 for v in samples if v <= b) for b in self.buckets]
+        return counts, len(samples), sum(samples)
+
+
+class Metrics(object):
+
+    def __init__(self, window):
+        self.lock = threading.Lock()
+        self.wall = defaultdict(lambda: RollingHistogram(TIME_BUCKETS, window))
+        self.db = defaultdict(lambda: RollingHistogram(TIME_BUCKETS, window))
+        self.queries = defaultdict(lambda: RollingHistogram(QUERY_BUCKETS, window))
+
+    def observe(self, endpoint, stats):
+        with self.lock:
+            self.wall[endpoint].observe(stats['wall_ms'] / 1000.0)
+            self.db[endpoint].observe(stats['db_ms'] / 1000.0)
+            self.queries[endpoint].observe(stats['queries'])
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, help_text, histograms in (
+                ('fyyur_request_duration_seconds', 'Wall time per request.', self.wall),
+                ('fyyur_request_db_seconds', 'Database time per request.', self.db),
+                ('fyyur_request_queries', 'SQL statements per request.', self.queries),
+            ):
+                lines.append('# HELP {} {}'.format(name, help_text))
+                lines.append('# TYPE {} histogram'.format(name))
+                for endpoint in sorted(histograms):
+                    histogram = histograms[endpoint]
+                    counts, total, value_sum = histogram.snapshot()
+                    for bound, count in zip(histogram.buckets, counts):
+                        lines.append('{}_bucket{{endpoint="{}",le="{}"}} {}'.format(
+                            name, endpoint, bound, count))
+                    lines.append('{}_bucket{{endpoint="{}",le="+Inf"}} {}'.format(
+                        name, endpoint, total))
+                    lines.append('{}_sum{{endpoint="{}"}} {}'.format(name, endpoint, value_sum))
+                    lines.append('{}_count{{endpoint="{}"}} {}'.format(name, endpoint, total))
+        return '\n'.join(lines) + '\n'
+
+
+def _current():
+    if has_request_context():
+        return g.get('_instrumentation')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = perf_counter() - conn.info['query_start_time'].pop()
+    stats = _current()
+    if stats is not None:
+        stats['queries'] += 1
+        stats['db'] += elapsed
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _current()
+    if stats is not None:
+        stats['render_start'] = perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    stats = _current()
+    if stats is not None and 'render_start' in stats:
+        stats['render'] += perf_counter() - stats.pop('render_start')
+
+
+def _summary(stats):
+    return {
+        'queries': stats['queries'],
+        'db_ms': round(stats['db'] * 1000, 2),
+        'render_ms': round(stats['render'] * 1000, 2),
+        'wall_ms': round((perf_counter() - stats['start']) * 1000, 2),
+    }
+
+
+def may_scrape(config):
+    # is the current request allowed to read /_metrics
+    return access.allowed(config.get('METRICS_TOKEN'), config.get('METRICS_ALLOWED_IPS'))
+
+
+def init_app(app):
+    if not app.config.get('INSTRUMENTATION'):
+        return
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    metrics = Metrics(app.config.get('INSTRUMENTATION_WINDOW', 1000))
+    app.extensions['instrumentation'] = metrics
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_timer():
+        g._instrumentation = {
+            'start': perf_counter(),
+            'queries': 0,
+            'db': 0.0,
+            'render': 0.0,
+        }
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = _current()
+        if stats is None:
+            return response
+        summary = _summary(stats)
+        stats['status'] = response.status_code
+        response.headers['Server-Timing'] = (
+            'db;dur={db_ms};desc="{queries} queries", '
+            'render;dur={render_ms}, total;dur={wall_ms}'.format(**summary)
+        )
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        stats = g.pop('_instrumentation', None)
+        if stats is None:
+            return
+        summary = _summary(stats)
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe(endpoint, summary)
+        summary.update({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': stats.get('status', 500),
+        })
+        logger.info('request', extra={'metrics': summary})
+
+    @app.route('/_metrics')
+    def metrics_endpoint():
+        if not may_scrape(app.config):
+            abort(404)
+        body = metrics.render()
+        if 'fragments' in app.extensions:
+            body += app.extensions['fragments'].render()
+        return Response(body, mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,310 @@
+# ----------------------------------------------------------------------------#
+# Background jobs.
+#
+#   flask --app wsgi jobs work               (long-running worker process)
+#   flask --app wsgi jobs work --burst       (until nothing is due, e.g. cron)
+#   flask --app wsgi jobs status | retry [ID...] | purge
+#
+# The queue is the "Job" table. enqueue() adds a job to the caller's
+# transaction, so a write route queues its follow-up work (counters, search
+# indexing) in the same commit as the row it changed: the job exists if and only if
+# the change does, and the response goes out right after that commit. A
+# job given an idempotency key is queued once; enqueueing the same key
+# again, while the first is still in the table, does nothing.
+#
+# Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+# number of them can poll the table without handing a job out twice. On
+# SQLite (tests and local runs), where FOR UPDATE does not exist, the claim
+# is an UPDATE re-checking the job's status, which SQLite serializes.
+#
+# A claimed job holds a lease of JOBS_LEASE seconds; a worker that dies
+# leaves its jobs to be claimed again once the lease expires. A job runs in
+# one transaction with its completion, so its database writes commit
+# exactly once; anything else it does may happen again on a retry and
+# must be idempotent. A job that raises is retried after
+# JOBS_RETRY_DELAY seconds, doubled on each attempt, and marked failed
+# after max_attempts; `jobs retry` queues failed jobs again.
+# ----------------------------------------------------------------------------#
+
+import os
+import signal
+import socket
+import time
+import traceback
+from collections import Counter
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.dialects import postgresql, sqlite
+
+import counters
+import search
+from models import db, Venue, Artist, Job, utcnow
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# INSERT ... ON CONFLICT DO NOTHING, for idempotency keys
+INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+BATCH_SIZE = 500
+
+TASKS = {}
+
+
+def task(name):
+    # registers a job function under `name`; it is called with the job's
+    # payload as keyword arguments
+    def register(fn):
+        TASKS[name] = fn
+        return fn
+    return register
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    # queues a job in the current transaction; the caller commits. Returns
+    # False when a job with the same key already exists.
+    if name not in TASKS:
+        raise KeyError('no job named ' + name)
+    now = utcnow()
+    values = {
+        'name': name,
+        'payload': payload or {},
+        'key': key,
+        'status': QUEUED,
+        'attempts': 0,
+        'max_attempts': max_attempts or current_app.config['JOBS_MAX_ATTEMPTS'],
+        'run_at': now + timedelta(seconds=delay),
+        'created_at': now,
+    }
+    if key is None:
+        statement = db.insert(Job).values(**values)
+    else:
+        insert = INSERTS[db.session.get_bind().dialect.name]
+        statement = insert(Job).values(**values).on_conflict_do_nothing(
+            index_elements=['key']
+        )
+    return db.session.execute(statement).rowcount == 1
+
+
+def _update(*conditions):
+    return db.update(Job).where(*conditions).execution_options(
+        synchronize_session=False
+    )
+
+
+def _claimable(now):
+    lease = timedelta(seconds=current_app.config['JOBS_LEASE'])
+    return db.or_(
+        db.and_(Job.status == QUEUED, Job.run_at <= now),
+        # claimed by a worker that stopped without finishing them
+        db.and_(Job.status == RUNNING, Job.locked_at < now - lease),
+    )
+
+
+def claim(worker, limit, now=None):
+    # leases up to `limit` due jobs to `worker`; returns their ids
+    now = now or utcnow()
+    ids = db.session.scalars(
+        db.select(Job.id).where(_claimable(now)).order_by(Job.run_at, Job.id)
+        .limit(limit).with_for_update(skip_locked=True)
+    ).all()
+    claimed = []
+    if ids:
+        claimed = db.session.scalars(
+            _update(Job.id.in_(ids), _claimable(now)).values(
+                status=RUNNING, locked_at=now, locked_by=worker,
+                attempts=Job.attempts + 1
+            ).returning(Job.id)
+        ).all()
+    db.session.commit()
+    return sorted(claimed)
+
+
+def retry_delay(attempts):
+    config = current_app.config
+    return min(config['JOBS_RETRY_DELAY'] * 2 ** (attempts - 1), config['JOBS_RETRY_DELAY_MAX'])
+
+
+def run(job_id):
+    # runs a claimed job; returns its new status
+    job = db.session.get(Job, job_id)
+    try:
+        if job.name not in TASKS:
+            raise LookupError('no job named ' + job.name)
+        TASKS[job.name](**job.payload)
+        job.status = DONE
+        job.finished_at = utcnow()
+        job.locked_at = job.locked_by = None
+        db.session.commit()
+        return DONE
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+
+    job = db.session.get(Job, job_id)
+    if job.attempts >= job.max_attempts:
+        job.status = FAILED
+        job.finished_at = utcnow()
+    else:
+        job.status = QUEUED
+        job.run_at = utcnow() + timedelta(seconds=retry_delay(job.attempts))
+    job.locked_at = job.locked_by = None
+    job.last_error = error[-4000:]
+    db.session.commit()
+    current_app.logger.warning(
+        'job %s (%s) attempt %s of %s failed',
+        job.id, job.name, job.attempts, job.max_attempts
+    )
+    return job.status
+
+
+def release(ids):
+    # hands claimed jobs that were not run back to the queue
+    if ids:
+        db.session.execute(
+            _update(Job.id.in_(ids), Job.status == RUNNING).values(
+                status=QUEUED, locked_at=None, locked_by=None,
+                attempts=Job.attempts - 1
+            )
+        )
+        db.session.commit()
+
+
+def work(worker=None, burst=False, batch=None, poll=None, stopping=lambda: False):
+    # runs jobs until `stopping()` or, with `burst`, until none is due;
+    # returns the number of jobs per resulting status
+    config = current_app.config
+    worker = worker or '{}:{}'.format(socket.gethostname(), os.getpid())
+    batch = batch or config['JOBS_BATCH_SIZE']
+    poll = config['JOBS_POLL_INTERVAL'] if poll is None else poll
+    results = Counter()
+    while not stopping():
+        ids = claim(worker, batch)
+        if not ids:
+            if burst:
+                break
+            time.sleep(poll)
+            continue
+        for i, job_id in enumerate(ids):
+            if stopping():
+                release(ids[i:])
+                break
+            results[run(job_id)] += 1
+    db.session.remove()
+    return results
+
+
+def purge(before):
+    # deletes jobs done before `before`; failed jobs are kept. Returns the
+    # number of jobs deleted.
+    purged = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(Job.id).where(Job.status == DONE, Job.finished_at < before)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not ids:
+            return purged
+        db.session.execute(db.delete(Job).where(Job.id.in_(ids)))
+        db.session.commit()
+        purged += len(ids)
+
+
+# ----------------------------------------------------------------------------#
+# Jobs of the write routes.
+#
+# The work a write leaves to the worker: recomputing show counters
+# (counters.py) and keeping the search index in step. Indexing jobs are
+# only queued when the search backend keeps an index of its own
+# (SEARCH_BACKEND = 'sqlite'); the Postgres one searches the tables through
+# expression indexes and has nothing to do. Until the jobs run, the stored
+# counters the lists show may be behind. Venue deletes and restores queue
+# their jobs in deletion.py; cached pages need none (cache.py).
+# ----------------------------------------------------------------------------#
+
+def enqueue_indexing(name, payload):
+    # queues a search indexing job, if the backend has work for it
+    if search.get_backend().keeps_index:
+        enqueue(name, payload)
+
+
+@task('show_added')
+def show_added(venue_id, artist_id):
+    # after a show was booked
+    counters.refresh(Venue, [venue_id])
+    counters.refresh(Artist, [artist_id])
+
+
+@task('venue_saved')
+def venue_saved(venue_id):
+    # after a venue was created or edited
+    venue = db.session.get(Venue, venue_id)
+    if venue is not None and venue.deleted_at is None:
+        search.get_backend().index(venue)
+
+
+@task('artist_saved')
+def artist_saved(artist_id):
+    # after an artist was created or edited
+    artist = db.session.get(Artist, artist_id)
+    if artist is not None:
+        search.get_backend().index(artist)
+
+
+def init_app(app):
+    jobs_cli = AppGroup('jobs', help='Run and inspect the background job queue.')
+
+    @jobs_cli.command('work', help='Run queued jobs until stopped.')
+    @click.option('--burst', is_flag=True, help='Stop once no job is due.')
+    @click.option('--batch', type=int, help='Jobs claimed at a time.')
+    @click.option('--poll', type=float, help='Seconds between polls of an empty queue.')
+    def work_command(burst, batch, poll):
+        stop = []
+
+        def handle(signum, frame):
+            # finish the running job, hand the rest of the batch back
+            stop.append(signum)
+
+        signal.signal(signal.SIGTERM, handle)
+        signal.signal(signal.SIGINT, handle)
+        results = work(burst=burst, batch=batch, poll=poll, stopping=lambda: bool(stop))
+        click.echo('{} done, {} retried, {} failed.'.format(
+            results[DONE], results[QUEUED], results[FAILED]
+        ))
+
+    @jobs_cli.command('status', help='Count the jobs by name and status.')
+    def status_command():
+        rows = db.session.execute(
+            db.select(Job.name, Job.status, db.func.count(), db.func.min(Job.run_at))
+            .group_by(Job.name, Job.status).order_by(Job.name, Job.status)
+        ).all()
+        for name, status, count, oldest in rows:
+            line = '{:<16} {:<8} {:>8}'.format(name, status, count)
+            if status == QUEUED:
+                line += '  next due {:%Y-%m-%d %H:%M:%S} UTC'.format(oldest)
+            click.echo(line)
+        if not rows:
+            click.echo('No jobs.')
+
+    @jobs_cli.command('retry', help='Queue failed jobs again (all of them by default).')
+    @click.argument('ids', nargs=-1, type=int)
+    def retry_command(ids):
+        conditions = [Job.status == FAILED]
+        if ids:
+            conditions.append(Job.id.in_(ids))
+        result = db.session.execute(_update(*conditions).values(
+            status=QUEUED, attempts=0, run_at=utcnow(), finished_at=None
+        ))
+        db.session.commit()
+        click.echo('{} jobs queued.'.format(result.rowcount))
+
+    @jobs_cli.command('purge', help='Delete finished jobs (and free their keys).')
+    @click.option('--days', type=int, help='Keep jobs done in the last DAYS days.')
+    def purge_command(days):
+        if days is None:
+            days = app.config['JOBS_RETENTION_DAYS']
+        click.echo('{} jobs deleted.'.format(purge(utcnow() - timedelta(days=days))))
+
+    app.cli.add_command(jobs_cli)
@@ -0,0 +1,61 @@
+"""search indexes for venues and artists
+
+Revision ID: 3f1c8d2e9a6b
+Revises: a058a46f17e2
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c8d2e9a6b'
+down_revision = 'a058a46f17e2'
+branch_labels = None
+depends_on = None
+
+
+# Must match search.PostgresSearchBackend.document() / TS_CONFIG.
+SEARCH_TEXT_FUNCTION = """
+CREATE OR REPLACE FUNCTION fyyur_search_text(
+    name text, city text, state text, genres text[]
+) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(name, '') || ' ' || coalesce(city, '') || ' ' ||
+           coalesce(state, '') || ' ' || coalesce(array_to_string(genres, ' '), '')
+$$
+"""
+
+TABLES = ('Venue', 'Artist')
+DOCUMENT = 'fyyur_search_text(name, city, state, genres)'
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(SEARCH_TEXT_FUNCTION)
+
+    # build the indexes without blocking writes to Venue / Artist
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{0}_search_tsv '
+                'ON "{1}" USING gin (to_tsvector(\'simple\'::regconfig, {2}))'
+                .format(table.lower(), table, DOCUMENT)
+            )
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{0}_search_trgm '
+                'ON "{1}" USING gin ({2} gin_trgm_ops)'
+                .format(table.lower(), table, DOCUMENT)
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(
+                'DROP INDEX CONCURRENTLY IF EXISTS ix_{0}_search_trgm'.format(table.lower())
+            )
+            op.execute(
+                'DROP INDEX CONCURRENTLY IF EXISTS ix_{0}_search_tsv'.format(table.lower())
+            )
+    op.execute('DROP FUNCTION IF EXISTS fyyur_search_text(text, text, text, text[])')
@@ -0,0 +1,122 @@
+"""mapped Show table with surrogate id and covering indexes
+
+Revision ID: 8b2e4f7a1c3d
+Revises: 3f1c8d2e9a6b
+Create Date: 2026-10-18 10:02:17.554310
+
+Moves shows from the "Shows" association table to the "Show" table
+mapped by models.Show, without taking the site down:
+
+1. create "Show" and a trigger that mirrors writes made to "Shows" by app
+   servers still running the previous release;
+2. backfill "Show" from "Shows" in small batches, one transaction each;
+3. build the secondary indexes concurrently.
+
+"Shows" is left in place (and kept in sync by the trigger) so the previous
+release can still be rolled back to; drop it in a follow-up migration once
+every app server runs the Show model.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4f7a1c3d'
+down_revision = '3f1c8d2e9a6b'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# Partial index cut-off for upcoming shows; must match models.Show.
+UPCOMING_CUTOFF = '2026-10-18'
+
+MIRROR_FUNCTION = """
+CREATE OR REPLACE FUNCTION fyyur_mirror_shows() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO "Show" (venue_id, artist_id, dateshow)
+        VALUES (NEW.venue_id, NEW.artist_id, NEW.dateshow)
+        ON CONFLICT (venue_id, artist_id, dateshow) DO NOTHING;
+        RETURN NEW;
+    END IF;
+    DELETE FROM "Show"
+    WHERE venue_id = OLD.venue_id AND artist_id = OLD.artist_id
+      AND dateshow = OLD.dateshow;
+    RETURN OLD;
+END
+$$
+"""
+
+
+def upgrade():
+    op.create_table('Show',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('dateshow', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('venue_id', 'artist_id', 'dateshow')
+    )
+    op.execute(MIRROR_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER fyyur_mirror_shows '
+        'AFTER INSERT OR DELETE ON "Shows" '
+        'FOR EACH ROW EXECUTE PROCEDURE fyyur_mirror_shows()'
+    )
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        last = None
+        while True:
+            # walk "Shows" by its primary key, BATCH_SIZE rows per transaction
+            keyset = (
+                'WHERE (venue_id, artist_id, dateshow) > '
+                '(:venue_id, :artist_id, :dateshow) ' if last else ''
+            )
+            params = dict(last or {}, limit=BATCH_SIZE)
+            rows = conn.execute(sa.text(
+                'SELECT venue_id, artist_id, dateshow FROM "Shows" ' + keyset +
+                'ORDER BY venue_id, artist_id, dateshow LIMIT :limit'
+            ), params).fetchall()
+            if not rows:
+                break
+            conn.execute(sa.text(
+                'INSERT INTO "Show" (venue_id, artist_id, dateshow) '
+                'VALUES (:venue_id, :artist_id, :dateshow) '
+                'ON CONFLICT (venue_id, artist_id, dateshow) DO NOTHING'
+            ), [dict(r._mapping) for r in rows])
+            last = dict(rows[-1]._mapping)
+
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_show_artist_id_dateshow '
+            'ON "Show" (artist_id, dateshow)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_show_dateshow '
+            'ON "Show" (dateshow)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_show_upcoming '
+            'ON "Show" (venue_id, dateshow) '
+            "WHERE dateshow >= '{}'".format(UPCOMING_CUTOFF)
+        )
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS fyyur_mirror_shows ON "Shows"')
+    op.execute('DROP FUNCTION IF EXISTS fyyur_mirror_shows()')
+    # copy shows created through the new model back before dropping it
+    op.execute(
+        'INSERT INTO "Shows" (venue_id, artist_id, dateshow) '
+        'SELECT venue_id, artist_id, dateshow FROM "Show" '
+        'ON CONFLICT DO NOTHING'
+    )
+    op.drop_index('ix_show_upcoming', table_name='Show')
+    op.drop_index('ix_show_dateshow', table_name='Show')
+    op.drop_index('ix_show_artist_id_dateshow', table_name='Show')
+    op.drop_table('Show')
@@ -0,0 +1,52 @@
+"""covering show indexes
+
+Revision ID: a4d8f2b6c1e9
+Revises: c7f2a9d4e6b3
+Create Date: 2026-10-18 23:02:18.907415
+
+Replaces ix_show_upcoming, a partial index over shows after a fixed date
+that no query could use (they compare with now(), which the planner cannot
+match against a constant), with a plain (venue_id, dateshow) index. The
+venue, artist and show list indexes INCLUDE the columns their queries
+select, and ix_show_dateshow takes the whole keyset order of /shows. Each
+changed index is built concurrently under a temporary name and swapped in.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8f2b6c1e9'
+down_revision = 'c7f2a9d4e6b3'
+branch_labels = None
+depends_on = None
+
+# name -> (old definition, new definition); None where there was none
+INDEXES = {
+    'ix_show_venue_id_dateshow': (None, '(venue_id, dateshow) INCLUDE (id, artist_id)'),
+    'ix_show_artist_id_dateshow': ('(artist_id, dateshow)', '(artist_id, dateshow) INCLUDE (id, venue_id)'),
+    'ix_show_dateshow': ('(dateshow)', '(dateshow, venue_id, artist_id) INCLUDE (id)'),
+    'ix_show_upcoming': ("(venue_id, dateshow) WHERE dateshow >= '2026-10-18'", None),
+}
+
+
+def _swap(name, definition):
+    # builds the new index next to the old one before dropping it
+    if definition is None:
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS "{}"'.format(name))
+        return
+    op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS "{}_new" ON "Show" {}'.format(name, definition))
+    op.execute('DROP INDEX CONCURRENTLY IF EXISTS "{}"'.format(name))
+    op.execute('ALTER INDEX "{0}_new" RENAME TO "{0}"'.format(name))
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, (_, new) in INDEXES.items():
+            _swap(name, new)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, (old, _) in INDEXES.items():
+            _swap(name, old)
@@ -0,0 +1,40 @@
+"""facet indexes
+
+Revision ID: a9c3e7f1b5d2
+Revises: f4c1a8e3d9b2
+Create Date: 2026-10-18 19:12:08.604217
+
+GIN indexes on the genres arrays, for the genres @> ... filters, and btree
+indexes on city and state (see facets.py). Built concurrently.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3e7f1b5d2'
+down_revision = 'f4c1a8e3d9b2'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist')
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_{0}_genres" '
+                'ON "{0}" USING gin (genres)'.format(table)
+            )
+            for column in ('city', 'state'):
+                op.execute(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_{0}_{1}" '
+                    'ON "{0}" ({1})'.format(table, column)
+                )
+
+
+def downgrade():
+    for table in TABLES:
+        for column in ('genres', 'city', 'state'):
+            op.drop_index('ix_{}_{}'.format(table, column), table_name=table)
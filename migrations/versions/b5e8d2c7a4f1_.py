@@ -0,0 +1,49 @@
+"""background job queue
+
+Revision ID: b5e8d2c7a4f1
+Revises: a9c3e7f1b5d2
+Create Date: 2026-10-18 20:41:36.118902
+
+The "Job" table of jobs.py, with partial indexes over the queued and the
+running jobs, the only ones a worker's claim looks at.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e8d2c7a4f1'
+down_revision = 'a9c3e7f1b5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('key', sa.String(length=200), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('locked_by', sa.String(length=120), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    op.create_index('ix_Job_queued', 'Job', ['run_at'], postgresql_where=sa.text("status = 'queued'"))
+    op.create_index('ix_Job_running', 'Job', ['locked_at'], postgresql_where=sa.text("status = 'running'"))
+    op.create_index('ix_Job_status_finished_at', 'Job', ['status', 'finished_at'])
+
+
+def downgrade():
+    op.drop_index('ix_Job_status_finished_at', table_name='Job')
+    op.drop_index('ix_Job_running', table_name='Job')
+    op.drop_index('ix_Job_queued', table_name='Job')
+    op.drop_table('Job')
@@ -0,0 +1,40 @@
+"""updated_at on Venue, Artist and Show
+
+Revision ID: c4d9e1b27f80
+Revises: 8b2e4f7a1c3d
+Create Date: 2026-10-18 11:20:05.907112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d9e1b27f80'
+down_revision = '8b2e4f7a1c3d'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist', 'Show')
+
+
+def upgrade():
+    # a constant default keeps ADD COLUMN a catalog-only change (no rewrite)
+    for table in TABLES:
+        op.add_column(table, sa.Column(
+            'updated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("timezone('utc', now())")
+        ))
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_{0}_updated_at" '
+                'ON "{0}" (updated_at)'.format(table)
+            )
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index('ix_{}_updated_at'.format(table), table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,80 @@
+"""soft deleted venues
+
+Revision ID: c7f2a9d4e6b3
+Revises: d1e5a8c3f9b7
+Create Date: 2026-10-18 22:17:03.540216
+
+Adds Venue.deleted_at (see deletion.py) and turns the venue indexes that
+serve lists, sorts, search and autocomplete into partial indexes over the
+live venues. Each is rebuilt concurrently under a temporary name, then
+swapped in for the old one, so reads and writes go on throughout. A
+nullable column without a default is a catalog-only change.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f2a9d4e6b3'
+down_revision = 'd1e5a8c3f9b7'
+branch_labels = None
+depends_on = None
+
+LIVE = 'deleted_at IS NULL'
+
+# Must match 3f1c8d2e9a6b (search) and f4c1a8e3d9b2 (autocomplete).
+DOCUMENT = 'fyyur_search_text(name, city, state, genres)'
+
+# name -> (method, columns) of the indexes made partial
+REPLACED = {
+    'ix_Venue_shows_count': ('btree', 'shows_count, id'),
+    'ix_Venue_upcoming_shows_count': ('btree', 'upcoming_shows_count, id'),
+    'ix_Venue_next_show_at': ('btree', 'next_show_at, id'),
+    'ix_Venue_name_prefix': ('btree', '(lower(name) COLLATE "C"), id'),
+    'ix_venue_search_tsv': ('gin', "to_tsvector('simple'::regconfig, {})".format(DOCUMENT)),
+    'ix_venue_search_trgm': ('gin', '{} gin_trgm_ops'.format(DOCUMENT)),
+}
+
+ADDED = {
+    'ix_Venue_live_area': ('state, city, id', LIVE),
+    'ix_Venue_deleted_at': ('deleted_at', 'deleted_at IS NOT NULL'),
+}
+
+
+def _create(name, method, columns, where=None):
+    op.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{}" ON "Venue" USING {} ({}){}'.format(
+            name, method, columns, ' WHERE ' + where if where else ''
+        )
+    )
+
+
+def _swap(name, method, columns, where):
+    # builds the new index next to the old one before dropping it
+    _create(name + '_new', method, columns, where)
+    op.execute('DROP INDEX CONCURRENTLY IF EXISTS "{}"'.format(name))
+    op.execute('ALTER INDEX "{0}_new" RENAME TO "{0}"'.format(name))
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for name, (method, columns) in REPLACED.items():
+            _swap(name, method, columns, LIVE)
+        for name, (columns, where) in ADDED.items():
+            _create(name, 'btree', columns, where)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in ADDED:
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS "{}"'.format(name))
+        for name, (method, columns) in REPLACED.items():
+            _swap(name, method, columns, None)
+
+    # deleted venues and their shows go for good
+    op.execute('DELETE FROM "Show" WHERE venue_id IN (SELECT id FROM "Venue" WHERE deleted_at IS NOT NULL)')
+    op.execute('DELETE FROM "Venue" WHERE deleted_at IS NOT NULL')
+    op.drop_column('Venue', 'deleted_at')
@@ -0,0 +1,70 @@
+"""drop the legacy "Shows" table
+
+Revision ID: d1e5a8c3f9b7
+Revises: b5e8d2c7a4f1
+Create Date: 2026-10-18 22:05:44.310927
+
+Follow-up to 8b2e4f7a1c3d: every app server reads and writes "Show", so
+the old association table, its mirror trigger and the trigger function
+go. Its foreign keys to "Venue" and "Artist" would otherwise keep venues
+(deletion.py) and artists with old shows from ever being deleted.
+
+The downgrade recreates "Shows" from "Show" and the trigger with it.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1e5a8c3f9b7'
+down_revision = 'b5e8d2c7a4f1'
+branch_labels = None
+depends_on = None
+
+# as created by 8b2e4f7a1c3d
+MIRROR_FUNCTION = """
+CREATE OR REPLACE FUNCTION fyyur_mirror_shows() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO "Show" (venue_id, artist_id, dateshow)
+        VALUES (NEW.venue_id, NEW.artist_id, NEW.dateshow)
+        ON CONFLICT (venue_id, artist_id, dateshow) DO NOTHING;
+        RETURN NEW;
+    END IF;
+    DELETE FROM "Show"
+    WHERE venue_id = OLD.venue_id AND artist_id = OLD.artist_id
+      AND dateshow = OLD.dateshow;
+    RETURN OLD;
+END
+$$
+"""
+
+
+def upgrade():
+    op.execute('DROP TRIGGER IF EXISTS fyyur_mirror_shows ON "Shows"')
+    op.execute('DROP FUNCTION IF EXISTS fyyur_mirror_shows()')
+    op.execute('DROP TABLE IF EXISTS "Shows"')
+
+
+def downgrade():
+    op.create_table('Shows',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('dateshow', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+    sa.PrimaryKeyConstraint('venue_id', 'artist_id', 'dateshow')
+    )
+    op.execute(
+        'INSERT INTO "Shows" (venue_id, artist_id, dateshow) '
+        'SELECT venue_id, artist_id, dateshow FROM "Show" '
+        'ON CONFLICT DO NOTHING'
+    )
+    op.execute(MIRROR_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER fyyur_mirror_shows '
+        'AFTER INSERT OR DELETE ON "Shows" '
+        'FOR EACH ROW EXECUTE PROCEDURE fyyur_mirror_shows()'
+    )
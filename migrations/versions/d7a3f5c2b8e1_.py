@@ -0,0 +1,86 @@
+"""show counters on Venue and Artist
+
+Revision ID: d7a3f5c2b8e1
+Revises: c4d9e1b27f80
+Create Date: 2026-10-18 14:12:40.218573
+
+Adds shows_count, upcoming_shows_count, next_show_at and last_show_at
+(maintained by counters.py), backfills them in small batches, one
+transaction each, and builds their indexes concurrently. Shows created
+while the backfill runs are caught by `flask counters check --fix`, to be
+run once the new release is deployed.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f5c2b8e1'
+down_revision = 'c4d9e1b27f80'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+TABLES = {'Venue': 'venue_id', 'Artist': 'artist_id'}
+
+BACKFILL = """
+UPDATE "{table}" SET
+    shows_count = (SELECT count(*) FROM "Show" s WHERE s.{fk} = "{table}".id),
+    upcoming_shows_count = (SELECT count(*) FROM "Show" s
+                            WHERE s.{fk} = "{table}".id AND s.dateshow >= LOCALTIMESTAMP),
+    next_show_at = (SELECT min(s.dateshow) FROM "Show" s
+                    WHERE s.{fk} = "{table}".id AND s.dateshow >= LOCALTIMESTAMP),
+    last_show_at = (SELECT max(s.dateshow) FROM "Show" s
+                    WHERE s.{fk} = "{table}".id AND s.dateshow < LOCALTIMESTAMP)
+WHERE id > :low AND id <= :high
+"""
+
+INDEXES = {
+    'shows_count': ('shows_count', 'id'),
+    'upcoming_shows_count': ('upcoming_shows_count', 'id'),
+    'next_show_at': ('next_show_at', 'id'),
+}
+
+
+def upgrade():
+    # constant defaults: catalog-only changes, no table rewrite
+    for table in TABLES:
+        op.add_column(table, sa.Column(
+            'shows_count', sa.Integer(), nullable=False, server_default='0'
+        ))
+        op.add_column(table, sa.Column(
+            'upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'
+        ))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(), nullable=True))
+        op.add_column(table, sa.Column('last_show_at', sa.DateTime(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        for table, fk in TABLES.items():
+            top = conn.execute(sa.text(
+                'SELECT coalesce(max(id), 0) FROM "{}"'.format(table)
+            )).scalar()
+            for low in range(0, top, BATCH_SIZE):
+                conn.execute(
+                    sa.text(BACKFILL.format(table=table, fk=fk)),
+                    {'low': low, 'high': low + BATCH_SIZE}
+                )
+
+        for table in TABLES:
+            for name, columns in INDEXES.items():
+                op.execute(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_{0}_{1}" '
+                    'ON "{0}" ({2})'.format(table, name, ', '.join(columns))
+                )
+
+
+def downgrade():
+    for table in TABLES:
+        for name in INDEXES:
+            op.drop_index('ix_{}_{}'.format(table, name), table_name=table)
+        op.drop_column(table, 'last_show_at')
+        op.drop_column(table, 'next_show_at')
+        op.drop_column(table, 'upcoming_shows_count')
+        op.drop_column(table, 'shows_count')
@@ -0,0 +1,51 @@
+"""show duration and no-overlap exclusion constraints
+
+Revision ID: e2b6c9d4f1a7
+Revises: d7a3f5c2b8e1
+Create Date: 2026-10-18 16:40:12.905114
+
+Adds Show.duration_minutes (120 for existing shows) and two exclusion
+constraints keeping the shows of an artist, and the shows at a venue, from
+overlapping (see scheduling.py). They need the btree_gist extension.
+
+Adding an exclusion constraint builds its GiST index while holding a lock
+that blocks writes to "Show", and fails if existing shows already overlap:
+the error names the first conflicting pair. Fix those (or shorten their
+duration) and run the upgrade again.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6c9d4f1a7'
+down_revision = 'd7a3f5c2b8e1'
+branch_labels = None
+depends_on = None
+
+# must match models.SHOW_PERIOD
+PERIOD = "tsrange(dateshow, dateshow + duration_minutes * interval '1 minute')"
+
+CONSTRAINTS = {
+    'show_artist_no_overlap': 'artist_id',
+    'show_venue_no_overlap': 'venue_id',
+}
+
+
+def upgrade():
+    op.add_column('Show', sa.Column(
+        'duration_minutes', sa.Integer(), nullable=False, server_default='120'
+    ))
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for name, column in CONSTRAINTS.items():
+        op.execute(
+            'ALTER TABLE "Show" ADD CONSTRAINT {} '
+            'EXCLUDE USING gist ({} WITH =, {} WITH &&)'.format(name, column, PERIOD)
+        )
+
+
+def downgrade():
+    for name in CONSTRAINTS:
+        op.drop_constraint(name, 'Show')
+    op.drop_column('Show', 'duration_minutes')
@@ -0,0 +1,34 @@
+"""name prefix indexes for autocomplete
+
+Revision ID: f4c1a8e3d9b2
+Revises: e2b6c9d4f1a7
+Create Date: 2026-10-18 18:05:51.330478
+
+lower(name) in the "C" collation, so that prefix ranges and their ORDER BY
+come straight from the index (see autocomplete.py). Built concurrently.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c1a8e3d9b2'
+down_revision = 'e2b6c9d4f1a7'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist')
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_{0}_name_prefix" '
+                'ON "{0}" ((lower(name) COLLATE "C"), id)'.format(table)
+            )
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index('ix_{}_name_prefix'.format(table), table_name=table)
@@ -0,0 +1,237 @@
+# ----------------------------------------------------------------------------#
+# Models.
+# ----------------------------------------------------------------------------#
+
+from datetime import datetime, timezone
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+
+from replicas import RoutingSession
+
+# reads of GET requests go to a replica when REPLICA_DATABASE_URLS is set
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Postgres array in production; JSON on SQLite so the models can be created
+# on a local SQLite database (search tests, FTS5 backend).
+GENRES_TYPE = db.ARRAY(db.String(120)).with_variant(db.JSON, 'sqlite')
+
+# Controlled vocabulary for Venue.genres and Artist.genres: the choices of
+# the forms and the values accepted by the genre facet (facets.py)
+GENRES = (
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other',
+)
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Venues are soft deleted (see deletion.py). The indexes that serve venue
+# lists, sorts, search and autocomplete cover only the live rows, and the
+# queries using them repeat this condition (live()) so the planner can.
+VENUE_LIVE = db.text('deleted_at IS NULL')
+_live_index = {'postgresql_where': VENUE_LIVE, 'sqlite_where': VENUE_LIVE}
+
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+        # ?sort= on the list pages, and `flask counters roll`
+        db.Index('ix_Venue_shows_count', 'shows_count', 'id', **_live_index),
+        db.Index('ix_Venue_upcoming_shows_count', 'upcoming_shows_count', 'id', **_live_index),
+        db.Index('ix_Venue_next_show_at', 'next_show_at', 'id', **_live_index),
+        # /venues, grouped by area
+        db.Index('ix_Venue_live_area', 'state', 'city', 'id', **_live_index),
+        # deleted venues, by age (`flask venues deleted`, `purge --expired`)
+        db.Index(
+            'ix_Venue_deleted_at', 'deleted_at',
+            postgresql_where=db.text('deleted_at IS NOT NULL'),
+            sqlite_where=db.text('deleted_at IS NOT NULL')
+        ),
+        # genre facet (facets.py): genres @> ARRAY[...]
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120), index=True)
+    state = db.Column(db.String(120), index=True)
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    genres = db.Column(GENRES_TYPE)
+    website = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, default=False)
+    seeking_description = db.Column(db.String(500))
+    # UTC, bumped on every ORM update; drives exports and HTTP validators
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=utcnow, onupdate=utcnow, index=True
+    )
+    # show counters, maintained by counters.py
+    shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0'
+    )
+    next_show_at = db.Column(db.DateTime)
+    last_show_at = db.Column(db.DateTime)
+    # UTC; set while the venue is deleted, until it is restored or purged
+    deleted_at = db.Column(db.DateTime)
+
+    # TODO: implement any missing fields, as a database migration using
+    # Flask-Migrate
+
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+        # ?sort= on the list pages, and `flask counters roll`
+        db.Index('ix_Artist_shows_count', 'shows_count', 'id'),
+        db.Index('ix_Artist_upcoming_shows_count', 'upcoming_shows_count', 'id'),
+        db.Index('ix_Artist_next_show_at', 'next_show_at', 'id'),
+        # genre facet (facets.py): genres @> ARRAY[...]
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120), index=True)
+    state = db.Column(db.String(120), index=True)
+    phone = db.Column(db.String(120))
+    genres = db.Column(GENRES_TYPE)
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, default=False)
+    seeking_description = db.Column(db.String(500))
+    # UTC, bumped on every ORM update; drives exports and HTTP validators
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=utcnow, onupdate=utcnow, index=True
+    )
+    # show counters, maintained by counters.py
+    shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0'
+    )
+    next_show_at = db.Column(db.DateTime)
+    last_show_at = db.Column(db.DateTime)
+
+    # TODO: implement any missing fields, as a database migration
+    # using Flask-Migrate
+
+
+class Show(db.Model):
+    __tablename__ = 'Show'
+    __table_args__ = (
+        db.UniqueConstraint('venue_id', 'artist_id', 'dateshow'),
+        # the show lists of venue and artist pages (queries.py), in
+        # dateshow order; INCLUDE covers the columns they select, for
+        # index-only scans
+        db.Index(
+            'ix_show_venue_id_dateshow', 'venue_id', 'dateshow',
+            postgresql_include=['id', 'artist_id']
+        ),
+        db.Index(
+            'ix_show_artist_id_dateshow', 'artist_id', 'dateshow',
+            postgresql_include=['id', 'venue_id']
+        ),
+        # /shows and /api/v1/shows, keyset paginated in this order
+        db.Index(
+            'ix_show_dateshow', 'dateshow', 'venue_id', 'artist_id',
+            postgresql_include=['id']
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+    dateshow = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(
+        db.Integer, nullable=False, default=120, server_default='120'
+    )
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=utcnow, onupdate=utcnow, index=True
+    )
+    venue = db.relationship(
+      'Venue',
+      backref=db.backref('shows', lazy='dynamic')
+    )
+    artist = db.relationship(
+      'Artist',
+      backref=db.backref('shows', lazy='dynamic')
+    )
+
+
+# The time a show occupies its artist and its venue, [start, end). Shows of
+# the same artist, or at the same venue, may not overlap: enforced on
+# Postgres by two exclusion constraints (btree_gist), whose GiST indexes
+# also serve the conflict checks in scheduling.py.
+SHOW_PERIOD = db.func.tsrange(
+    Show.__table__.c.dateshow,
+    Show.__table__.c.dateshow
+    + Show.__table__.c.duration_minutes * db.literal_column("interval '1 minute'")
+)
+for name, column in (('show_artist_no_overlap', 'artist_id'),
+                     ('show_venue_no_overlap', 'venue_id')):
+    Show.__table__.append_constraint(ExcludeConstraint(
+        (Show.__table__.c[column], '='), (SHOW_PERIOD, '&&'), name=name, using='gist'
+    ).ddl_if(dialect='postgresql'))
+
+
+# Name prefix indexes for /autocomplete (autocomplete.py). lower(name) in
+# the "C" collation: a plain btree then serves both the prefix range and
+# the ORDER BY, so a lookup reads only the k rows it returns.
+for model, where in ((Venue, VENUE_LIVE), (Artist, None)):
+    db.Index(
+        'ix_{}_name_prefix'.format(model.__tablename__),
+        db.func.lower(model.__table__.c.name).collate('C'), model.__table__.c.id,
+        postgresql_where=where
+    ).ddl_if(dialect='postgresql')
+
+
+def live(model):
+    # conditions leaving out soft-deleted rows; only venues have them
+    if model is Venue:
+        return (Venue.deleted_at.is_(None),)
+    return ()
+
+
+class Job(db.Model):
+    # background job queue, see jobs.py
+    __tablename__ = 'Job'
+    __table_args__ = (
+        # what the worker claims: due jobs, and running jobs whose lease
+        # expired; finished jobs stay out of both indexes
+        db.Index(
+            'ix_Job_queued', 'run_at',
+            postgresql_where=db.text("status = 'queued'"),
+            sqlite_where=db.text("status = 'queued'")
+        ),
+        db.Index(
+            'ix_Job_running', 'locked_at',
+            postgresql_where=db.text("status = 'running'"),
+            sqlite_where=db.text("status = 'running'")
+        ),
+        # `flask jobs purge`
+        db.Index('ix_Job_status_finished_at', 'status', 'finished_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    # idempotency key: a second job with the same key is not queued
+    key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    # UTC, like updated_at
+    run_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(120))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    finished_at = db.Column(db.DateTime)
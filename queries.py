@@ -0,0 +1,352 @@
+# ----------------------------------------------------------------------------#
+# Queries.
+#
+# Read queries shared by the HTML views (venues.py, artists.py, shows.py),
+# the JSON API in api.py and the async read path in aio.py. Where both the
+# sync and the async path run a query, it is split into a *_statement()
+# builder and a function shaping the rows, so only the execution differs.
+# ----------------------------------------------------------------------------#
+
+import base64
+from datetime import datetime
+from itertools import groupby
+
+from flask import abort, current_app
+
+import fragments
+from models import db, Venue, Artist, Show, live
+
+
+def encode_cursor(dateshow, *ids):
+    # opaque keyset cursor: a show date followed by one or more integer ids
+    raw = '|'.join([dateshow.isoformat()] + [str(i) for i in ids])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(value, size=3):
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value.encode()).decode()
+        dateshow, *ids = raw.split('|')
+        if len(ids) != size - 1:
+            raise ValueError(value)
+        return (datetime.fromisoformat(dateshow),) + tuple(int(i) for i in ids)
+    except (ValueError, UnicodeError):
+        abort(400)
+
+
+# ?sort= options of the venue and artist lists, on the counters kept by
+# counters.py; each is backed by an index (see models.py)
+LIST_SORTS = {
+    'upcoming': lambda model: (model.upcoming_shows_count.desc(), model.id.desc()),
+    'shows': lambda model: (model.shows_count.desc(), model.id.desc()),
+    'next': lambda model: (model.next_show_at.asc().nulls_last(), model.id),
+}
+
+
+def list_order(model, sort):
+    # ORDER BY for a ?sort= value; by id when it is empty
+    if not sort:
+        return (model.id,)
+    if sort not in LIST_SORTS:
+        abort(400)
+    return LIST_SORTS[sort](model)
+
+
+def venue_areas_statement(sort=None, where=()):
+    # every live venue (matching `where`, see facets.conditions) with its
+    # upcoming show count, ordered so that venues of the same area come out
+    # next to each other
+    return db.select(
+        Venue.state,
+        Venue.city,
+        Venue.id,
+        Venue.name,
+        Venue.upcoming_shows_count.label('num_upcoming_shows'),
+        Venue.updated_at
+    ).where(
+        *live(Venue), *where
+    ).order_by(
+        Venue.state, Venue.city, *list_order(Venue, sort)
+    )
+
+
+def group_venue_areas(allData):
+    data = []
+
+    for (state, city), rows in groupby(allData, key=lambda v: (v.state, v.city)):
+        venues = [{
+            'id': v.id,
+            'name': v.name,
+            'num_upcoming_shows': v.num_upcoming_shows,
+            # fragment cache versions (fragments.py)
+            'version': v.updated_at
+        } for v in rows]
+        data.append({
+            'city': city,
+            'state': state,
+            'venues': venues,
+            'version': fragments.digest((v['id'], v['version']) for v in venues)
+        })
+
+    return data
+
+
+def venue_areas(sort=None, where=()):
+    # one round trip, no join: the counts are stored on Venue
+    return group_venue_areas(db.session.execute(venue_areas_statement(sort, where)).all())
+
+
+def artists_statement(sort=None, where=()):
+    return db.select(Artist.id, Artist.name, Artist.updated_at).where(*where).order_by(*list_order(Artist, sort))
+
+
+def shows_page_statement(columns, after=None, before=None, per_page=None,
+                         join_artist=True):
+    # One page of shows ordered by (dateshow, venue_id, artist_id), selecting
+    # only `columns` (plus the key). Returns (statement, per_page). Venue is
+    # always joined, to leave out the shows of deleted venues.
+    per_page = per_page or current_app.config['SHOWS_PER_PAGE']
+    key_columns = [Show.dateshow, Show.venue_id, Show.artist_id]
+    key = db.tuple_(*key_columns)
+
+    query = db.select(
+        *columns, *[c.label('cursor_' + c.key) for c in key_columns]
+    ).select_from(Show).join(Venue, db.and_(Venue.id == Show.venue_id, *live(Venue)))
+    if join_artist:
+        query = query.join(Artist, Artist.id == Show.artist_id)
+
+    # keyset pagination: fetch one extra row to know whether another page
+    # exists, walking backwards from the cursor when paging to the previous
+    # page
+    if before:
+        query = query.where(key < before).order_by(
+            Show.dateshow.desc(), Show.venue_id.desc(), Show.artist_id.desc()
+        )
+    else:
+        if after:
+            query = query.where(key > after)
+        query = query.order_by(Show.dateshow, Show.venue_id, Show.artist_id)
+
+    return query.limit(per_page + 1), per_page
+
+
+def shows_page_result(allData, after, before, per_page):
+    # Returns (rows, prev_cursor, next_cursor).
+    if before:
+        has_prev = len(allData) > per_page
+        has_next = True
+        allData = allData[:per_page][::-1]
+    else:
+        has_prev = after is not None
+        has_next = len(allData) > per_page
+        allData = allData[:per_page]
+
+    prev_cursor = None
+    next_cursor = None
+    if allData:
+        if has_prev:
+            first = allData[0]
+            prev_cursor = encode_cursor(
+                first.cursor_dateshow, first.cursor_venue_id, first.cursor_artist_id
+            )
+        if has_next:
+            last = allData[-1]
+            next_cursor = encode_cursor(
+                last.cursor_dateshow, last.cursor_venue_id, last.cursor_artist_id
+            )
+
+    return allData, prev_cursor, next_cursor
+
+
+def shows_page(columns, after=None, before=None, per_page=None, join_artist=True):
+    statement, per_page = shows_page_statement(columns, after, before, per_page, join_artist)
+    return shows_page_result(
+        db.session.execute(statement).all(), after, before, per_page
+    )
+
+
+def _show_keys(model):
+    # (owner, other) foreign keys of Show for a venue or artist page
+    if model is Venue:
+        return Show.venue_id, Show.artist_id
+    return Show.artist_id, Show.venue_id
+
+
+def _show_counts(model):
+    # the stored counters (counters.py), labelled as the detail rows expect
+    return (
+        (model.shows_count - model.upcoming_shows_count).label('past_count'),
+        model.upcoming_shows_count.label('upcoming_count'),
+    )
+
+
+def _trim_page(page, limit):
+    # drops the extra row fetched past `limit`; returns the next page cursor
+    if len(page) <= limit:
+        return None
+    last = page[limit - 1]
+    del page[limit:]
+    return encode_cursor(last.dateshow, last.show_id)
+
+
+def detail_with_shows(model, entity_id, other, past_before=None, upcoming_after=None):
+    # Loads a venue (or artist), its past and upcoming show counts (stored
+    # on the row, see counters.py) and one page of each show list in a
+    # single statement: the entity, outer joined to the UNION ALL of the two
+    # pages of detail_shows_statement. Each page is an ORDER BY ... LIMIT
+    # the (owner, dateshow) index of Show serves, so only the rows of the
+    # page are read, however many shows the entity has. The past/upcoming
+    # split is made by the database against its own now(). Each list holds
+    # at most DETAIL_SHOWS_LIMIT shows; when more exist, a cursor for the
+    # next page is returned with it.
+    pages = (
+        (False, detail_shows_statement(model, entity_id, other, False, past_before)),
+        (True, detail_shows_statement(model, entity_id, other, True, upcoming_after)),
+    )
+    shows = db.union_all(*[
+        # ORDER BY and LIMIT may not appear in the members of a compound
+        # select on SQLite, hence the subqueries
+        db.select(page.subquery(), db.literal(upcoming).label('upcoming'))
+        for upcoming, page in pages
+    ]).subquery()
+
+    rows = db.session.query(
+        model,
+        *_show_counts(model),
+        shows
+    ).outerjoin(
+        shows, db.true()
+    ).filter(
+        model.id == entity_id, *live(model)
+    ).all()
+
+    if not rows:
+        abort(404)
+
+    # the union keeps no order; upcoming shows soonest first, past shows
+    # most recent first
+    key = lambda r: (r.dateshow, r.show_id)
+    past_shows = sorted(
+        (r for r in rows if r.show_id is not None and not r.upcoming), key=key, reverse=True
+    )
+    upcoming_shows = sorted(
+        (r for r in rows if r.show_id is not None and r.upcoming), key=key
+    )
+    past_shows, upcoming_shows, cursors = detail_shows_result(past_shows, upcoming_shows)
+
+    return rows[0], past_shows, upcoming_shows, cursors
+
+
+# The same detail page as three independent statements -- the entity with
+# its counts, and each show list -- for the async path, which runs them
+# concurrently. Row shapes match detail_with_shows, which unions the two
+# show list statements.
+
+def detail_entity_statement(model, entity_id):
+    return db.select(model, *_show_counts(model)).where(model.id == entity_id, *live(model))
+
+
+def detail_shows_statement(model, entity_id, other, upcoming, cursor=None):
+    # one page (plus one row) of the upcoming or the past show list
+    limit = current_app.config['DETAIL_SHOWS_LIMIT']
+    owner_fk, other_fk = _show_keys(model)
+    key = db.tuple_(Show.dateshow, Show.id)
+    now = db.func.now()
+
+    query = db.select(
+        Show.id.label('show_id'),
+        Show.dateshow,
+        other.id.label('other_id'),
+        other.name.label('other_name'),
+        other.image_link.label('other_image_link'),
+    ).join(
+        other, db.and_(other.id == other_fk, *live(other))
+    ).where(owner_fk == entity_id)
+
+    if upcoming:
+        query = query.where(Show.dateshow >= now).order_by(Show.dateshow, Show.id)
+        if cursor:
+            query = query.where(key > cursor)
+    else:
+        query = query.where(Show.dateshow < now).order_by(
+            Show.dateshow.desc(), Show.id.desc()
+        )
+        if cursor:
+            query = query.where(key < cursor)
+
+    return query.limit(limit + 1)
+
+
+def detail_shows_result(past_shows, upcoming_shows):
+    # Returns (past_shows, upcoming_shows, cursors) from the rows of the
+    # two detail_shows_statement queries.
+    limit = current_app.config['DETAIL_SHOWS_LIMIT']
+    past_shows, upcoming_shows = list(past_shows), list(upcoming_shows)
+    cursors = {
+        'past_more': _trim_page(past_shows, limit),
+        'upcoming_more': _trim_page(upcoming_shows, limit),
+    }
+    return past_shows, upcoming_shows, cursors
+
+
+# Validators for HTTP conditional requests (see conditional.py): cheap
+# aggregates that change whenever the matching page would render
+# differently. Each is a single statement of scalar subqueries.
+
+def _scalar(aggregate, *conditions):
+    return db.select(aggregate).where(*conditions).scalar_subquery()
+
+
+def venues_version_statement():
+    # counter updates bump Venue.updated_at
+    return db.select(db.func.max(Venue.updated_at), db.func.count(Venue.id))
+
+
+def artists_version_statement():
+    return db.select(db.func.max(Artist.updated_at), db.func.count(Artist.id))
+
+
+def shows_version_statement():
+    return db.select(
+        _scalar(db.func.max(Show.updated_at)),
+        _scalar(db.func.count(Show.id)),
+        _scalar(db.func.max(Venue.updated_at)),
+        _scalar(db.func.max(Artist.updated_at)),
+    )
+
+
+def detail_version_statement(model, entity_id, other):
+    owner_fk, other_fk = _show_keys(model)
+    owned = owner_fk == model.id
+
+    return db.select(
+        model.updated_at,
+        _scalar(db.func.max(Show.updated_at), owned),
+        _scalar(db.func.count(Show.id), owned),
+        # same clock as detail_with_shows
+        _scalar(db.func.count(Show.id), owned, Show.dateshow >= db.func.now()),
+        _scalar(db.func.max(other.updated_at), owned, other.id == other_fk),
+    ).where(model.id == entity_id, *live(model))
+
+
+def venues_version():
+    return db.session.execute(venues_version_statement()).one()
+
+
+def artists_version():
+    return db.session.execute(artists_version_statement()).one()
+
+
+def shows_version():
+    return db.session.execute(shows_version_statement()).one()
+
+
+def venue_version(venue_id):
+    # None when the venue does not exist or is deleted
+    return db.session.execute(detail_version_statement(Venue, venue_id, Artist)).first()
+
+
+def artist_version(artist_id):
+    return db.session.execute(detail_version_statement(Artist, artist_id, Venue)).first()
@@ -0,0 +1,180 @@
+# ----------------------------------------------------------------------------#
+# Read replicas.
+#
+#   REPLICA_DATABASE_URLS=postgresql://replica-1/fyyur,postgresql://replica-2/fyyur
+#
+# Each URL becomes a Flask-SQLAlchemy bind (replica_0, replica_1, ...). The
+# session class, RoutingSession (see models.py), sends the statements of
+# GET and HEAD requests to one replica per request, picked round robin
+# among the healthy ones. Everything else goes to the primary: other
+# methods, flushes, INSERT / UPDATE / DELETE, SELECT ... FOR UPDATE, and
+# work outside a request (CLI commands, the job worker). Once a request
+# writes, the rest of it reads from the primary too.
+#
+# A replica is checked when picked, at most every REPLICA_CHECK_INTERVAL
+# seconds: it must answer, and on Postgres must not replay more than
+# REPLICA_MAX_LAG seconds behind. A replica whose connection breaks is out
+# until its next check. With no healthy replica, reads go to the primary.
+#
+# Read your writes: a request that wrote sets the REPLICA_STICKY_COOKIE for
+# REPLICA_STICKY_SECONDS, and that client reads from the primary while it
+# holds it. Other clients may read data up to the lag behind. Such a read
+# right after a write can also refill an entry of the detail page or
+# facet caches (cache.py, facets.py) that the write route just deleted;
+# the stale entry is then served until it expires. So with replicas, those
+# pages may be out of date for up to REPLICA_MAX_LAG plus their TTL
+# (CACHE_DEFAULT_TTL, FACETS_CACHE_TTL); lower the TTLs where that
+# matters. Fragments (fragments.py) are keyed by the updated_at of their
+# rows, so a stale one is not used once the replica has caught up.
+#
+# tests/test_replicas.py stands in a copy of the primary's SQLite file
+# for the replica (TEST_REPLICA_DATABASE_URLS does the same for the
+# testing profile).
+# ----------------------------------------------------------------------------#
+
+import itertools
+import re
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+READ_METHODS = ('GET', 'HEAD')
+
+# textual statements that change something
+WRITE_TEXT = re.compile(
+    r'\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER|TRUNCATE)\b', re.I
+)
+
+# seconds a standby's replay is behind; 0 when it has replayed everything
+# it received, NULL on a primary
+LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def bind_key(i):
+    return 'replica_{}'.format(i)
+
+
+def _writes(clause):
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return WRITE_TEXT.match(clause.text) is not None
+    return getattr(clause, '_for_update_arg', None) is not None
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            replicas = current_app.extensions.get('replicas')
+            if replicas is not None:
+                if self._flushing or _writes(clause):
+                    g.db_wrote = True
+                    g.db_replica = None
+                elif 'db_replica' not in g:
+                    g.db_replica = replicas.pick() if replicas.readable() else None
+                if g.db_replica is not None:
+                    return g.db_replica
+        return super(RoutingSession, self).get_bind(mapper, clause, bind, **kwargs)
+
+
+class Replicas(object):
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.keys = [bind_key(i) for i in range(len(app.config['REPLICA_DATABASE_URLS']))]
+        self.lock = threading.Lock()
+        self.turn = itertools.count()
+        # key -> [healthy, monotonic time of the last check]
+        self.health = dict((key, [True, None]) for key in self.keys)
+
+    def readable(self):
+        # may the current request read from a replica
+        return (
+            request.method in READ_METHODS
+            and self.app.config['REPLICA_STICKY_COOKIE'] not in request.cookies
+        )
+
+    def pick(self):
+        # the next healthy replica engine, or None
+        engines = self.db.engines
+        start = next(self.turn)
+        for i in range(len(self.keys)):
+            key = self.keys[(start + i) % len(self.keys)]
+            if self.healthy(key, engines[key]):
+                return engines[key]
+        return None
+
+    def healthy(self, key, engine):
+        now = time.monotonic()
+        with self.lock:
+            healthy, checked = self.health[key]
+            if checked is not None and now - checked < self.app.config['REPLICA_CHECK_INTERVAL']:
+                return healthy
+            # other threads keep the last result while this one checks
+            self.health[key][1] = now
+        healthy = self.check(key, engine)
+        with self.lock:
+            self.health[key][0] = healthy
+        return healthy
+
+    def check(self, key, engine):
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name != 'postgresql':
+                    connection.exec_driver_sql('SELECT 1')
+                    return True
+                lag = connection.exec_driver_sql(LAG_SQL).scalar()
+        except SQLAlchemyError:
+            self.app.logger.warning('replica %s failed its health check', key)
+            return False
+        if lag is not None and lag > self.app.config['REPLICA_MAX_LAG']:
+            self.app.logger.warning('replica %s is %.1f s behind', key, lag)
+            return False
+        return True
+
+    def failed(self, key):
+        with self.lock:
+            self.health[key] = [False, time.monotonic()]
+
+
+def engine_binds(config, engine_options):
+    # SQLALCHEMY_BINDS entries for the replicas
+    binds = {}
+    for i, url in enumerate(config['REPLICA_DATABASE_URLS']):
+        binds[bind_key(i)] = dict(engine_options(dict(config, SQLALCHEMY_DATABASE_URI=url)), url=url)
+    return binds
+
+
+def init_app(app, db):
+    if not app.config['REPLICA_DATABASE_URLS']:
+        return
+    replicas = Replicas(app, db)
+    app.extensions['replicas'] = replicas
+
+    with app.app_context():
+        for key in replicas.keys:
+            def handle_error(context, key=key):
+                if context.is_disconnect:
+                    replicas.failed(key)
+            event.listen(db.engines[key], 'handle_error', handle_error)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            response.set_cookie(
+                app.config['REPLICA_STICKY_COOKIE'], '1',
+                max_age=app.config['REPLICA_STICKY_SECONDS'],
+                httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,189 @@
+# ----------------------------------------------------------------------------#
+# Show scheduling.
+#
+# A show occupies its artist and its venue from dateshow for
+# duration_minutes. Two shows of the same artist, or at the same venue, may
+# not overlap; back to back is fine. Postgres enforces this with the two
+# exclusion constraints declared in models.py, and conflicts() probes
+# their GiST indexes, so a check costs O(log n) whatever the number of
+# shows. On other databases (SQLite in tests) conflicts() range-scans the
+# (artist_id, dateshow) and (venue_id, dateshow) indexes over the last
+# SHOW_MAX_DURATION minutes instead.
+#
+# check_bookings() validates proposed bookings -- known venue and artist,
+# sane duration, no conflict with existing shows or with one another -- and
+# returns user-facing messages. It backs create_show_submission and
+# POST /api/v1/shows/check. A booking racing another one past the check
+# is stopped by the constraints; integrity_message() words that error.
+# ----------------------------------------------------------------------------#
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from flask import current_app
+
+from models import db, Venue, Artist, Show, SHOW_PERIOD, live
+
+Booking = namedtuple('Booking', ['venue_id', 'artist_id', 'start', 'duration'])
+Check = namedtuple('Check', ['booking', 'errors', 'conflicts'])
+
+CONSTRAINT_MESSAGES = {
+    'show_artist_no_overlap': 'The artist is already booked at that time.',
+    'show_venue_no_overlap': 'The venue already has a show at that time.',
+    'Show_venue_id_artist_id_dateshow_key': 'This show is already listed.',
+}
+
+TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+
+def end_of(start, duration):
+    return start + timedelta(minutes=duration)
+
+
+def parse_start(value):
+    if isinstance(value, datetime):
+        return value
+    import dateutil.parser
+    return dateutil.parser.parse(value)
+
+
+def parse_booking(data):
+    # (Booking, errors) from a form or a JSON object
+    errors = []
+    values = {}
+    for key in ('venue_id', 'artist_id'):
+        try:
+            values[key] = int(data.get(key))
+        except (TypeError, ValueError):
+            errors.append('{} must be an integer.'.format(key))
+    try:
+        values['start'] = parse_start(data.get('start_time'))
+    except (TypeError, ValueError, OverflowError):
+        errors.append('start_time must be a date and time.')
+
+    max_duration = current_app.config['SHOW_MAX_DURATION']
+    duration = data.get('duration')
+    if duration in (None, ''):
+        duration = current_app.config['SHOW_DEFAULT_DURATION']
+    try:
+        values['duration'] = int(duration)
+        if not 0 < values['duration'] <= max_duration:
+            raise ValueError(duration)
+    except (TypeError, ValueError):
+        errors.append('duration must be between 1 and {} minutes.'.format(max_duration))
+
+    if errors:
+        return None, errors
+    return Booking(**values), []
+
+
+def _overlapping(start, end):
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # same expression as the exclusion constraints, so their indexes apply
+        return SHOW_PERIOD.op('&&')(db.func.tsrange(start, end))
+    window = timedelta(minutes=current_app.config['SHOW_MAX_DURATION'])
+    return db.and_(Show.dateshow < end, Show.dateshow > start - window)
+
+
+def conflicts(booking):
+    # existing shows overlapping a booking, with the names for the messages;
+    # shows of a deleted venue count until they are purged (deletion.py), as
+    # they do for the exclusion constraints
+    start, end = booking.start, end_of(booking.start, booking.duration)
+
+    def query(owner):
+        return db.select(
+            Show.id, Show.venue_id, Show.artist_id, Show.dateshow, Show.duration_minutes,
+            Venue.name.label('venue_name'), Artist.name.label('artist_name')
+        ).join(
+            Venue, Venue.id == Show.venue_id
+        ).join(
+            Artist, Artist.id == Show.artist_id
+        ).where(owner, _overlapping(start, end))
+
+    rows = db.session.execute(db.union_all(
+        query(Show.artist_id == booking.artist_id),
+        query(Show.venue_id == booking.venue_id)
+    )).all()
+
+    found = {}
+    for row in rows:
+        if row.dateshow < end and end_of(row.dateshow, row.duration_minutes) > start:
+            found[row.id] = row
+    return sorted(found.values(), key=lambda row: (row.dateshow, row.id))
+
+
+def conflict_message(booking, row):
+    period = '{} to {}'.format(
+        row.dateshow.strftime(TIME_FORMAT),
+        end_of(row.dateshow, row.duration_minutes).strftime(TIME_FORMAT)
+    )
+    if row.artist_id == booking.artist_id:
+        return '{} is already booked at {} from {}.'.format(
+            row.artist_name, row.venue_name, period
+        )
+    return '{} already has a show by {} from {}.'.format(
+        row.venue_name, row.artist_name, period
+    )
+
+
+def _check_each_other(bookings, errors):
+    # overlaps between the proposed bookings themselves: sorted by start per
+    # artist and per venue, each booking is only compared with the ones
+    # starting before it ends
+    for key in ('artist_id', 'venue_id'):
+        owned = sorted(
+            (b for b in enumerate(bookings) if b[1] is not None),
+            key=lambda b: (getattr(b[1], key), b[1].start)
+        )
+        for _, group in groupby(owned, key=lambda b: getattr(b[1], key)):
+            group = list(group)
+            for n, (i, booking) in enumerate(group):
+                end = end_of(booking.start, booking.duration)
+                for j, other in group[n + 1:]:
+                    if other.start >= end:
+                        break
+                    what = 'artist' if key == 'artist_id' else 'venue'
+                    errors[i].append('Overlaps booking #{} for the same {}.'.format(j + 1, what))
+                    errors[j].append('Overlaps booking #{} for the same {}.'.format(i + 1, what))
+
+
+def check_bookings(items):
+    # one Check per item (a form or a JSON object), in order
+    parsed = [parse_booking(item) for item in items]
+    bookings = [booking for booking, _ in parsed]
+    errors = [list(item_errors) for _, item_errors in parsed]
+    found = [[] for _ in items]
+
+    valid = [b for b in bookings if b is not None]
+    venue_ids = set(db.session.scalars(
+        db.select(Venue.id).where(Venue.id.in_(set(b.venue_id for b in valid)), *live(Venue))
+    )) if valid else set()
+    artist_ids = set(db.session.scalars(
+        db.select(Artist.id).where(Artist.id.in_(set(b.artist_id for b in valid)))
+    )) if valid else set()
+
+    for i, booking in enumerate(bookings):
+        if booking is None:
+            continue
+        if booking.venue_id not in venue_ids:
+            errors[i].append('Unknown venue.')
+        if booking.artist_id not in artist_ids:
+            errors[i].append('Unknown artist.')
+        if errors[i]:
+            continue
+        found[i] = conflicts(booking)
+        errors[i].extend(conflict_message(booking, row) for row in found[i])
+
+    _check_each_other(bookings, errors)
+    return [Check(*check) for check in zip(bookings, errors, found)]
+
+
+def integrity_message(error):
+    # user-facing message for an IntegrityError raised by a booking
+    text = str(error.orig)
+    for constraint, message in CONSTRAINT_MESSAGES.items():
+        if constraint in text:
+            return message
+    return 'The show conflicts with an existing one.'
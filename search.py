@@ -0,0 +1,214 @@
+# ----------------------------------------------------------------------------#
+# Search.
+#
+# Venue and artist search goes through a backend selected by SEARCH_BACKEND
+# in config.py:
+#
+#   'postgres' -- full text (tsvector) plus trigram (pg_trgm) matching over
+#                 name, city, state and genres, served by the expression
+#                 indexes created in migrations/versions/3f1c8d2e9a6b_.py.
+#   'sqlite'   -- an FTS5 table with the trigram tokenizer, kept up to date
+#                 by index()/remove(); meant for tests and local runs. The
+#                 table is created by db.create_all() (or `flask
+#                 search-reindex`), never while searching: searches are
+#                 reads, which may go to a read replica (replicas.py).
+#
+# Soft-deleted venues are left out of both.
+#
+# Both return ranked, paginated results as SearchResults.
+# ----------------------------------------------------------------------------#
+
+from collections import namedtuple
+
+import click
+from flask import current_app
+from sqlalchemy import event
+
+from models import live
+
+SearchResults = namedtuple('SearchResults', ['total', 'items'])
+SearchHit = namedtuple('SearchHit', ['id', 'name'])
+
+# Text search configuration used both here and by the migration; the two
+# must agree for the expression indexes to be picked up.
+TS_CONFIG = "'simple'::regconfig"
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return '%' + escaped + '%'
+
+
+class SearchBackend(object):
+
+    def __init__(self, db):
+        self.db = db
+
+    # whether index() and remove() do anything; when not, no job is queued
+    # for them (jobs.enqueue_indexing)
+    keeps_index = False
+
+    def statement(self, model, term, page=1, per_page=20):
+        # select of (id, name, total) for one page of ranked hits
+        raise NotImplementedError
+
+    def results(self, rows):
+        total = rows[0].total if rows else 0
+        return SearchResults(total, [SearchHit(r.id, r.name) for r in rows])
+
+    def search(self, model, term, page=1, per_page=20):
+        rows = self.db.session.execute(
+            self.statement(model, term, page, per_page)
+        ).fetchall()
+        return self.results(rows)
+
+    def index(self, entity):
+        # called inside the writing transaction, after flush
+        pass
+
+    def remove(self, entity):
+        pass
+
+    def reindex(self, models):
+        pass
+
+
+class PostgresSearchBackend(SearchBackend):
+
+    def document(self, model):
+        # same expression as the one indexed by the migration
+        return self.db.func.fyyur_search_text(
+            model.name, model.city, model.state, model.genres
+        )
+
+    def statement(self, model, term, page=1, per_page=20):
+        db = self.db
+        document = self.document(model)
+        tsvector = db.func.to_tsvector(db.literal_column(TS_CONFIG), document)
+        tsquery = db.func.plainto_tsquery(db.literal_column(TS_CONFIG), term)
+        rank = (
+            db.func.ts_rank(tsvector, tsquery) +
+            db.func.word_similarity(term, document)
+        ).label('rank')
+
+        return db.select(
+            model.id,
+            model.name,
+            rank,
+            db.func.count().over().label('total')
+        ).where(
+            *live(model)
+        ).where(
+            db.or_(
+                tsvector.op('@@')(tsquery),
+                # typo tolerant: trigram word similarity, uses the gin_trgm index
+                db.literal(term).op('<%')(document),
+                document.ilike(_like_pattern(term), escape='\\')
+            )
+        ).order_by(
+            rank.desc(), model.id
+        ).limit(per_page).offset((page - 1) * per_page)
+
+
+class SqliteSearchBackend(SearchBackend):
+
+    keeps_index = True
+
+    # the FTS table, created by create_tables() and reindex()
+    setup = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "kind UNINDEXED, entity_id UNINDEXED, name, document, "
+        "tokenize='trigram')",
+    )
+
+    def _execute(self, sql, **params):
+        return self.db.session.execute(self.db.text(sql), params)
+
+    def index(self, entity):
+        self.remove(entity)
+        document = ' '.join(
+            [entity.name or '', entity.city or '', entity.state or ''] +
+            list(entity.genres or [])
+        )
+        self._execute(
+            'INSERT INTO search_index (kind, entity_id, name, document) '
+            'VALUES (:kind, :entity_id, :name, :document)',
+            kind=entity.__tablename__, entity_id=entity.id,
+            name=entity.name, document=document
+        )
+
+    def remove(self, entity):
+        self._execute(
+            'DELETE FROM search_index WHERE kind = :kind AND entity_id = :entity_id',
+            kind=entity.__tablename__, entity_id=entity.id
+        )
+
+    def reindex(self, models):
+        for sql in self.setup:
+            self._execute(sql)
+        for model in models:
+            self._execute(
+                'DELETE FROM search_index WHERE kind = :kind',
+                kind=model.__tablename__
+            )
+            for entity in model.query.filter(*live(model)).yield_per(1000):
+                self.index(entity)
+
+    def statement(self, model, term, page=1, per_page=20):
+        params = {
+            'kind': model.__tablename__,
+            'limit': per_page,
+            'offset': (page - 1) * per_page,
+        }
+        # the trigram tokenizer needs at least three characters to MATCH;
+        # shorter terms fall back to a LIKE over the same table
+        if len(term) >= 3:
+            params['match'] = '"' + term.replace('"', '""') + '"'
+            where, order = 'search_index MATCH :match', 'rank'
+        else:
+            params['pattern'] = _like_pattern(term)
+            where, order = "document LIKE :pattern ESCAPE '\\'", 'name'
+        if live(model):
+            # deleted since they were indexed, until the venue_deleted job
+            # (deletion.py) removes them
+            where += ' AND entity_id NOT IN (SELECT id FROM "{}" WHERE deleted_at IS NOT NULL)'.format(
+                model.__tablename__
+            )
+
+        return self.db.text(
+            'SELECT entity_id AS id, name, count(*) OVER () AS total '
+            'FROM search_index WHERE kind = :kind AND ' + where +
+            ' ORDER BY ' + order + ' LIMIT :limit OFFSET :offset'
+        ).bindparams(**params)
+
+
+BACKENDS = {
+    'postgres': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+
+def get_backend():
+    return current_app.extensions['search']
+
+
+def create_tables(target, connection, **kw):
+    # after db.create_all(): the tables of the SQLite backend, which are
+    # not models
+    if connection.dialect.name == 'sqlite':
+        for sql in SqliteSearchBackend.setup:
+            connection.exec_driver_sql(sql)
+
+
+def init_app(app, db, models):
+    backend = BACKENDS[app.config.get('SEARCH_BACKEND', 'postgres')](db)
+    app.extensions['search'] = backend
+    if not event.contains(db.metadata, 'after_create', create_tables):
+        event.listen(db.metadata, 'after_create', create_tables)
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Rebuild the search index from the Venue and Artist tables."""
+        backend.reindex(models)
+        db.session.commit()
+        click.echo('Search index rebuilt.')
@@ -0,0 +1,154 @@
+# ----------------------------------------------------------------------------#
+# Shows.
+# ----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, render_template, request
+from flask import flash
+from sqlalchemy.exc import IntegrityError
+
+import autocomplete
+import jobs
+import scheduling
+from conditional import conditional
+from models import db, Venue, Artist, Show
+from queries import decode_cursor, shows_page, shows_version
+
+shows_bp = Blueprint('shows', __name__)
+
+SHOWS_PAGE_COLUMNS = [
+    Show.id,
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Show.artist_id,
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Show.dateshow,
+    Venue.updated_at.label('venue_updated_at'),
+    Artist.updated_at.label('artist_updated_at')
+]
+
+
+def shows_data(allData):
+    data = []
+
+    for s in allData:
+        data.append({
+            'venue_id': s.venue_id,
+            'venue_name': s.venue_name,
+            'artist_id': s.artist_id,
+            'artist_name': s.artist_name,
+            'artist_image_link': s.artist_image_link,
+            'start_time': s.dateshow,
+            # fragment cache key and version (fragments.py)
+            'id': s.id,
+            'version': '{}|{}'.format(s.venue_updated_at, s.artist_updated_at)
+        })
+
+    return data
+
+
+def booking_data(form):
+    # Returns (data, errors): the new show form's data, with a venue or
+    # artist typed by name instead of picked from the suggestions replaced
+    # by its id.
+    data = form.to_dict()
+    errors = []
+    for key, model in (('venue_id', Venue), ('artist_id', Artist)):
+        value = data.get(key, '').strip()
+        if value and not value.isdigit():
+            entity_id = autocomplete.resolve(model, value)
+            if entity_id is None:
+                errors.append('No {} is named "{}".'.format(model.__tablename__.lower(), value))
+            else:
+                data[key] = str(entity_id)
+    return data, errors
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@shows_bp.route('/shows')
+@conditional(shows_version)
+def shows():
+    # displays list of shows at /shows
+    # TODO: replace with real venues data.
+    #       num_shows should be aggregated based on number of upcoming shows per venue.
+
+    after = decode_cursor(request.args.get('after'))
+    before = decode_cursor(request.args.get('before'))
+
+    allData, prev_cursor, next_cursor = shows_page(
+        SHOWS_PAGE_COLUMNS,
+        after=after,
+        before=before
+    )
+
+    data = shows_data(allData)
+
+    return render_template(
+        'pages/shows.html',
+        shows=data,
+        prev_cursor=prev_cursor,
+        next_cursor=next_cursor
+    )
+
+
+@shows_bp.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@shows_bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    # TODO: insert form data as a new Show record in the db, instead
+
+    error = False
+    errors = []
+    try:
+        data, errors = booking_data(request.form)
+        if not errors:
+            check, = scheduling.check_bookings([data])
+            errors = check.errors
+            booking = check.booking
+        if not errors:
+            show = Show(
+                artist_id=booking.artist_id,
+                venue_id=booking.venue_id,
+                dateshow=booking.start,
+                duration_minutes=booking.duration
+            )
+            db.session.add(show)
+            jobs.enqueue('show_added', {'venue_id': booking.venue_id, 'artist_id': booking.artist_id})
+            db.session.commit()
+    except IntegrityError as e:
+        # booked concurrently, after the check
+        errors = [scheduling.integrity_message(e)]
+        db.session.rollback()
+    except Exception:
+        error = True
+        db.session.rollback()
+        current_app.logger.exception('Show could not be listed.')
+    finally:
+        db.session.close()
+
+    if errors:
+        # the form as submitted, with the errors shown above it
+        from forms import ShowForm
+        form = ShowForm(request.form)
+        form.form_errors.extend(errors)
+        return render_template('forms/new_show.html', form=form)
+
+    if error:
+        flash('An error occurred. Show could not be listed.')
+    else:
+        # on successful db insert, flash success
+        flash('Show was successfully listed!')
+
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html')
@@ -2,3 +2,51 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Name autocomplete for the id fields of the new show form: inputs with a
+// data-autocomplete URL and a <datalist> get their options from
+// /autocomplete/..., fetched once typing pauses. Picking an option puts
+// its id in the field.
+(function () {
+  var DELAY = 200;
+
+  function wire(input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var timer = null;
+    var pending = null;
+
+    function render(items) {
+      list.innerHTML = '';
+      items.forEach(function (item) {
+        var option = document.createElement('option');
+        option.value = item.id;
+        option.label = item.name + (item.city ? ' (' + item.city + ', ' + item.state + ')' : '');
+        list.appendChild(option);
+      });
+    }
+
+    input.addEventListener('input', function () {
+      var q = input.value.trim();
+      clearTimeout(timer);
+      // ids are not looked up
+      if (!q || /^\d+$/.test(q)) {
+        return;
+      }
+      timer = setTimeout(function () {
+        if (pending) {
+          pending.abort();
+        }
+        pending = new AbortController();
+        fetch(input.dataset.autocomplete + '?q=' + encodeURIComponent(q), {signal: pending.signal})
+          .then(function (response) { return response.json(); })
+          .then(render)
+          .catch(function () {});
+      }, DELAY);
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    var inputs = document.querySelectorAll('input[data-autocomplete][list]');
+    Array.prototype.forEach.call(inputs, wire);
+  });
+})();
@@ -0,0 +1,85 @@
+# ----------------------------------------------------------------------------#
+# Test fixtures.
+#
+#   python -m pytest -q
+#
+# Tests run the testing profile (config.py) on a SQLite file holding a
+# small benchmarks.data set. The data set is generated once per session and
+# copied for each test, so tests may write to it.
+# ----------------------------------------------------------------------------#
+
+import os
+import shutil
+import sys
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.data import create_app, generate, sample  # noqa: E402
+from models import db  # noqa: E402
+
+SHOWS = 400
+
+
+def sqlite_url(path):
+    return 'sqlite:///' + str(path)
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    # path of the generated SQLite file; copy it before use
+    path = tmp_path_factory.mktemp('dataset') / 'fyyur.db'
+    app = create_app(sqlite_url(path))
+    with app.app_context():
+        db.create_all()
+        generate(SHOWS)
+        db.session.remove()
+        db.engine.dispose()
+    return path
+
+
+@pytest.fixture
+def database(dataset, tmp_path):
+    # path of this test's copy of the data set
+    path = tmp_path / 'fyyur.db'
+    shutil.copyfile(str(dataset), str(path))
+    return path
+
+
+@pytest.fixture
+def app(database):
+    app = create_app(sqlite_url(database))
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def data(app):
+    # ids and terms of benchmarks.data.sample
+    with app.app_context():
+        return sample()
+
+
+@pytest.fixture
+def statements(app):
+    # SQL statements sent to the primary database, in order
+    executed = []
+
+    def record(connection, cursor, statement, *args):
+        executed.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', record)
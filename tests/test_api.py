@@ -0,0 +1,160 @@
+# JSON API (api.py): sparse fields, batch lookups, booking checks, limits
+# and the admin endpoints.
+
+from datetime import datetime
+
+import pytest
+
+from models import db, Venue, Artist, Show
+
+
+def selects(statements):
+    return [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+
+
+def test_fields_select_only_those_columns(client, data, statements):
+    response = client.get('/api/v1/venues', query_string={'fields': 'name,city', 'limit': 3})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['data']) == 3
+    assert all(set(row) == {'name', 'city'} for row in body['data'])
+
+    query, = selects(statements)
+    assert 'city' in query
+    assert 'address' not in query and 'genres' not in query
+
+    response = client.get('/api/v1/venues', query_string={'fields': 'name,nope'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Unknown fields: nope'}
+
+
+def test_detail_fields(client, data):
+    url = '/api/v1/artists/{}'.format(data['artist_id'])
+    body = client.get(url, query_string={'fields': 'name,upcoming_shows_count'}).get_json()
+    assert set(body) == {'name', 'upcoming_shows_count'}
+
+    body = client.get(url, query_string={'fields': 'name,past_shows'}).get_json()
+    assert set(body) == {'name', 'past_shows', 'past_shows_more'}
+    assert all(set(show) == {'venue_id', 'venue_name', 'venue_image_link', 'start_time'}
+               for show in body['past_shows'])
+
+    assert client.get('/api/v1/artists/999999').status_code == 404
+
+
+def test_list_pages(client):
+    first = client.get('/api/v1/artists', query_string={'fields': 'id', 'limit': 5}).get_json()
+    second = client.get('/api/v1/artists', query_string={
+        'fields': 'id', 'limit': 5, 'after': first['next_cursor']
+    }).get_json()
+    ids = [row['id'] for row in first['data'] + second['data']]
+    assert ids == sorted(ids) and len(set(ids)) == 10
+
+
+@pytest.mark.parametrize('limit, expected', [(None, 30), ('3', 3), ('0', 1), ('x', 30)])
+def test_shows_limit(app, client, limit, expected):
+    assert app.config['SHOWS_PER_PAGE'] == 30
+    query = {'limit': limit} if limit is not None else {}
+    assert len(client.get('/api/v1/shows', query_string=query).get_json()['data']) == expected
+
+
+def test_batch_is_one_query_per_type(app, client, statements):
+    with app.app_context():
+        shows = db.session.scalars(db.select(Show.id).order_by(Show.id).limit(3)).all()
+    del statements[:]
+    response = client.post('/api/v1/batch', json={
+        'venues': [1, 2, 999999],
+        'artists': [1],
+        'shows': shows,
+        'fields': {'venues': ['name'], 'shows': ['start_time']},
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [row['id'] for row in body['venues']] == [1, 2]
+    assert set(body['venues'][0]) == {'id', 'name'}
+    assert [row['id'] for row in body['artists']] == [1]
+    assert [row['id'] for row in body['shows']] == shows
+    assert set(body['shows'][0]) == {'id', 'start_time'}
+    assert len(selects(statements)) == 3
+
+    # the same through the query string
+    response = client.get('/api/v1/batch', query_string={'venues': '2,1', 'venues_fields': 'name'})
+    assert [row['id'] for row in response.get_json()['venues']] == [1, 2]
+    assert client.get('/api/v1/batch', query_string={'venues': '1,x'}).status_code == 400
+
+
+@pytest.fixture
+def booked(app):
+    # a venue, an artist and one of their shows, 20:00 to 22:00
+    with app.app_context():
+        venue = Venue(name='Quokka Hall', city='Austin', state='TX', genres=['Jazz'])
+        other = Venue(name='Wombat Room', city='Austin', state='TX', genres=['Jazz'])
+        artist = Artist(name='The Quokkas', city='Austin', state='TX', genres=['Jazz'])
+        db.session.add_all([venue, other, artist])
+        db.session.flush()
+        show = Show(venue_id=venue.id, artist_id=artist.id,
+                    dateshow=datetime(2040, 1, 1, 20), duration_minutes=120)
+        db.session.add(show)
+        db.session.commit()
+        return {'venue_id': venue.id, 'other_id': other.id, 'artist_id': artist.id, 'show_id': show.id}
+
+
+def test_check_overlaps(app, client, booked):
+    overlapping = {'venue_id': booked['other_id'], 'artist_id': booked['artist_id'],
+                   'start_time': '2040-01-01T21:00', 'duration': 30}
+    back_to_back = {'venue_id': booked['venue_id'], 'artist_id': booked['artist_id'],
+                    'start_time': '2040-01-01T22:00', 'duration': 60}
+    bookings = [
+        overlapping,
+        back_to_back,
+        {'venue_id': 999999, 'artist_id': booked['artist_id'], 'start_time': '2040-02-01T20:00'},
+        {'venue_id': 'x', 'artist_id': booked['artist_id'], 'start_time': 'soon'},
+    ]
+    response = client.post('/api/v1/shows/check', json={'bookings': bookings})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['ok'] for r in results] == [False, True, False, False]
+
+    conflict, = results[0]['conflicts']
+    assert conflict['id'] == booked['show_id']
+    assert (conflict['start_time'], conflict['end_time']) == ('2040-01-01T20:00:00', '2040-01-01T22:00:00')
+    assert results[0]['errors'] == [
+        'The Quokkas is already booked at Quokka Hall from 2040-01-01 20:00 to 2040-01-01 22:00.'
+    ]
+    assert results[2]['errors'] == ['Unknown venue.']
+    assert len(results[3]['errors']) == 2
+
+    # proposed bookings are checked against one another too
+    later = dict(back_to_back, venue_id=booked['other_id'], start_time='2040-01-01T22:30')
+    results = client.post('/api/v1/shows/check', json={'bookings': [back_to_back, later]}).get_json()['results']
+    assert [(r['errors'], r['conflicts']) for r in results] == [
+        (['Overlaps booking #2 for the same artist.'], []),
+        (['Overlaps booking #1 for the same artist.'], []),
+    ]
+
+    # nothing is booked
+    with app.app_context():
+        assert db.session.scalar(
+            db.select(db.func.count()).select_from(Show).where(Show.artist_id == booked['artist_id'])
+        ) == 1
+    assert client.post('/api/v1/shows/check', json={'bookings': {}}).status_code == 400
+
+
+def test_admin_endpoints_need_a_token(app, client, booked):
+    url = '/api/v1/venues/{}'.format(booked['venue_id'])
+    app.config['API_ADMIN_TOKEN'] = 's3cret'
+
+    for headers in ({}, {'Authorization': 'Bearer wrong'}):
+        assert client.delete(url, headers=headers).status_code == 403
+        assert client.post(url + '/restore', headers=headers).status_code == 403
+        assert client.post(url + '/purge', headers=headers).status_code == 403
+    assert client.get(url).status_code == 200
+
+    headers = {'Authorization': 'Bearer s3cret'}
+    assert client.delete(url, headers=headers).status_code == 200
+    assert client.get(url).status_code == 404
+    assert client.post(url + '/restore', headers=headers).status_code == 200
+    assert client.get(url).status_code == 200
+
+    app.config['API_ADMIN_TOKEN'] = None
+    app.config['API_ADMIN_ALLOWED_IPS'] = ['127.0.0.1']
+    assert client.delete(url).status_code == 200
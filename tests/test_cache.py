@@ -0,0 +1,63 @@
+# Detail page cache (cache.py) across processes: two apps on the same
+# database stand in for two workers, each with its own 'lru' cache.
+
+import pytest
+
+from benchmarks.data import create_app
+from conftest import sqlite_url
+from models import db, Venue
+
+VENUE_FORM = {
+    'city': 'Austin', 'state': 'TX', 'address': '1 Main St', 'phone': '555-000-0000',
+    'image_link': '', 'genres': ['Jazz'], 'facebook_link': '', 'website': '',
+    'seeking_talent': 'No', 'seeking_description': '',
+}
+
+
+@pytest.fixture
+def workers(database):
+    apps = [create_app(sqlite_url(database), CACHE_BACKEND='lru') for _ in range(2)]
+    yield [app.test_client() for app in apps]
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_write_on_one_worker_shows_on_the_other(workers, data):
+    reader, writer = workers
+    url = '/venues/{}'.format(data['venue_id'])
+    first = reader.get(url)
+    assert reader.get(url).headers['ETag'] == first.headers['ETag']
+
+    writer.post(url + '/edit', data=dict(VENUE_FORM, name='Renamed Hall'))
+
+    response = reader.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert b'Renamed Hall' in response.data
+    assert response.headers['ETag'] != first.headers['ETag']
+
+
+def test_cached_body_matches_its_etag(workers, data):
+    reader, writer = workers
+    url = '/venues/{}'.format(data['venue_id'])
+    reader.get(url)
+    writer.post(url + '/edit', data=dict(VENUE_FORM, name='Renamed Hall'))
+    # a client without the edit's flashed message, which is not cached
+    renamed = writer.application.test_client().get(url)
+
+    # the reader's cache holds the page from before the edit
+    response = reader.get(url)
+    assert response.headers['ETag'] == renamed.headers['ETag']
+    assert response.data == renamed.data
+
+
+def test_deleted_venue_is_not_served_from_cache(workers, data):
+    reader, writer = workers
+    url = '/venues/{}'.format(data['venue_id'])
+    assert reader.get(url).status_code == 200
+
+    writer.delete(url)
+
+    assert reader.get(url).status_code == 404
+    with writer.application.app_context():
+        assert db.session.get(Venue, data['venue_id']).deleted_at is not None
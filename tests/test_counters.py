@@ -0,0 +1,77 @@
+# Stored show counters (counters.py): `flask counters roll` and
+# `flask counters check`.
+
+from datetime import timedelta
+
+import pytest
+
+import counters
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def started(app):
+    # a venue whose counters were last computed before its next show
+    # started
+    with app.app_context():
+        now = counters.database_now()
+        venue = Venue(name='Quokka Hall', city='Austin', state='TX', genres=['Jazz'])
+        artist = Artist(name='The Quokkas', city='Austin', state='TX', genres=['Jazz'])
+        db.session.add_all([venue, artist])
+        db.session.flush()
+        db.session.add_all([
+            Show(venue_id=venue.id, artist_id=artist.id, dateshow=now - timedelta(hours=1)),
+            Show(venue_id=venue.id, artist_id=artist.id, dateshow=now + timedelta(days=1)),
+        ])
+        db.session.flush()
+        counters.refresh(Venue, [venue.id], now - timedelta(hours=2))
+        counters.refresh(Artist, [artist.id], now - timedelta(hours=2))
+        db.session.commit()
+        return {'venue_id': venue.id, 'artist_id': artist.id}
+
+
+def upcoming(app, model, entity_id):
+    with app.app_context():
+        entity = db.session.get(model, entity_id)
+        return entity.shows_count, entity.upcoming_shows_count
+
+
+def test_roll(app, started):
+    assert upcoming(app, Venue, started['venue_id']) == (2, 2)
+
+    result = app.test_cli_runner().invoke(args=['counters', 'roll'])
+    assert result.exit_code == 0, result.output
+    assert result.output == '2 counters rolled.\n'
+    assert upcoming(app, Venue, started['venue_id']) == (2, 1)
+    assert upcoming(app, Artist, started['artist_id']) == (2, 1)
+
+    # nothing left to roll
+    assert app.test_cli_runner().invoke(args=['counters', 'roll']).output == '0 counters rolled.\n'
+
+
+def test_check(app, started):
+    runner = app.test_cli_runner()
+    # check rolls first
+    result = runner.invoke(args=['counters', 'check'])
+    assert result.exit_code == 0, result.output
+    assert 'Counters are consistent.' in result.output
+
+    with app.app_context():
+        db.session.get(Venue, started['venue_id']).shows_count = 7
+        db.session.commit()
+    result = runner.invoke(args=['counters', 'check'])
+    assert result.exit_code == 1
+    assert 'Venue: 1 off (ids {})'.format(started['venue_id']) in result.output
+
+    result = runner.invoke(args=['counters', 'check', '--fix'])
+    assert result.exit_code == 0, result.output
+    assert 'Counters fixed.' in result.output
+    assert upcoming(app, Venue, started['venue_id']) == (2, 1)
+    assert 'Counters are consistent.' in runner.invoke(args=['counters', 'check']).output
+
+
+def test_generated_counters_are_consistent(app):
+    with app.app_context():
+        now = counters.database_now()
+        assert counters.mismatches(Venue, now) == []
+        assert counters.mismatches(Artist, now) == []
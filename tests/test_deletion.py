@@ -0,0 +1,123 @@
+# Soft delete, restore and purge of venues (deletion.py), with the jobs
+# they queue run by a burst worker (jobs.py).
+
+from datetime import timedelta
+
+import pytest
+
+import counters
+import jobs
+from models import db, Venue, Artist, Show, Job, utcnow
+
+
+@pytest.fixture
+def venues(app):
+    # two venues; an artist with five upcoming shows at the first and one
+    # at the second
+    app.config['VENUE_PURGE_BATCH_SIZE'] = 2
+    with app.app_context():
+        first = Venue(name='Quokka Hall', city='Austin', state='TX', genres=['Jazz'])
+        second = Venue(name='Wombat Room', city='Austin', state='TX', genres=['Jazz'])
+        artist = Artist(name='The Quokkas', city='Austin', state='TX', genres=['Jazz'])
+        db.session.add_all([first, second, artist])
+        db.session.flush()
+        start = utcnow() + timedelta(days=30)
+        db.session.add_all(
+            Show(venue_id=first.id, artist_id=artist.id, dateshow=start + timedelta(days=i))
+            for i in range(5)
+        )
+        db.session.add(Show(venue_id=second.id, artist_id=artist.id, dateshow=start))
+        db.session.flush()
+        counters.refresh(Venue, [first.id, second.id])
+        counters.refresh(Artist, [artist.id])
+        db.session.commit()
+        return {'first': first.id, 'second': second.id, 'artist': artist.id}
+
+
+def artist_counts(app, artist_id):
+    with app.app_context():
+        artist = db.session.get(Artist, artist_id)
+        return artist.shows_count, artist.upcoming_shows_count
+
+
+def work(app):
+    with app.app_context():
+        return jobs.work(burst=True)
+
+
+def shows_at(app, venue_id):
+    with app.app_context():
+        return db.session.scalar(
+            db.select(db.func.count()).select_from(Show).where(Show.venue_id == venue_id)
+        )
+
+
+def test_delete_and_restore(app, client, venues):
+    url = '/venues/{}'.format(venues['first'])
+    assert client.get(url).status_code == 200
+
+    client.delete(url)
+    assert client.get(url).status_code == 404
+    assert client.get('/api/v1/venues/{}'.format(venues['first'])).status_code == 404
+    # the venue's shows stay until it is purged
+    assert shows_at(app, venues['first']) == 5
+    # the artist's counters leave them out once the job has run
+    assert artist_counts(app, venues['artist']) == (6, 6)
+    work(app)
+    assert artist_counts(app, venues['artist']) == (1, 1)
+
+    result = app.test_cli_runner().invoke(args=['venues', 'restore', str(venues['first'])])
+    assert result.exit_code == 0, result.output
+    assert client.get(url).status_code == 200
+    work(app)
+    assert artist_counts(app, venues['artist']) == (6, 6)
+
+    # restoring a live venue is an error
+    result = app.test_cli_runner().invoke(args=['venues', 'restore', str(venues['first'])])
+    assert result.exit_code != 0
+
+
+def test_purge(app, client, venues):
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['venues', 'purge', str(venues['first'])]).exit_code != 0
+
+    client.delete('/venues/{}'.format(venues['first']))
+    result = runner.invoke(args=['venues', 'purge', str(venues['first'])])
+    assert result.exit_code == 0, result.output
+    # queued once, however often asked
+    runner.invoke(args=['venues', 'purge', str(venues['first'])])
+    with app.app_context():
+        assert db.session.scalar(
+            db.select(db.func.count()).select_from(Job)
+            .where(Job.name == 'venue_purge', Job.status == 'queued')
+        ) == 1
+
+    # two shows per batch: three batches, then the venue row
+    done = work(app)
+    assert done['done'] >= 4
+    assert shows_at(app, venues['first']) == 0
+    assert shows_at(app, venues['second']) == 1
+    with app.app_context():
+        assert db.session.get(Venue, venues['first']) is None
+        assert counters.mismatches(Venue, counters.database_now()) == []
+        assert counters.mismatches(Artist, counters.database_now()) == []
+    assert artist_counts(app, venues['artist']) == (1, 1)
+
+
+def test_purge_expired(app, client, venues):
+    client.delete('/venues/{}'.format(venues['first']))
+    runner = app.test_cli_runner()
+
+    assert 'No venues to purge.' in runner.invoke(args=['venues', 'purge', '--expired']).output
+
+    with app.app_context():
+        db.session.get(Venue, venues['first']).deleted_at = utcnow() - timedelta(
+            days=app.config['VENUE_PURGE_AFTER_DAYS'] + 1
+        )
+        db.session.commit()
+    result = runner.invoke(args=['venues', 'purge', '--expired'])
+    assert '1 venues queued for purging.' in result.output
+    work(app)
+    with app.app_context():
+        assert db.session.get(Venue, venues['first']) is None
+        assert db.session.get(Venue, venues['second']) is not None
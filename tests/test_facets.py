@@ -0,0 +1,66 @@
+# Genre, city and state facets of the venue and artist lists (facets.py):
+# the counts match the filtered rows.
+
+import html
+import re
+from collections import Counter
+
+import pytest
+
+import deletion
+import facets
+from models import db, Venue, Artist, live
+
+
+def expected_counts(model, genres=(), state=None):
+    rows = db.session.execute(db.select(model).where(*live(model))).scalars().all()
+    rows = [
+        row for row in rows
+        if set(genres) <= set(row.genres or []) and (state is None or row.state == state)
+    ]
+    return {
+        'genre': Counter(genre for row in rows for genre in row.genres or []),
+        'city': Counter(row.city for row in rows if row.city),
+        'state': Counter(row.state for row in rows if row.state),
+    }
+
+
+@pytest.mark.parametrize('model, url', [(Venue, '/venues'), (Artist, '/artists')])
+def test_counts(app, data, model, url):
+    for genres, state in [((), None), ((data['genre'],), None), ((data['genre'],), data['state'])]:
+        with app.test_request_context(url):
+            filters = {'genre': list(genres), 'city': None, 'state': state}
+            counts = facets.facet_counts(model, filters)
+            assert {name: dict(values) for name, values in counts.items()} == {
+                name: dict(values) for name, values in expected_counts(model, genres, state).items()
+            }
+            # most frequent first
+            for values in counts.values():
+                assert [count for _, count in values] == sorted((c for _, c in values), reverse=True)
+
+
+def test_deleted_venues_are_not_counted(app, data):
+    filters = {'genre': [], 'city': None, 'state': None}
+    with app.test_request_context('/venues'):
+        before = dict(facets.facet_counts(Venue, filters)['city'])
+        city = db.session.get(Venue, data['venue_id']).city
+        area = deletion.delete(data['venue_id'])
+        db.session.commit()
+        deletion.invalidate(data['venue_id'], area)
+        after = dict(facets.facet_counts(Venue, filters)['city'])
+    assert after.get(city, 0) == before[city] - 1
+
+
+def test_page(app, client, data):
+    response = client.get('/venues', query_string={'genre': data['genre']})
+    assert response.status_code == 200
+    badges = dict(
+        (html.unescape(value), int(count)) for value, count in
+        re.findall(r'<a href="[^"]*">([^<]+) <span class="badge">(\d+)</span>', response.get_data(as_text=True))
+    )
+    with app.app_context():
+        counts = expected_counts(Venue, [data['genre']])
+    assert badges[data['genre']] == counts['genre'][data['genre']]
+    assert badges[data['city']] == counts['city'][data['city']]
+
+    assert client.get('/venues', query_string={'genre': 'Not a genre'}).status_code == 400
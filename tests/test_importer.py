@@ -0,0 +1,100 @@
+# `flask import` (importer.py): rejects and references by name.
+
+import json
+
+import pytest
+
+import deletion
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def references(app):
+    # a live and a deleted venue, and an artist
+    with app.app_context():
+        here = Venue(name='Quokka Hall', city='Austin', state='TX', genres=['Jazz'])
+        gone = Venue(name='Wombat Room', city='Austin', state='TX', genres=['Jazz'])
+        artist = Artist(name='The Quokkas', city='Austin', state='TX', genres=['Jazz'])
+        db.session.add_all([here, gone, artist])
+        db.session.commit()
+        deletion.delete(gone.id)
+        db.session.commit()
+        return {'here': here.id, 'gone': gone.id, 'artist': artist.id}
+
+
+def run_import(app, kind, path, *lines):
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    result = app.test_cli_runner().invoke(args=['import', kind, str(path)])
+    assert result.exit_code == 0, result.output
+    rejects = path.with_name(path.stem + '.rejects.jsonl')
+    if not rejects.exists():
+        return []
+    return [json.loads(line) for line in rejects.read_text(encoding='utf-8').splitlines()]
+
+
+def shows_of(app, artist_id):
+    with app.app_context():
+        return db.session.execute(
+            db.select(Show.venue_id, Show.dateshow).where(Show.artist_id == artist_id)
+            .order_by(Show.dateshow)
+        ).all()
+
+
+def test_shows_by_name(app, tmp_path, references):
+    rejects = run_import(
+        app, 'shows', tmp_path / 'shows.jsonl',
+        json.dumps({'venue_name': 'Quokka Hall', 'artist_name': 'The Quokkas',
+                    'start_time': '2040-01-01 20:00:00'}),
+        json.dumps({'venue_id': references['here'], 'artist_name': 'The Quokkas',
+                    'start_time': '2040-01-02 20:00:00'}),
+    )
+    assert rejects == []
+    assert [venue_id for venue_id, _ in shows_of(app, references['artist'])] == [references['here']] * 2
+
+    # the counters of the venues and artists imported into are recomputed
+    with app.app_context():
+        artist = db.session.get(Artist, references['artist'])
+        assert (artist.shows_count, artist.upcoming_shows_count) == (2, 2)
+
+
+def test_show_rejects(app, tmp_path, references):
+    rejects = run_import(
+        app, 'shows', tmp_path / 'shows.jsonl',
+        '{"venue_name": "Quokka Hall",',
+        '[1, 2]',
+        json.dumps({'venue_name': 'Wombat Room', 'artist_name': 'The Quokkas',
+                    'start_time': '2040-01-01 20:00:00'}),
+        json.dumps({'venue_id': references['gone'], 'artist_id': references['artist'],
+                    'start_time': '2040-01-01 20:00:00'}),
+        json.dumps({'venue_name': 'Quokka Hall', 'artist_name': 'Nobody',
+                    'start_time': '2040-01-01 20:00:00'}),
+        json.dumps({'venue_name': 'Quokka Hall', 'artist_name': 'The Quokkas'}),
+        json.dumps({'venue_name': 'Quokka Hall', 'artist_name': 'The Quokkas',
+                    'start_time': '2040-01-03 20:00:00'}),
+    )
+    assert [(r['line'], sorted(r['errors'])) for r in rejects] == [
+        (1, ['json']),
+        (2, ['json']),
+        # deleted venues cannot be referenced, by name or by id
+        (3, ['venue_id']),
+        (4, ['venue_id']),
+        (5, ['artist_id']),
+        (6, ['start_time']),
+    ]
+    assert rejects[1]['errors']['json'] == ['Expected an object.']
+    assert rejects[0]['row'] == '{"venue_name": "Quokka Hall",'
+    assert len(shows_of(app, references['artist'])) == 1
+
+
+def test_venue_rejects(app, tmp_path):
+    rejects = run_import(
+        app, 'venues', tmp_path / 'venues.csv',
+        'name,city,state,address,genres,facebook_link,website,seeking_talent',
+        'Quokka Hall,Austin,TX,1 Main St,Jazz;Folk,https://fb.com/q,https://q.example,Yes',
+        ',Austin,TX,1 Main St,Jazz,https://fb.com/w,https://w.example,No',
+        'Wombat Room,Austin,XX,1 Main St,Swing,https://fb.com/w,https://w.example,No',
+    )
+    assert [(r['line'], sorted(r['errors'])) for r in rejects] == [(3, ['name']), (4, ['genres', 'state'])]
+    with app.app_context():
+        venue = db.session.execute(db.select(Venue).where(Venue.name == 'Quokka Hall')).scalar_one()
+        assert (venue.genres, venue.seeking_talent) == (['Jazz', 'Folk'], True)
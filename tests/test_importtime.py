@@ -0,0 +1,17 @@
+# Import-time guard: booting the app must leave the heavy modules of
+# benchmarks.importtime.LAZY_MODULES to their first use. The boot runs in
+# a fresh interpreter, as this one has imported them already.
+
+from benchmarks.importtime import LAZY_MODULES, boot_imports, eager_imports
+
+
+def test_boot_does_not_import_lazy_modules():
+    modules = boot_imports()
+    assert 'wsgi' in modules
+    assert eager_imports(modules) == []
+
+
+def test_eager_imports():
+    modules = {'flask': (1, 1), 'wtforms.fields': (1, 1), 'forms': (1, 1)}
+    assert eager_imports(modules) == ['forms', 'wtforms']
+    assert set(eager_imports(dict.fromkeys(LAZY_MODULES, (1, 1)))) == set(LAZY_MODULES)
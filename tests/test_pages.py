@@ -0,0 +1,60 @@
+# Statement counts of the list and detail pages. Each page is built from a
+# fixed number of queries whatever the number of rows it shows; a higher
+# count usually means a query per venue, artist or show crept back in.
+
+import pytest
+
+# the conditional request check (conditional.py) comes first on each page
+LIST_PAGES = [
+    # areas and facets
+    ('/venues', 3),
+    ('/venues?genre=Jazz&state=CA', 3),
+    # artists and facets
+    ('/artists', 3),
+    # one page of shows joined to their venues and artists
+    ('/shows', 2),
+]
+
+DETAIL_PAGES = [
+    # the entity with its capped past and upcoming show lists
+    ('/venues/{venue_id}', 2),
+    ('/artists/{artist_id}', 2),
+]
+
+
+@pytest.mark.parametrize('url, expected', LIST_PAGES + DETAIL_PAGES)
+def test_statement_count(client, data, statements, url, expected):
+    url = url.format(**data)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert len(statements) == expected, '\n\n'.join(statements)
+
+
+def test_venue_list_does_not_grow_with_venues(client, app, statements):
+    from models import db, Venue
+
+    client.get('/venues')
+    before = len(statements)
+    with app.app_context():
+        db.session.add_all(
+            Venue(name='Venue {}'.format(i), city='City {}'.format(i), state='ST', genres=['Jazz'])
+            for i in range(20)
+        )
+        db.session.commit()
+    del statements[:]
+
+    response = client.get('/venues')
+    assert response.status_code == 200
+    assert b'City 19' in response.data
+    assert len(statements) == before
+
+
+@pytest.mark.parametrize('url', ['/venues/{venue_id}', '/artists/{artist_id}'])
+def test_not_modified_is_one_statement(client, data, statements, url):
+    url = url.format(**data)
+    etag = client.get(url).headers['ETag']
+    del statements[:]
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert len(statements) == 1
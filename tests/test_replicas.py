@@ -0,0 +1,101 @@
+# Read replicas (replicas.py), with a second SQLite file, a copy of the
+# primary, standing in for the replica.
+
+import shutil
+
+import pytest
+from sqlalchemy import event
+
+from benchmarks.data import create_app
+from conftest import sqlite_url
+from models import db, Venue
+
+
+@pytest.fixture
+def replica(database, tmp_path):
+    path = tmp_path / 'replica.db'
+    shutil.copyfile(str(database), str(path))
+    return path
+
+
+def replicated_app(database, replica_url):
+    app = create_app(sqlite_url(database), REPLICA_DATABASE_URLS=[replica_url])
+    # the statements each engine ran, by bind key (None for the primary)
+    app.executed = {}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            def record(connection, cursor, statement, *args, key=key):
+                app.executed.setdefault(key, []).append(statement)
+            event.listen(engine, 'before_cursor_execute', record)
+    return app
+
+
+@pytest.fixture
+def app(database, replica):
+    app = replicated_app(database, sqlite_url(replica))
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def rename_on_replica(replica, venue_id, name):
+    # the replica lagging behind, or the primary after a write
+    app = create_app(sqlite_url(replica))
+    with app.app_context():
+        db.session.get(Venue, venue_id).name = name
+        db.session.commit()
+        db.engine.dispose()
+
+
+def test_get_reads_from_replica(app, client, data, replica):
+    rename_on_replica(replica, data['venue_id'], 'Replica Hall')
+    app.executed.clear()
+
+    response = client.get('/venues/{}'.format(data['venue_id']))
+    assert response.status_code == 200
+    assert b'Replica Hall' in response.data
+    assert app.executed.get(None) is None
+    assert app.executed['replica_0']
+
+
+def test_write_goes_to_primary_and_sticks(app, client, data, replica):
+    rename_on_replica(replica, data['venue_id'], 'Replica Hall')
+    app.executed.clear()
+
+    response = client.post('/artists/create', data={
+        'name': 'Primary Band', 'city': 'Austin', 'state': 'TX', 'phone': '',
+        'genres': ['Jazz'], 'image_link': '', 'facebook_link': '', 'website': '',
+        'seeking_talent': 'No', 'seeking_description': '',
+    })
+    assert response.status_code in (200, 302)
+    assert any(s.startswith('INSERT INTO "Artist"') for s in app.executed[None])
+    assert not any(s.startswith('INSERT') for s in app.executed.get('replica_0', []))
+    assert app.config['REPLICA_STICKY_COOKIE'] in response.headers.get('Set-Cookie', '')
+
+    # the client that wrote reads its writes from the primary
+    app.executed.clear()
+    response = client.get('/venues/{}'.format(data['venue_id']))
+    assert b'Replica Hall' not in response.data
+    assert app.executed.get('replica_0') is None
+
+    # others still read from the replica
+    other = app.test_client()
+    assert b'Replica Hall' in other.get('/venues/{}'.format(data['venue_id'])).data
+
+
+def test_unreachable_replica_falls_back_to_primary(database, tmp_path, data):
+    app = replicated_app(database, sqlite_url(tmp_path / 'missing' / 'replica.db'))
+    response = app.test_client().get('/venues/{}'.format(data['venue_id']))
+    assert response.status_code == 200
+    assert app.executed[None]
+
+
+def test_search_runs_no_writes_on_replica(app, client, data):
+    from replicas import WRITE_TEXT
+
+    app.executed.clear()
+    response = client.get('/venues/search', query_string={'search_term': data['term']})
+    assert response.status_code == 200
+    assert app.executed['replica_0']
+    assert not [s for s in app.executed['replica_0'] if WRITE_TEXT.match(s)]
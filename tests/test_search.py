@@ -0,0 +1,84 @@
+# Venue and artist search through the pages, on the SQLite backend
+# (search.py) the testing profile selects.
+
+import re
+
+import pytest
+
+import deletion
+import jobs
+import search
+from models import db, Venue, Artist
+
+
+def names(response):
+    assert response.status_code == 200
+    return re.findall(r'<h5>(.*?)</h5>', response.get_data(as_text=True))
+
+
+def count(response):
+    return int(re.search(r'results for ".*?": (\d+)', response.get_data(as_text=True)).group(1))
+
+
+def add(app, model, **columns):
+    with app.app_context():
+        entity = model(state='TX', genres=['Jazz'], **columns)
+        db.session.add(entity)
+        db.session.flush()
+        search.get_backend().index(entity)
+        db.session.commit()
+        return entity.id
+
+
+@pytest.mark.parametrize('url, model', [
+    ('/venues/search', Venue),
+    ('/artists/search', Artist),
+])
+def test_ranked_matches(app, client, url, model):
+    add(app, model, name='Quokka Quokka Den', city='Quokka')
+    add(app, model, name='The Long Hall of the Quokka and Friends', city='Austin')
+    add(app, model, name='Wombat Room', city='Austin')
+
+    response = client.get(url, query_string={'search_term': 'quokka'})
+    assert names(response) == ['Quokka Quokka Den', 'The Long Hall of the Quokka and Friends']
+    assert count(response) == 2
+
+    # partial and case-insensitive
+    assert names(client.get(url, query_string={'search_term': 'OKK'})) == names(response)
+
+
+@pytest.mark.parametrize('url, model', [
+    ('/venues/search', Venue),
+    ('/artists/search', Artist),
+])
+def test_empty_term_lists_everything(app, client, url, model):
+    with app.app_context():
+        total = db.session.scalar(db.select(db.func.count()).select_from(model))
+        per_page = app.config['SEARCH_RESULTS_PER_PAGE']
+
+    response = client.get(url, query_string={'search_term': ''})
+    assert count(response) == total
+    assert len(names(response)) == min(total, per_page)
+
+
+def test_deleted_venue_is_hidden(app, client):
+    venue_id = add(app, Venue, name='Quokka Hall', city='Austin')
+    url = '/venues/search'
+
+    assert names(client.get(url, query_string={'search_term': 'quokka'})) == ['Quokka Hall']
+    # terms under three characters take the LIKE path
+    assert names(client.get(url, query_string={'search_term': 'kk'})) == ['Quokka Hall']
+
+    assert client.delete('/venues/{}'.format(venue_id)).status_code == 302
+    # before and after the job removing it from the index has run
+    assert names(client.get(url, query_string={'search_term': 'quokka'})) == []
+    assert names(client.get(url, query_string={'search_term': 'kk'})) == []
+    with app.app_context():
+        jobs.work(burst=True)
+    assert names(client.get(url, query_string={'search_term': 'quokka'})) == []
+
+    with app.app_context():
+        deletion.restore(venue_id)
+        db.session.commit()
+        jobs.work(burst=True)
+    assert names(client.get(url, query_string={'search_term': 'quokka'})) == ['Quokka Hall']
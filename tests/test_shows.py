@@ -0,0 +1,114 @@
+# Booking shows through the new show form (shows.py, scheduling.py), and
+# the keyset paginated /shows pages (queries.py).
+
+import html
+import re
+
+import pytest
+
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def booked(app):
+    # a venue, two artists and one show of the first artist there
+    with app.app_context():
+        venue = Venue(name='Quokka Hall', city='Austin', state='TX', genres=['Jazz'])
+        other = Venue(name='Wombat Room', city='Austin', state='TX', genres=['Jazz'])
+        artist = Artist(name='The Quokkas', city='Austin', state='TX', genres=['Jazz'])
+        db.session.add_all([venue, other, artist])
+        db.session.commit()
+        ids = {'venue_id': venue.id, 'other_id': other.id, 'artist_id': artist.id}
+    return ids
+
+
+def shows_of(app, artist_id):
+    with app.app_context():
+        return db.session.scalar(
+            db.select(db.func.count()).select_from(Show).where(Show.artist_id == artist_id)
+        )
+
+
+def test_overlapping_show_is_rejected(app, client, booked):
+    response = client.post('/shows/create', data={
+        'venue_id': booked['venue_id'], 'artist_id': booked['artist_id'],
+        'start_time': '2040-01-01 20:00', 'duration': '120',
+    })
+    assert response.status_code == 200
+    assert shows_of(app, booked['artist_id']) == 1
+
+    form = {
+        'venue_id': 'wombat room', 'artist_id': str(booked['artist_id']),
+        'start_time': '2040-01-01 21:00', 'duration': '90',
+    }
+    response = client.post('/shows/create', data=form)
+    page = html.unescape(response.get_data(as_text=True))
+    assert response.status_code == 200
+    assert ('Show could not be listed: The Quokkas is already booked at Quokka Hall '
+            'from 2040-01-01 20:00 to 2040-01-01 22:00.') in page
+    assert shows_of(app, booked['artist_id']) == 1
+
+    # the form keeps what was submitted
+    assert dict(re.findall(r'<input[^>]* name="(\w+)"[^>]* value="([^"]*)"', page)) == form
+
+
+def test_back_to_back_shows_are_accepted(app, client, booked):
+    for start in ('2040-01-01 18:00', '2040-01-01 20:00'):
+        client.post('/shows/create', data={
+            'venue_id': booked['venue_id'], 'artist_id': booked['artist_id'],
+            'start_time': start, 'duration': '120',
+        })
+    assert shows_of(app, booked['artist_id']) == 2
+
+
+def tiles(response):
+    # (venue_id, artist_id) of each show on a /shows page, and the pager
+    # links
+    assert response.status_code == 200
+    page = html.unescape(response.get_data(as_text=True))
+    shows = [
+        (int(venue_id), int(artist_id)) for artist_id, venue_id in
+        re.findall(r'href="/artists/(\d+)">.*?href="/venues/(\d+)"', page, re.S)
+    ]
+    links = dict(
+        (rel, url) for rel, url in re.findall(r'<li class="(previous|next)"><a href="([^"]+)"', page)
+    )
+    return shows, links
+
+
+def test_show_pages(app, client):
+    with app.app_context():
+        # more shows starting at the same time than fit on a page, so the
+        # cursors have to break ties on (venue_id, artist_id)
+        start = db.session.scalar(db.select(db.func.min(Show.dateshow)))
+        venue_ids = db.session.scalars(db.select(Venue.id).order_by(Venue.id)).all()
+        artist_ids = db.session.scalars(db.select(Artist.id).order_by(Artist.id)).all()
+        db.session.add_all(
+            Show(venue_id=venue_id, artist_id=artist_id, dateshow=start, duration_minutes=60)
+            for venue_id in venue_ids[:5] for artist_id in artist_ids[:8]
+        )
+        db.session.commit()
+        expected = [tuple(row) for row in db.session.execute(
+            db.select(Show.venue_id, Show.artist_id)
+            .order_by(Show.dateshow, Show.venue_id, Show.artist_id)
+        )]
+    per_page = app.config['SHOWS_PER_PAGE']
+
+    pages = []
+    shows, links = tiles(client.get('/shows'))
+    assert 'previous' not in links
+    while True:
+        assert len(shows) == per_page or 'next' not in links
+        pages.append((shows, links))
+        if 'next' not in links:
+            break
+        shows, links = tiles(client.get(links['next']))
+    assert [show for shows, _ in pages for show in shows] == expected
+
+    # and back, page by page
+    for n in range(len(pages) - 1, 0, -1):
+        shows, links = tiles(client.get(pages[n][1]['previous']))
+        assert shows == pages[n - 1][0]
+    assert 'previous' not in links
+
+    assert client.get('/shows', query_string={'after': 'not a cursor'}).status_code == 400
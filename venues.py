@@ -0,0 +1,301 @@
+# ----------------------------------------------------------------------------#
+# Venues.
+# ----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, g, render_template, request
+from flask import flash, redirect, url_for
+
+import deletion
+import facets
+import fragments
+import jobs
+from app import search_response, detail_cache_ttl
+from cache import get_cache, venue_key
+from conditional import conditional
+from models import db, Venue, Artist
+from queries import decode_cursor, detail_with_shows, venue_areas
+from queries import venues_version, venue_version
+
+venues_bp = Blueprint('venues', __name__)
+
+
+def venue_data(row, past, upcoming, cursors):
+    # template data for a venue page; rows as returned by
+    # queries.detail_with_shows
+    allData = row.Venue
+
+    def show_data(sh):
+        return {
+            'artist_id': sh.other_id,
+            'artist_name': sh.other_name,
+            'artist_image_link': sh.other_image_link,
+            'start_time': sh.dateshow
+        }
+
+    data = {
+      'id': allData.id,
+      'name': allData.name,
+      'genres': allData.genres,
+      'address': allData.address,
+      'city': allData.city,
+      'state': allData.state,
+      'phone': allData.phone,
+      'website': allData.website,
+      'facebook_link': allData.facebook_link,
+      'seeking_talent': allData.seeking_talent,
+      'seeking_description': allData.seeking_description,
+      'image_link': allData.image_link,
+      'past_shows': [show_data(sh) for sh in past],
+      'upcoming_shows': [show_data(sh) for sh in upcoming],
+      'past_shows_count': row.past_count,
+      'upcoming_shows_count': row.upcoming_count,
+      'past_shows_more': cursors['past_more'],
+      'upcoming_shows_more': cursors['upcoming_more']
+    }
+
+    return data
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@venues_bp.route('/venues')
+@conditional(venues_version)
+def venues():
+    # TODO: replace with real venues data.
+    #       num_shows should be aggregated based on number of upcoming
+    #       shows per venue.
+
+    filters = facets.parse_filters(request.args)
+    data = venue_areas(request.args.get('sort'), facets.conditions(Venue, filters))
+
+    return render_template(
+        'pages/venues.html',
+        areas=data,
+        facets=facets.facet_links(facets.facet_counts(Venue, filters), filters),
+        clear_url=facets.clear_url() if any(filters.values()) else None
+    )
+
+
+@venues_bp.route('/venues/search', methods=['GET', 'POST'])
+def search_venues():
+    # TODO: implement search on artists with partial string search.
+    # Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and
+    # "Park Square Live Music & Coffee"
+
+    search_term = request.values.get('search_term', '').strip()
+    page = request.values.get('page', 1, type=int)
+    response = search_response(Venue, search_term, page)
+
+    return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+
+@venues_bp.route('/venues/<int:venue_id>')
+@conditional(venue_version)
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    # TODO: replace with real venue data from the venues table, using venue_id
+
+    past_before = decode_cursor(request.args.get('past_before'), size=2)
+    upcoming_after = decode_cursor(request.args.get('upcoming_after'), size=2)
+    # only the first page of each show list is cached, under the page's
+    # ETag (conditional.py)
+    key = None
+    if past_before is None and upcoming_after is None and 'etag' in g:
+        key = venue_key(venue_id, g.etag)
+
+    if key:
+        data = get_cache().get(key)
+        if data is not None:
+            return render_template('pages/show_venue.html', venue=data)
+
+    row, past, upcoming, cursors = detail_with_shows(
+        Venue, venue_id, Artist, past_before, upcoming_after
+    )
+    data = venue_data(row, past, upcoming, cursors)
+
+    # data = list(filter(lambda d: d['id'] == venue_id, [data1, data2, data3]))[0]
+    if key:
+        get_cache().set(
+            key, data,
+            ttl=detail_cache_ttl([sh.dateshow for sh in upcoming[:1]])
+        )
+
+    return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@venues_bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@venues_bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+
+    error = False
+    try:
+        name = request.form['name']
+        city = request.form['city']
+        state = request.form['state']
+        address = request.form['address']
+        phone = request.form['phone']
+        image_link = request.form['image_link']
+        genres = request.form.getlist('genres')
+        facebook_link = request.form['facebook_link']
+        website = request.form['website']
+        if request.form['seeking_talent'] == 'No':
+            seeking_talent = False
+        else:
+            seeking_talent = True
+        seeking_description = request.form['seeking_description']
+
+        venue = Venue(
+            name=name,
+            city=city,
+            state=state,
+            address=address,
+            phone=phone,
+            image_link=image_link,
+            genres=genres,
+            facebook_link=facebook_link,
+            website=website,
+            seeking_talent=seeking_talent,
+            seeking_description=seeking_description
+        )
+
+        db.session.add(venue)
+        db.session.flush()
+        jobs.enqueue_indexing('venue_saved', {'venue_id': venue.id})
+        db.session.commit()
+        facets.invalidate(Venue)
+        fragments.invalidate(('venue-area', (state, city)))
+    except Exception:
+        error = True
+        db.session.rollback()
+        current_app.logger.exception('Venue could not be listed.')
+    finally:
+        db.session.close()
+
+    if error:
+        flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
+    else:
+        # on successful db insert, flash success
+        flash('Venue ' + request.form['name'] + ' was successfully listed!')
+
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html')
+
+
+@venues_bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    # TODO: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    error = False
+    try:
+        # a soft delete: the venue's shows stay until it is purged
+        # (deletion.py)
+        venue_id = int(venue_id)
+        area = deletion.delete(venue_id)
+        if area is None:
+            raise LookupError('no venue {}'.format(venue_id))
+        db.session.commit()
+        deletion.invalidate(venue_id, area)
+    except Exception:
+        error = True
+        db.session.rollback()
+    finally:
+        db.session.close()
+
+    if error:
+        flash('An error occurred. Venue could not be deleted.')
+    else:
+        # on successful db insert, flash success
+        flash('Venue was successfully deleted!')
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    return redirect('/')
+
+#  Update
+#  ----------------------------------------------------------------
+@venues_bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    form = VenueForm()
+
+    venue = Venue.query.filter_by(id=venue_id, deleted_at=None).first_or_404()
+    form.name.data = venue.name
+    form.city.data = venue.city
+    form.state.data = venue.state
+    form.address.data = venue.address
+    form.phone.data = venue.phone
+    form.genres.data = venue.genres
+    form.image_link.data = venue.image_link
+    form.facebook_link.data = venue.facebook_link
+    form.website.data = venue.website
+    if venue.seeking_talent:
+        form.seeking_talent.data = "Yes"
+    else:
+        form.seeking_talent.data = "No"
+    form.seeking_description.data = venue.seeking_description
+
+    # TODO: populate form with values from venue with ID <venue_id>
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@venues_bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    # TODO: take values from the form submitted, and update existing
+    # venue record with ID <venue_id> using the new attributes
+
+    error = False
+    try:
+        venue = Venue.query.filter_by(id=venue_id, deleted_at=None).one()
+        area = (venue.state, venue.city)
+        venue.name = request.form['name']
+        venue.city = request.form['city']
+        venue.state = request.form['state']
+        venue.address = request.form['address']
+        venue.phone = request.form['phone']
+        venue.image_link = request.form['image_link']
+        venue.genres = request.form.getlist('genres')
+        venue.facebook_link = request.form['facebook_link']
+        venue.website = request.form['website']
+        if request.form['seeking_talent'] == 'No':
+            venue.seeking_talent = False
+        else:
+            venue.seeking_talent = True
+        venue.seeking_description = request.form['seeking_description']
+
+        jobs.enqueue_indexing('venue_saved', {'venue_id': venue_id})
+        db.session.commit()
+        facets.invalidate(Venue)
+        fragments.invalidate(
+            ('venue', venue_id), ('venue-area', area),
+            ('venue-area', (request.form['state'], request.form['city']))
+        )
+    except Exception:
+        error = True
+        db.session.rollback()
+        current_app.logger.exception('Venue %s could not be updated.', venue_id)
+    finally:
+        db.session.close()
+
+    if error:
+        flash('An error occurred. Venue ' + request.form['name'] + ' could not be updated.')
+    else:
+        flash('Venue ' + request.form['name'] + ' was successfully updated!')
+
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))
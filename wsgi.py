@@ -0,0 +1,123 @@
+# ----------------------------------------------------------------------------#
+# WSGI entry point.
+#
+#   gunicorn -c gunicorn.conf.py 'wsgi:create_app()'
+#   FYYUR_CONFIG=testing flask --app wsgi routes
+#   ASYNC_READS=1 uvicorn asgi:app      (see aio.py)
+#
+# create_app(config) builds a fully configured app. `config` is a profile
+# name from config.PROFILES, a settings object or a dict; by default the
+# profile named by FYYUR_CONFIG, else 'production', so that a deploy which
+# forgets to set it does not run with debug mode on. Local runs opt in with
+# FYYUR_CONFIG=development.
+# ----------------------------------------------------------------------------#
+
+import logging
+import os
+from logging import FileHandler
+
+from flask import Flask
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+import config as settings
+
+
+def engine_options(config):
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'postgresql':
+        # SQLite (tests): keep Flask-SQLAlchemy's own pool choice
+        return {}
+    if config['DB_PGBOUNCER']:
+        options = {'poolclass': NullPool}
+        if url.get_driver_name() == 'psycopg':
+            # psycopg 3 prepares repeated statements on the server, which a
+            # transaction-mode PgBouncer cannot route back to
+            options['connect_args'] = {'prepare_threshold': None}
+        return options
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def create_app(config=None):
+    if config is None:
+        config = os.environ.get('FYYUR_CONFIG', 'production')
+    if isinstance(config, str):
+        config = settings.PROFILES[config]
+
+    app = Flask(__name__)
+    app.config.from_object(settings)
+    if isinstance(config, dict):
+        app.config.update(config)
+    else:
+        app.config.from_object(config)
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY must be set')
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+
+    from flask_moment import Moment
+
+    import aio
+    import api
+    import assets
+    import cache
+    import counters
+    import deletion
+    import export
+    import fragments
+    import importer
+    import instrumentation
+    import jobs
+    import replicas
+    import search
+    from app import main
+    from artists import artists_bp
+    from autocomplete import autocomplete_bp
+    from instrumentation import JsonFormatter
+    from models import db, Venue, Artist, Show
+    from shows import shows_bp
+    from venues import venues_bp
+
+    Moment(app)
+    app.config.setdefault('SQLALCHEMY_BINDS', {}).update(
+        replicas.engine_binds(app.config, engine_options)
+    )
+    db.init_app(app)
+    replicas.init_app(app, db)
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        # `flask db ...`: Flask-Migrate pulls in alembic, which is the
+        # slowest import of all and useless to a web worker
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    instrumentation.init_app(app)
+    assets.init_app(app)
+    cache.init_app(app)
+    fragments.init_app(app)
+    counters.init_app(app)
+    jobs.init_app(app)
+    deletion.init_app(app)
+    search.init_app(app, db, [Venue, Artist])
+    importer.init_app(app, db, Venue, Artist, Show)
+    export.init_app(app, db, {'venues': Venue, 'artists': Artist, 'shows': Show})
+    api.init_app(app)
+    app.register_blueprint(main)
+    app.register_blueprint(venues_bp)
+    app.register_blueprint(artists_bp)
+    app.register_blueprint(shows_bp)
+    app.register_blueprint(autocomplete_bp)
+    aio.init_app(app)
+
+    if not app.debug and not app.testing and app.config['LOG_FILE']:
+        file_handler = FileHandler(app.config['LOG_FILE'])
+        file_handler.setFormatter(JsonFormatter())
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info('errors')
+
+    return app